@@ -0,0 +1,65 @@
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import CallbackContext, ConversationHandler
+from config import logger, SEARCH_PAGE_SIZE
+from utils.reply import send_message, clear_cache
+from utils.tokenSearch import TOKEN_SEARCH_INDEX
+from messages_photos import markdown_v2
+
+SEARCH_RESULTS = "*🔎 {query}* · {first}-{last} of {total}\n\n{lines}\n\n👇 Tap a token to trade it."
+NO_RESULTS = "🔎 No tokens match *{query}*. Try a shorter prefix."
+ASK_SEARCH = "*⌨️ TYPE /search AND THE START OF A TOKEN:*\n`Ex: /search PON`"
+
+# Callback data marker for the page to show, e.g. "/search pon page=2"
+PAGE_MARKER = "page="
+BUTTONS_PER_ROW = 4
+MAX_QUERY_LENGTH = 40  # Keeps the paging callback data under Telegram's 64-byte limit
+
+
+def _escape(text: str) -> str:
+    """Escape the Markdown characters markdown_v2 leaves alone, for text we don't control."""
+    for char in "_*`[]()":
+        text = text.replace(char, f"\\{char}")
+    return text
+
+
+async def process_search(update: Update, context: CallbackContext) -> int:
+    """Answer /search <prefix> from the local token index, one page at a time."""
+    words, page = [], 0
+    for token in context.user_data.get('tokens', []):
+        if not isinstance(token, str):
+            continue
+        if token.startswith(PAGE_MARKER) and token[len(PAGE_MARKER):].isdigit():
+            page = int(token[len(PAGE_MARKER):])
+        else:
+            words.append(token)
+    query = " ".join(words)[:MAX_QUERY_LENGTH]
+    await clear_cache(update, context)
+
+    if not query:
+        await send_message(update, context, markdown_v2(ASK_SEARCH))
+        return ConversationHandler.END
+
+    results, total = TOKEN_SEARCH_INDEX.search(query, page, SEARCH_PAGE_SIZE)
+    logger.info(f"User {update.effective_user.id} - Search for {query!r} page {page}: {total} results.")
+    if not results:
+        await send_message(update, context, markdown_v2(NO_RESULTS.format(query=_escape(query.upper()))))
+        return ConversationHandler.END
+
+    lines = "\n".join(f"*{_escape(symbol)}* {_escape(name)}".rstrip() for symbol, name in results)
+    first = page * SEARCH_PAGE_SIZE + 1
+    text = SEARCH_RESULTS.format(
+        query=_escape(query.upper()), first=first, last=first + len(results) - 1, total=total, lines=lines
+    )
+
+    token_buttons = [InlineKeyboardButton(symbol, callback_data=f"/trade {symbol}") for symbol, _ in results]
+    buttons = [token_buttons[i:i + BUTTONS_PER_ROW] for i in range(0, len(token_buttons), BUTTONS_PER_ROW)]
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("◀️ Prev", callback_data=f"/search {query} {PAGE_MARKER}{page - 1}"))
+    if first + len(results) - 1 < total:
+        navigation.append(InlineKeyboardButton("Next ▶️", callback_data=f"/search {query} {PAGE_MARKER}{page + 1}"))
+    if navigation:
+        buttons.append(navigation)
+
+    await send_message(update, context, markdown_v2(text), reply_markup=InlineKeyboardMarkup(buttons))
+    return ConversationHandler.END
@@ -0,0 +1,146 @@
+"""
+Per-update CPU cost of decoding webhook payloads and upstream bodies.
+
+Compares the previous path (stdlib json on decoded text, then dict lookups and
+copies) with utils.codec (one decode straight from bytes into small structs).
+
+LiFi token decoding costs about the same either way; what the LifiToken struct
+buys is a smaller LIFI_TOKEN_CACHE entry, reported separately below.
+
+Run from the repository root:
+    python benchmarks/codec_benchmark.py
+"""
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update  # noqa: E402
+from utils import codec  # noqa: E402
+
+TELEGRAM_UPDATE = json.dumps({
+    "update_id": 123456789,
+    "message": {
+        "message_id": 42,
+        "from": {"id": 1111111, "is_bot": False, "first_name": "Wile", "last_name": "Coyote",
+                 "username": "wile", "language_code": "en"},
+        "chat": {"id": 1111111, "first_name": "Wile", "last_name": "Coyote", "username": "wile", "type": "private"},
+        "date": 1729000000,
+        "text": "/trade popcat toshi brett",
+        "entities": [{"offset": 0, "length": 6, "type": "bot_command"}],
+    },
+}).encode()
+
+ACME_WEBHOOK = json.dumps({
+    "order": {
+        "id": "ord_" + "a" * 24, "status": "Completed", "createdAt": "2024-10-15T12:00:00.000Z",
+        "blockchainTransactionHash": "0x" + "b" * 64, "executionMessage": "", "userId": "usr_" + "c" * 24,
+        "userEmail": "wile@acme.am", "userWalletAddress": "0x" + "d" * 40, "intentId": "int_" + "e" * 24,
+        "intentMemo": "", "encryptedUserData": "f" * 512,
+    }
+}).encode()
+
+COINGECKO_PRICE = json.dumps({
+    "0x532f27101965dd16442e59d40670faf5ebb142e4": {
+        "usd": 0.1234, "usd_market_cap": 1234567890.12, "usd_24h_vol": 98765432.1,
+        "usd_24h_change": -3.21, "last_updated_at": 1729000000,
+    }
+}).encode()
+
+LIFI_TOKEN = json.dumps({
+    "address": "0x532f27101965dd16442e59d40670faf5ebb142e4", "chainId": 8453, "symbol": "BRETT",
+    "decimals": 18, "name": "Brett", "coinKey": "BRETT", "logoURI": "https://assets.coingecko.com/coins/images/1/large/brett.png",
+    "priceUSD": "0.1234", "tags": [], "verificationStatus": "VERIFIED",
+}).encode()
+
+
+def old_telegram():
+    return Update.de_json(json.loads(TELEGRAM_UPDATE.decode()), None)
+
+
+def new_telegram():
+    return Update.de_json(codec.loads(TELEGRAM_UPDATE), None)
+
+
+def old_telegram_decode():
+    return json.loads(TELEGRAM_UPDATE.decode())
+
+
+def new_telegram_decode():
+    return codec.loads(TELEGRAM_UPDATE)
+
+
+def old_acme_webhook():
+    return json.loads(ACME_WEBHOOK.decode())["order"]
+
+
+def new_acme_webhook():
+    return codec.loads(ACME_WEBHOOK)["order"]
+
+
+def old_coingecko():
+    text = COINGECKO_PRICE.decode()  # logged, then decoded again by .json()
+    data = json.loads(text)
+    return data[list(data.keys())[0]].get("usd_market_cap")
+
+
+def new_coingecko():
+    return codec.decode_coingecko_prices(COINGECKO_PRICE)[0].usd_market_cap
+
+
+def old_lifi_entry():
+    token = json.loads(LIFI_TOKEN.decode())
+    token.update({"chain_id": "8453", "platform_name": "base"})
+    return token  # kept in the cache as decoded, every field included
+
+
+def new_lifi_entry():
+    return codec.decode_lifi_token(LIFI_TOKEN)  # kept in the cache
+
+
+def old_lifi():
+    return dict(old_lifi_entry())  # copy kept in the cache
+
+
+def new_lifi():
+    return codec.decode_lifi_token(LIFI_TOKEN).to_dict(chain_id="8453", platform_name="base")
+
+
+def per_call_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def retained_bytes(fn, number: int = 10000) -> float:
+    """Memory each result of `fn` keeps alive, as a cache entry would."""
+    tracemalloc.start()
+    kept = [fn() for _ in range(number)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / number
+
+
+def main():
+    number = 20000
+    print(f"codec backend: {codec.BACKEND}")
+    print(f"{'payload':<18}{'before (us)':>14}{'after (us)':>14}{'saved':>10}")
+    for name, old, new in (
+        ("telegram decode", old_telegram_decode, new_telegram_decode),
+        ("telegram total", old_telegram, new_telegram),
+        ("acme webhook", old_acme_webhook, new_acme_webhook),
+        ("coingecko", old_coingecko, new_coingecko),
+        ("lifi token", old_lifi, new_lifi),
+    ):
+        before, after = per_call_us(old, number), per_call_us(new, number)
+        print(f"{name:<18}{before:>14.2f}{after:>14.2f}{(1 - after / before):>10.0%}")
+
+    before, after = retained_bytes(old_lifi_entry), retained_bytes(new_lifi_entry)
+    print(f"\n{'cache entry':<18}{'before (B)':>14}{'after (B)':>14}{'saved':>10}")
+    print(f"{'lifi token':<18}{before:>14.0f}{after:>14.0f}{(1 - after / before):>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
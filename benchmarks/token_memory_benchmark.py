@@ -0,0 +1,133 @@
+"""
+Memory held by per-user token state at 100k users.
+
+Every user keeps the tokens of their last command in user_data["tokens"] and
+their top 3 in bot_data[user]["top3"]. Compares the previous representation
+(a deep copy of the cached token dict per user, plus the top 3 decoded from
+each user's own API response) with shared, interned TokenRecords.
+
+Users mostly pick from a small set of popular tokens. Anonymous users share
+the default key's trading links; authenticated users have links of their own.
+
+Run from the repository root:
+    python benchmarks/token_memory_benchmark.py [users]
+"""
+import copy
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import codec  # noqa: E402
+from utils.tokenRecord import TokenRecord, interned_records  # noqa: E402
+
+USERS = 100_000
+POPULAR_TOKENS = 200
+TOKENS_PER_USER = 3
+AUTHENTICATED_SHARE = 0.2  # Users with their own API key, hence their own trading links
+SEED = 7
+
+
+def catalog() -> list:
+    """Acme-shaped records of the popular tokens, as the resolution cache holds them."""
+    rng = random.Random(SEED)
+    tokens = []
+    for i in range(POPULAR_TOKENS):
+        solana = i % 3 == 0
+        tokens.append({
+            "id": f"cur_{i:024d}",
+            "symbol": f"TKN{i}",
+            "name": f"Token number {i}",
+            "address": "".join(rng.choice("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz") for _ in range(44))
+            if solana else "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40)),
+            "chainId": "1151111081099710" if solana else "8453",
+            "decimals": 9 if solana else 18,
+            "logoUrl": f"https://assets.coingecko.com/coins/images/{i}/large/token.png",
+            "isEnabled": True,
+        })
+    return tokens
+
+
+def picks(rng: random.Random) -> list:
+    """Indexes of the tokens one user holds, skewed towards the most popular ones."""
+    return [min(int(rng.paretovariate(1.2)) - 1, POPULAR_TOKENS - 1) for _ in range(TOKENS_PER_USER)]
+
+
+def link(user: int, token: int, authenticated: bool) -> str:
+    owner = f"u{user}" if authenticated else "default"
+    return f"https://app.acme.am/buy/{owner}-{token:06d}"
+
+
+def top3_body(tokens: list, user: int, indexes: list, authenticated: bool) -> bytes:
+    """One user's get-featured-tg-purchase-links response."""
+    return codec.dumps({"data": [
+        {"tokenAddress": tokens[i]["address"], "chainId": tokens[i]["chainId"], "symbol": tokens[i]["symbol"],
+         "name": tokens[i]["name"], "logoUrl": tokens[i]["logoUrl"], "intentId": f"int_{user}_{i}",
+         "tradingLink": link(user, i, authenticated)}
+        for i in indexes
+    ]})
+
+
+def build_dicts(tokens: list, bodies: list, rng: random.Random) -> dict:
+    """Previous state: each user holds copies of the cached dicts and its own decoded top 3."""
+    users = {}
+    for user, (body, authenticated) in enumerate(bodies):
+        held = []
+        for i in picks(rng):
+            token_data = copy.deepcopy(tokens[i])
+            token_data["tradingLink"] = link(user, i, authenticated)
+            held.append(token_data)
+        users[user] = {"tokens": held, "top3": codec.loads(body)["data"]}
+    return users
+
+
+def build_records(tokens: list, bodies: list, rng: random.Random) -> dict:
+    """Current state: each user references shared, interned records."""
+    resolved = [TokenRecord.from_dict(token) for token in tokens]
+    users = {}
+    for user, (body, authenticated) in enumerate(bodies):
+        held = [resolved[i].replace(tradingLink=link(user, i, authenticated)) for i in picks(rng)]
+        top3 = [TokenRecord.from_dict(token) for token in codec.loads(body)["data"]]
+        users[user] = {"tokens": held, "top3": top3}
+    return users
+
+
+def measure(build, tokens: list, bodies: list) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    state = build(tokens, bodies, random.Random(SEED))
+    seconds = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return state, current, seconds
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+    tokens = catalog()
+    rng = random.Random(SEED + 1)
+    bodies = []
+    for user in range(users):
+        authenticated = rng.random() < AUTHENTICATED_SHARE
+        bodies.append((top3_body(tokens, user, picks(rng), authenticated), authenticated))
+
+    dict_state, dict_bytes, dict_seconds = measure(build_dicts, tokens, bodies)
+    del dict_state
+    record_state, record_bytes, record_seconds = measure(build_records, tokens, bodies)
+
+    print(f"users: {users:,}  tokens per user: {TOKENS_PER_USER} + top 3  distinct records: {interned_records():,}")
+    print(f"{'representation':<16}{'total (MB)':>12}{'per user (B)':>14}{'build (s)':>12}")
+    for name, used, seconds in (("dict copies", dict_bytes, dict_seconds), ("TokenRecord", record_bytes, record_seconds)):
+        print(f"{name:<16}{used / 2**20:>12.1f}{used / users:>14.0f}{seconds:>12.2f}")
+    print(f"saved: {1 - record_bytes / dict_bytes:.0%}")
+    del record_state
+
+
+if __name__ == "__main__":
+    main()
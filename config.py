@@ -1,6 +1,7 @@
 import os
 import logging
 import sys
+from urllib.parse import urlsplit
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -81,12 +82,98 @@ except ValueError as e:
 
 DEFAULT_TIMEOUT = 3  # Timeout for the API request in seconds
 RETRY_COUNT = 2  # Number of retries on failure
+UPDATE_DEADLINE = 10  # Seconds one update may spend across all its upstream calls
+
+# Retry policy per upstream. Acme gets few, spaced-out retries so we don't amplify its outages.
+RETRY_POLICIES = {
+    "default": {"max_attempts": RETRY_COUNT, "timeout": DEFAULT_TIMEOUT},
+    "acme": {"max_attempts": RETRY_COUNT, "timeout": DEFAULT_TIMEOUT, "base_delay": 0.3, "max_delay": 2, "idempotency_keys": True},
+    "lifi": {"max_attempts": RETRY_COUNT, "timeout": DEFAULT_TIMEOUT, "base_delay": 0.2, "max_delay": 1},
+    "coingecko": {"max_attempts": RETRY_COUNT, "timeout": DEFAULT_TIMEOUT, "base_delay": 0.5, "max_delay": 2},
+    "cloudflare": {"max_attempts": RETRY_COUNT, "timeout": DEFAULT_TIMEOUT * 2, "base_delay": 0.5, "max_delay": 2},
+    "telegram": {"max_attempts": RETRY_COUNT, "timeout": DEFAULT_TIMEOUT, "base_delay": 0.2, "max_delay": 1},
+}
+
+# Circuit breaker per upstream: consecutive failures before opening, seconds before a trial call
+CIRCUIT_BREAKERS = {
+    "default": {"failure_threshold": 5, "recovery_timeout": 30},
+    "acme": {"failure_threshold": 5, "recovery_timeout": 20},
+    "lifi": {"failure_threshold": 5, "recovery_timeout": 30},
+    "coingecko": {"failure_threshold": 3, "recovery_timeout": 60},
+    "cloudflare": {"failure_threshold": 3, "recovery_timeout": 60},
+    "telegram": {"failure_threshold": 5, "recovery_timeout": 15},
+}
+
+# Adaptive timeouts per upstream: percentile of recent latencies times headroom, clamped to
+# [min_timeout, max_timeout]. The retry policy timeout is used until min_samples are recorded.
+ADAPTIVE_TIMEOUTS = {
+    "default": {"percentile": 99, "headroom": 1.5, "min_timeout": 1.0, "max_timeout": DEFAULT_TIMEOUT * 2, "min_samples": 20},
+    "acme": {"percentile": 99, "headroom": 1.5, "min_timeout": 0.75, "max_timeout": DEFAULT_TIMEOUT * 2, "min_samples": 20},
+    "lifi": {"percentile": 99, "headroom": 1.5, "min_timeout": 1.0, "max_timeout": DEFAULT_TIMEOUT * 2, "min_samples": 20},
+    "coingecko": {"percentile": 99, "headroom": 2.0, "min_timeout": 1.0, "max_timeout": DEFAULT_TIMEOUT * 3, "min_samples": 20},
+    "cloudflare": {"percentile": 99, "headroom": 2.0, "min_timeout": 2.0, "max_timeout": DEFAULT_TIMEOUT * 4, "min_samples": 10},
+}
+
+# Hedged requests: fire a second identical GET when the first is slower than the observed p95
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = 95  # Latency percentile after which the hedge is sent
+HEDGE_MIN_SAMPLES = 20  # Samples needed before trusting the percentile
+HEDGE_DEFAULT_DELAY = 0.5  # Seconds to wait before hedging while samples are scarce
+HEDGE_MIN_DELAY = 0.05  # Never hedge sooner than this
+HEDGE_MAX_RATIO = 0.1  # At most this share of eligible requests may be hedged
+
+# Shared HTTP client pool
+HTTP_POOL_LIMIT = 100  # Max open connections across all upstreams
+HTTP_POOL_LIMIT_PER_HOST = 20  # Max open connections per upstream host
+HTTP_DNS_CACHE_TTL = 300  # Seconds to cache DNS lookups
+HTTP_KEEPALIVE_TIMEOUT = 30  # Seconds to keep idle connections open
+HTTP_WARM_CONNECTIONS_PER_HOST = 2  # Connections opened to each upstream at startup
+HTTP_KEEP_WARM_INTERVAL = 25  # Seconds between keep-warm pings, under the keep-alive timeout (0 disables)
+
+# Local mirror of the Acme currency catalog, used to resolve known tokens without network calls
+ACME_CATALOG_PAGE_SIZE = 200  # Currencies fetched per page while syncing
+ACME_CATALOG_SYNC_INTERVAL = 60 * 10  # Seconds between catalog syncs (0 disables the mirror)
+ACME_CATALOG_SNAPSHOT_PATH = os.getenv("ACME_CATALOG_SNAPSHOT_PATH", "data/acme_catalog.json")  # Loaded at startup, rewritten after each sync
+
+# Token search over the catalog mirror and resolved tokens (/search and "did you mean" suggestions)
+SEARCH_PAGE_SIZE = 8  # Results per page of /search
+SEARCH_RESOLVED_MAXSIZE = 4096  # Tokens resolved outside the catalog kept searchable
+
+# Per-upstream rate limits: requests per second plus burst allowance
+RATE_LIMITS = {
+    "api.coingecko.com": {"rate": 0.5, "burst": 5},
+    "li.quest": {"rate": 2, "burst": 10},
+}
+RATE_LIMIT_MAX_WAIT = 2  # Max seconds a caller queues for a slot before falling back to cache
+MARKET_DATA_CACHE_TTL = 60  # Seconds CoinGecko prices and market caps are considered fresh
+COINGECKO_MAX_ADDRESSES_PER_REQUEST = int(os.getenv("COINGECKO_MAX_ADDRESSES_PER_REQUEST", 30))  # Contracts per /simple/token_price call
+COINGECKO_BATCH_WINDOW = 0.02  # Seconds concurrent market cap lookups wait to share one CoinGecko call
+LIFI_TOKEN_CACHE_TTL = 60 * 10  # Seconds LiFi token lookups are considered fresh
+TOKEN_CACHE_TTL = 60 * 30  # Seconds a resolved token (Acme record) is reused for repeated mentions
+TOKEN_CACHE_MAXSIZE = 4096  # Resolved tokens kept in memory, least recently used evicted first
+TOKEN_VALIDATION_CONCURRENCY = 4  # Requested tokens resolved and linked at the same time per update
+SPECULATIVE_RESOLUTION = os.getenv("SPECULATIVE_RESOLUTION", "false").lower() == "true"  # Start LiFi discovery alongside the Acme lookup
+SPECULATION_GRACE = 0.25  # Seconds Acme may still answer after LiFi has found a candidate
+REGISTRATION_BATCH_WINDOW = 0.1  # Seconds newly resolved tokens are collected before one registration call; new trading links for them wait this out
+REGISTRATION_MAX_BATCH = 50  # Tokens per create-or-update call
+NEGATIVE_TOKEN_CACHE_TTL = 60 * 2  # Seconds (up to twice this) a string that failed to resolve is not looked up again
+NEGATIVE_TOKEN_CACHE_CAPACITY = 50000  # Failed strings per Bloom filter generation (~90KB each at the error rate below)
+NEGATIVE_TOKEN_CACHE_ERROR_RATE = 0.001  # Chance a never-failed token is mistaken for a failed one
+RESPONSE_CACHE_MAX_BYTES = 8 * 1024 * 1024  # Memory budget for bodies kept for ETag/Last-Modified revalidation
+PROFILE_PHOTO_CACHE_TTL = 60 * 60 * 24  # Seconds a profile photo published from local mode is reused
+TRADING_LINK_TTL = 60 * 60 * 6  # Seconds a created trading link is reused for the same API key and token
+TRADING_LINK_MEMO_MAXSIZE = 20000  # Trading links kept, least recently used evicted first
+TRADING_LINK_MEMO_PATH = os.getenv("TRADING_LINK_MEMO_PATH", "data/trading_links.json")  # Survives restarts
+TRADING_LINK_MEMO_SAVE_INTERVAL = 60  # Seconds between snapshot writes while links have changed
+PAY_LINK_CACHE_TTL = 60 * 5  # Seconds a pay/request link is reused for repeated taps with the same details
+FEATURED_WARMUP_INTERVAL = 45  # Seconds between featured token refreshes, kept under MARKET_DATA_CACHE_TTL
+FEATURED_WARMUP_TIMEOUT = 20  # Max seconds startup waits for the featured tokens to be warmed
 
 # Define conversation states
 SELECT_TOKEN, SELECT_AMOUNT, SELECT_RECEIVER = range(3)
 
 # Global variables for valid and authenticated commands
-VALID_COMMANDS = {'trade', 'pay', 'request', 'share', 'top3', 'list', 'delist', 'vault', 'start', 'menu','logout','cancel','why_list','why_trade'}
+VALID_COMMANDS = {'trade', 'pay', 'request', 'share', 'top3', 'list', 'delist', 'vault', 'start', 'menu','logout','cancel','why_list','why_trade','search'}
 AUTHENTICATED_COMMANDS = {'pay', 'request', 'vault', 'list','top3','share','start','menu','trade'}
 # Define featured tokens for different intents
 
@@ -107,16 +194,37 @@ FEATURED_TOKENS_PAY = [
     {"DAI":"DAI"},
     {"USDT":"USDT"}
 ]
-# List of supported chain IDs
-SUPPORTED_CHAIN_IDS = {
-    '8453': 'base',                 # Base
-    '42161': 'arbitrum-one',        # Arbitrum One
-    '1151111081099710': 'solana'   # Solana
-}
+# Supported chains, loaded into the chain registry (utils/chains.py). `id` is LiFi's ID and the
+# canonical one; `acme_id` is what Acme calls the chain and `coingecko_platform` CoinGecko's platform ID.
+SUPPORTED_CHAINS = [
+    {"id": "8453", "name": "Base", "acme_id": "8453", "coingecko_platform": "base", "dex_aggregator": "LiFi", "vm": "evm"},
+    {"id": "42161", "name": "Arbitrum One", "acme_id": "42161", "coingecko_platform": "arbitrum-one", "dex_aggregator": "LiFi", "vm": "evm"},
+    {"id": "1151111081099710", "name": "Solana", "acme_id": "solana", "coingecko_platform": "solana", "dex_aggregator": "Jupiter", "vm": "svm"},
+]
 MAX_LISTED_TOKENS = 3  # Configurable value for maximum listed tokens
 
 LIFI_API_URL = "https://li.quest/v1"
 COINGECKO_API_URL = "https://api.coingecko.com/api/v3/coins/{token_id}"
+
+# Telegram Bot API endpoints. Point these at a self-hosted Bot API server and enable local mode
+# to get files as local paths instead of downloading them from api.telegram.org.
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL", "https://api.telegram.org/bot")
+TELEGRAM_BASE_FILE_URL = os.getenv("TELEGRAM_BASE_FILE_URL", "https://api.telegram.org/file/bot")
+TELEGRAM_LOCAL_MODE = os.getenv("TELEGRAM_LOCAL_MODE", "false").lower() == "true"
+
+# Upstream name per host, used to pick retry policies and other per-upstream settings
+UPSTREAM_HOSTS = {
+    urlsplit(ACME_URL).hostname: "acme",
+    urlsplit(LIFI_API_URL).hostname: "lifi",
+    "api.coingecko.com": "coingecko",
+    "api.cloudflare.com": "cloudflare",
+    urlsplit(TELEGRAM_BASE_URL).hostname: "telegram",
+}
+# Origins pre-warmed at startup. Telegram isn't listed: the bot uses its own client, warmed by set_webhook.
+WARMUP_ORIGINS = [
+    f"{parts.scheme}://{parts.netloc}"
+    for parts in map(urlsplit, (ACME_URL, LIFI_API_URL, "https://api.coingecko.com", "https://api.cloudflare.com"))
+]
 logger.info("Configuration successfully loaded and validated.")
 
 PHOTO_COYOTE_BANANA = "https://imagedelivery.net/P5lw0bNFpEj9CWud4zMJgQ/895a84b1-67b5-42e5-6fb1-b937d1151600/public"
@@ -1,3 +1,4 @@
+import aiohttp
 from config import logger
 from telegram import Update
 from telegram.ext import ConversationHandler, ContextTypes
@@ -5,20 +6,37 @@ from config import AUTHENTICATED_COMMANDS
 from actions.menu import process_menu
 from actions.trade import process_trade
 from actions.list import process_list
-from utils.reply import send_why_trade, send_why_list, send_loading_message
+from actions.pay import process_pay, process_request
+from actions.search import process_search
+from utils.reply import send_why_trade, send_why_list, send_loading_message, clear_cache
 
 from utils.getAcmeProfile import process_user_top3
 from handlers.auth_handler import is_authenticated, login_card, store_auth_result, get_auth_result, get_user_top3
 from handlers.token_handler import handle_token
-from handlers.receiver_handler import handle_receiver
+from handlers.receiver_handler import handle_receiver, handle_pay_receiver
+from handlers.amount_handler import handle_amount
 import time
-from config import SELECT_TOKEN, SELECT_RECEIVER, SELECT_AMOUNT
+from config import SELECT_TOKEN, SELECT_RECEIVER, SELECT_AMOUNT, UPDATE_DEADLINE
+from utils.deadline import update_deadline, time_left
+from utils.tradingLinkMemo import TRADING_LINK_MEMO
 
 async def route_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """
     Routes the action based on the user's intent, handling authentication,
     token, receiver, and amount validation, then executing the action.
+
+    The whole chain runs under one UPDATE_DEADLINE: upstream helpers cap their
+    timeouts to the time left and stop retrying once it runs out, so a slow
+    upstream degrades the reply instead of stalling it.
     """
+    with update_deadline(UPDATE_DEADLINE):
+        state = await _route_action(update, context)
+        if time_left() < 0:
+            logger.warning(f"User {update.effective_user.id} - Update overran its {UPDATE_DEADLINE}s deadline.")
+        return state
+
+
+async def _route_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     intent = context.user_data.get('intent')
     tokens = context.user_data.get('tokens')
     # Get chat type (private, group, supergroup)
@@ -40,6 +58,8 @@ async def route_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         return await send_why_trade(update, context)
     elif intent == 'why_list':
         return await send_why_list(update, context)
+    elif intent == 'search':
+        return await process_search(update, context)
     elif intent in {'logout', 'start', 'menu', 'cancel'}:
         return await handle_special_intents(update, context, intent)
 
@@ -98,6 +118,10 @@ async def handle_special_intents(update, context, intent):
     """Handles 'logout', 'start', 'menu', or 'cancel' intents."""
     logger.info(f"User {update.effective_user.id} - Initiated {intent} action, clearing data and routing to menu.")
     if intent == 'logout':
+        # Links created with the user's API key aren't reused after they log out
+        auth_result = await get_auth_result(update, context)
+        if auth_result and auth_result.get('api_key'):
+            TRADING_LINK_MEMO.invalidate(api_key=auth_result['api_key'])
         context.user_data.clear()  # Clear all data on logout
     context.user_data['intent'] = 'menu'
     return await process_menu(update, context)
@@ -194,23 +218,22 @@ async def handle_payment_intents(update, context, intent):
     """Handles 'pay' and 'request' intents with validation."""
     logger.info(f"User {update.effective_user.id} - Handling {intent} intent.")
 
-    # Token validation
-    if 'token' in context.user_data:
-        state = await handle_token(update, context)
-        if state == SELECT_TOKEN:
-            return state
+    # Token validation; payments don't use trading links, so tokens are only resolved
+    state = await handle_token(update, context, with_links=False)
+    if state == SELECT_TOKEN:
+        return state
+    if state == ConversationHandler.END:
+        return await clear_cache(update, context)
 
-    # Receiver validation
-    if 'receiver' in context.user_data:
-        state = await handle_receiver(update, context)
+    # Receiver validation (requests are paid by anyone, so only 'pay' needs one)
+    if intent == 'pay':
+        state = await handle_pay_receiver(update, context)
         if state == SELECT_RECEIVER:
             return state
 
     # Amount validation
-    if 'amount' not in context.user_data:
-        state = await handle_amount(update, context)
-        if state == SELECT_AMOUNT:
-            return state
+    state = await handle_amount(update, context)
+    if state == SELECT_AMOUNT:
+        return state
 
-    await process_pay(update, context) if intent == 'pay' else await process_request(update, context)
-    return ConversationHandler.END
\ No newline at end of file
+    return await process_pay(update, context) if intent == 'pay' else await process_request(update, context)
\ No newline at end of file
@@ -1,6 +1,10 @@
-from config import logger
+from config import logger, SELECT_AMOUNT
 from telegram import Update
 from telegram.ext import ContextTypes
+from utils.reply import send_message, delete_loading_message
+from messages_photos import markdown_v2
+
+ASK_AMOUNT = "*⌨️ TYPE AMOUNT TO {intent}:*\n`Ex: 25`"
 
 # Parse and validate the amount
 def parse_amount(amount_text: str) -> float:
@@ -8,30 +12,26 @@ def parse_amount(amount_text: str) -> float:
     Parse and validate the amount from user input.
     """
     try:
-        amount = float(amount_text.strip())
-        return amount
+        amount = float(str(amount_text).strip())
+        return amount if amount > 0 else None
     except ValueError:
         return None
 
 # Handler for collecting amount
 async def handle_amount(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """
-    Handles the user's amount input and proceeds to execute the action.
+    Validate the amount stored by extract_input, prompting for one if it is missing or invalid.
     """
-    amount_text = update.message.text
-    amount = parse_amount(amount_text)
+    amount_text = context.user_data.get('amount')
+    amount = parse_amount(amount_text) if amount_text is not None else None
 
     if amount is not None:  # Valid amount input
-        context.user_data['amount'] = amount
-        logger.info(f"Amount received: {amount}")
+        logger.info(f"Amount received: {amount_text}")
+        return True
 
-        # Check if receiver is already provided
-        if 'receiver' in context.user_data:
-            return await execute_action(update, context)  # Proceed to execute action
-        else:
-            await update.message.reply_text("Please provide the receiver address:")
-            return SELECT_RECIPIENT  # Prompt for receiver
-    else:
-        logger.debug("Invalid amount entered.")
-        await update.message.reply_text("Please enter a valid amount:")
-        return SELECT_AMOUNT  # Prompt for amount
\ No newline at end of file
+    logger.debug("Missing or invalid amount, prompting the user.")
+    context.user_data['amount'] = None
+    intent = (context.user_data.get('intent') or 'pay').upper()
+    await delete_loading_message(update, context)
+    await send_message(update, context, markdown_v2(ASK_AMOUNT.format(intent=intent)))
+    return SELECT_AMOUNT
@@ -1,18 +1,19 @@
 import os
 import json
 import aiohttp
-import asyncio
 from datetime import datetime, timedelta
-from typing import Optional
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, WebAppInfo, Bot
 from telegram.ext import ContextTypes, ConversationHandler
-from config import CLAIM_PASS, START_EXCHANGE, logger, URL, AUTH_EXPIRATION, ACME_URL, ACME_API_KEY, ACME_ENCRYPTION_KEY, FEATURES, DEFAULT_TIMEOUT, RETRY_COUNT, PHOTO_COYOTE_START, PHOTO_COYOTE_COOK
+from config import CLAIM_PASS, START_EXCHANGE, logger, URL, AUTH_EXPIRATION, ACME_URL, ACME_API_KEY, ACME_ENCRYPTION_KEY, FEATURES, PHOTO_COYOTE_START, PHOTO_COYOTE_COOK
 from messages_photos import markdown_v2
 from utils.apiHelpers import get_acme_api_key, api_get_with_retries, api_post_with_retries
 from utils.reply import send_message, send_animation, send_error_message, delete_loading_message
 from utils.profilePhoto import fetch_user_profile_photo
+from utils.httpClient import upstream_request
+from utils.chains import CHAINS
+from utils.tokenRecord import TokenRecord
 
 LOGIN = START_EXCHANGE + FEATURES + CLAIM_PASS
 
@@ -35,7 +36,7 @@ async def login_card(update: Update, context: ContextTypes.DEFAULT_TYPE, auth_re
     intent = context.user_data.get('intent', None)
     tokens = context.user_data.get('tokens', [])
     # Extract token names from the dictionaries and join them
-    tokens_text = ', '.join(token.get('name', '').upper() for token in tokens if isinstance(token, dict))  
+    tokens_text = ', '.join(token.get('name', '').upper() for token in tokens if isinstance(token, (dict, TokenRecord)))  
     menu_message = LOGIN.format(intent=intent, tokens=tokens_text)
 
     photo_url = PHOTO_COYOTE_START
@@ -192,20 +193,16 @@ async def create_auth_link(context, tg_key: str) -> dict:
 
     #logger.debug(f"AUTH REQUEST: {url}, {headers}, {payload}")
 
-    # Retry logic with `RETRY_COUNT`
-    for attempt in range(RETRY_COUNT):
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)) as session:
-            try:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    response.raise_for_status()  # Raise an error for HTTP error responses
-                    return await response.json()  # Return the response as JSON
-
-            except asyncio.TimeoutError:
-                logger.error(f"Attempt {attempt + 1}: Request to authentication API timed out.")
-            except aiohttp.ClientError as e:
-                logger.error(f"Attempt {attempt + 1}: Failed to call authentication API: {e}")
-            except Exception as e:
-                logger.error(f"Unexpected error on attempt {attempt + 1}: {str(e)}")
+    # Retries follow the Acme retry policy
+    try:
+        response = await upstream_request("POST", url, headers=headers, json=payload)
+        if response.ok:
+            return response.json()  # Return the response as JSON
+        logger.error(f"Authentication API returned status {response.status}.")
+    except aiohttp.ClientError as e:
+        logger.error(f"Failed to call authentication API: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error calling authentication API: {str(e)}")
 
     # Log final failure after exhausting retries
     logger.error("Failed to create auth link after multiple attempts.")
@@ -399,7 +396,7 @@ async def get_auth_result(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Retrieve and validate the stored auth result for the user."""
     user_tg_id = update.effective_user.id
     data = context.bot_data.get(user_tg_id)
-    logger.debug(f"Retrieved auth result for user {user_tg_id}: {data and "auth" in data and data["expires_at"] > datetime.now()}")
+    logger.debug(f"Retrieved auth result for user {user_tg_id}: {data and 'auth' in data and data['expires_at'] > datetime.now()}")
     if data and "auth" in data and data["expires_at"] > datetime.now():
         return data["auth"]
 
@@ -413,7 +410,7 @@ async def get_featured_tokens(update, context):
     url = f"{ACME_URL}/dev/intent/get-featured-tg-purchase-links"
     headers = {'X-API-KEY': api_key}
 
-    return await api_get_with_retries(url, headers)
+    return await api_get_with_retries(url, headers, cache=True)
 
 async def set_featured_tokens(update, context, intent_ids, reset_featured=True):
     """Set featured tokens in the Acme API."""
@@ -435,8 +432,8 @@ async def get_user_top3(update, context):
         logger.info("Retrieved top 3 tokens from context for user %s", user_id)
         return user_data["top3"]
 
-    # Fetch from API if not available or expired
-    top3_tokens = await get_featured_tokens(update, context)
+    # Fetch from API if not available or expired; users with the same top 3 share its records
+    top3_tokens = [CHAINS.token_record(token) for token in await get_featured_tokens(update, context) or []]
     user_data["top3"] = top3_tokens  # Set the new top 3 tokens
     context.bot_data[user_id] = user_data
     return top3_tokens
@@ -455,15 +452,12 @@ async def store_user_top3(update: Update, context: ContextTypes.DEFAULT_TYPE, to
         logger.debug(f"Existing top 3 tokens: {existing_top3}")
         logger.debug(f"Entered top 3 tokens: {top3_tokens}")
 
-        # Combine and deduplicate tokens based on 'tokenAddress' and 'chainId'
-        combined_top3_dict = {
-            f"{token.get('tokenAddress')}_{token.get('chainId')}": token for token in existing_top3
-        }
+        # Combine and deduplicate tokens on their normalized chain and address
+        combined_top3_dict = {CHAINS.token_identity(token): token for token in existing_top3}
 
         # Update with new tokens (overwriting duplicates)
         for token in top3_tokens:
-            key = f"{token.get('address')}_{token.get('chainId')}"
-            combined_top3_dict[key] = token
+            combined_top3_dict[CHAINS.token_identity(token)] = token
 
         # Convert back to list and keep only the latest 3 tokens
         combined_top3 = list(combined_top3_dict.values())[-3:]
@@ -2,6 +2,7 @@ from config import logger
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo, InputFile
 from telegram.ext import ConversationHandler, ContextTypes
 from config import *
+from utils.tokenRecord import TokenRecord
 
 # Main Handler: Routes commands to route_action or menu
 async def input_to_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -80,11 +81,11 @@ async def update_user_data(context: ContextTypes.DEFAULT_TYPE, new_tokens: list,
 
     # Deduplicate tokens based on 'symbol' key, if available
     existing_tokens = {token['symbol']: token for token in context.user_data["tokens"]
-                       if isinstance(token, dict) and 'symbol' in token}
+                       if isinstance(token, (dict, TokenRecord)) and 'symbol' in token}
 
     # Update or add new tokens
     for token in new_tokens:
-        if isinstance(token, dict) and 'symbol' in token:
+        if isinstance(token, (dict, TokenRecord)) and 'symbol' in token:
             existing_tokens[token['symbol']] = token  # Update existing or add new token by symbol
         else:
             existing_tokens[token] = token  # Non-dict tokens stored directly by value
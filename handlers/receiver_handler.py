@@ -1,7 +1,7 @@
 from config import logger, SELECT_RECEIVER
 from telegram import Update
 from telegram.ext import ContextTypes
-from utils.getAcmeProfile import validate_user_and_tokens
+from utils.getAcmeProfile import validate_user_and_tokens, get_acme_public_profile
 from utils.tokenValidator import validate_tokens
 from utils.reply import delete_loading_message
 
@@ -32,6 +32,24 @@ async def process_receiver(update: Update, context: ContextTypes.DEFAULT_TYPE, r
     return True
 
 
+async def handle_pay_receiver(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Resolve the receiver of a payment to their Acme profile. Unlike trades, no listed tokens are needed."""
+    receiver = context.user_data.get("receiver")
+    if isinstance(receiver, dict):
+        return True  # Already resolved on a previous step of the flow
+
+    if not receiver:
+        return await prompt_for_receiver(update, context)
+
+    acme_user_data = await get_acme_public_profile(receiver)
+    if not acme_user_data or not acme_user_data.get('id'):
+        context.user_data['receiver'] = None
+        return await prompt_for_receiver(update, context, "User is not on Acme yet.")
+
+    context.user_data['receiver'] = acme_user_data
+    return True
+
+
 async def prompt_for_receiver(update: Update, context: ContextTypes.DEFAULT_TYPE, error_message=None) -> int:
     """Prompt the user to enter a receiver username."""
     message = "Please enter the receiver's username."
@@ -2,6 +2,7 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes, ConversationHandler
 from utils.reply import send_photo, say_hi_button, delete_loading_message
 from utils.tokenValidator import validate_tokens
+from utils.tokenSearch import TOKEN_SEARCH_INDEX
 from utils. getAcmeProfile import validate_user_and_tokens
 from actions.list import process_list
 from handlers.auth_handler import store_user_top3
@@ -34,13 +35,28 @@ ASK_LIST = """
 `Solana, Base, Arbitrum`
 """
 
+ASK_PAY = """
+*⌨️ TYPE TOKEN TO {intent}:*  
+`Ex: USDC / 0x8335...`
+
+🌐 _Supported Chains:_
+`Solana, Base, Arbitrum`
+"""
+
 # Define the message outside the function
 NOT_LISTED = "🚫 *{tokens_text}* {verb} not available. Message us to request listing."
+DID_YOU_MEAN = "\n\n🤔 Did you mean one of these?"
+MAX_SUGGESTIONS = 3
 
 PHOTO_TOP3 = "https://imagedelivery.net/P5lw0bNFpEj9CWud4zMJgQ/455f9727-a972-495d-162e-150f67c3e500/public"
 
-async def handle_token(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Main handler to process the token input and route based on intent."""
+async def handle_token(update: Update, context: ContextTypes.DEFAULT_TYPE, with_links: bool = True) -> int:
+    """
+    Main handler to process the token input and route based on intent.
+
+    Pass `with_links=False` when the flow doesn't use trading links (pay and request),
+    so tokens are only resolved.
+    """
 
     user_tg_username = update.effective_user.username
 
@@ -54,8 +70,9 @@ async def handle_token(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         logger.warning("No token input provided by user: %s", update.effective_user.id)
         return await prompt_for_token(update, context)
 
-    # Validate tokens
-    valid_tokens, invalid_tokens = await validate_tokens(requested_tokens, update, context)
+    # Validate tokens; in groups, words in a message only reach the upstreams if they're known tokens, $cashtags or addresses
+    in_group = update.effective_chat is not None and update.effective_chat.type in ("group", "supergroup")
+    valid_tokens, invalid_tokens = await validate_tokens(requested_tokens, update, context, with_links, known_only=in_group)
     logger.debug("Validation result - Invalid tokens: %s", invalid_tokens)
 
     # Handle invalid tokens if any
@@ -109,8 +126,10 @@ async def prompt_for_token(update: Update, context: ContextTypes.DEFAULT_TYPE, i
         )
         featured_tokens = FEATURED_TOKENS_TRADE
         why_button = InlineKeyboardButton("Learn More", callback_data='/why_trade')
-    elif user_intent == 'pay':
-        template = ASK_PAY
+    elif user_intent in ['pay', 'request']:
+        template = ASK_PAY.format(
+            intent = user_intent.upper()
+        )
         featured_tokens = FEATURED_TOKENS_PAY
         why_button = InlineKeyboardButton("Learn More", callback_data='/why_pay')
     else:
@@ -152,7 +171,17 @@ async def handle_invalid_tokens(update: Update, context: ContextTypes.DEFAULT_TY
     """Handles invalid tokens by sending a warning and prompting for a listing request."""
     invalid_tokens_text = ", ".join(token.replace("_", r"\_") for token in invalid_tokens).upper()
     verb = "is" if len(invalid_tokens) == 1 else "are"
-    caption = markdown_v2(NOT_LISTED.format(tokens_text=invalid_tokens_text, verb=verb))
+    # Suggest known tokens close to what was typed, answered from the local search index
+    suggestions = []
+    for token in invalid_tokens:
+        if isinstance(token, str):
+            suggestions += [symbol for symbol in TOKEN_SEARCH_INDEX.suggest(token) if symbol not in suggestions]
+    suggestions = suggestions[:MAX_SUGGESTIONS]
+
+    message = NOT_LISTED.format(tokens_text=invalid_tokens_text, verb=verb)
+    if suggestions:
+        message += DID_YOU_MEAN
+    caption = markdown_v2(message)
     photo_url = PHOTO_COYOTE_COOK  # Replace with your actual image URL
 
     logger.warning(f"Invalid token(s) entered: {invalid_tokens_text}")
@@ -162,6 +191,8 @@ async def handle_invalid_tokens(update: Update, context: ContextTypes.DEFAULT_TY
         [InlineKeyboardButton("👋 Request Listing", url=context.user_data.get('invite_link', 'https://t.me/acmeonetap'))],
         [InlineKeyboardButton("🔄 Try Again", callback_data=f"/{intent}")]
     ]
+    if suggestions:
+        buttons.insert(0, [InlineKeyboardButton(symbol, callback_data=f"/{intent} {symbol}") for symbol in suggestions])
 
     await delete_loading_message(update, context)
     # Send the photo to the user with the caption and buttons
@@ -1,4 +1,5 @@
 import json
+import time
 import random
 import datetime
 from http import HTTPStatus
@@ -19,15 +20,41 @@ from telegram.ext import (
 )
 from handlers.input_handler import input_to_action
 from utils.webhook import set_acme_webhook, process_acme_payload, AcmeWebhookUpdate, AcmeContext, webhook_handler
+from utils.httpClient import init_http_client, close_http_client, warm_up_connections, keep_connections_warm
+from utils.metrics import collect_metrics
+from utils.codec import loads
+from utils.acmeCatalog import ACME_CATALOG, keep_catalog_synced
+from utils.tradingLinkMemo import TRADING_LINK_MEMO, keep_trading_links_saved
+from utils.featuredTokens import warm_featured_tokens, keep_featured_tokens_warm
+
+async def set_telegram_webhook(application) -> None:
+    """Register the Telegram webhook, reporting how long the round trip took."""
+    try:
+        logger.info(f"Setting webhook for URL: {URL}/telegram with all update types.")
+        started = time.monotonic()
+        await application.bot.set_webhook(url=f"{URL}/telegram", allowed_updates=Update.ALL_TYPES)
+        logger.info(f"Telegram Webhook successfully set in {time.monotonic() - started:.3f}s.")
+    except Exception as e:
+        logger.error(f"Failed to set webhook. Error: {e}")
 
 # Main function to set up the bot
 async def main():
     logger.debug("Starting main setup function.")
     
     try:
-        # Replace 'YOUR_TOKEN' with your actual bot token
-        application = ApplicationBuilder().token(BOT_TOKEN).build()
-        logger.info("Bot application built successfully.")
+        # Shared HTTP client used by every upstream helper
+        await init_http_client()
+
+        # Bot API endpoints are configurable so a self-hosted Bot API server can be used
+        application = (
+            ApplicationBuilder()
+            .token(BOT_TOKEN)
+            .base_url(TELEGRAM_BASE_URL)
+            .base_file_url(TELEGRAM_BASE_FILE_URL)
+            .local_mode(TELEGRAM_LOCAL_MODE)
+            .build()
+        )
+        logger.info(f"Bot application built successfully (Bot API: {TELEGRAM_BASE_URL}, local mode: {TELEGRAM_LOCAL_MODE}).")
 
         # Define the conversation handler
         conv_handler = ConversationHandler(
@@ -53,19 +80,23 @@ async def main():
         application.add_handler(TypeHandler(AcmeWebhookUpdate, webhook_handler))
         logger.info("Conversation handler added to application.")
 
-        # Pass webhook settings to telegram and acme
-        try:
-            logger.info(f"Setting webhook for URL: {URL}/telegram with all update types.")
-            await application.bot.set_webhook(url=f"{URL}/telegram", allowed_updates=Update.ALL_TYPES)
-            logger.info("Telegram Webhook successfully set.")
-        except Exception as e:
-            logger.error(f"Failed to set webhook. Error: {e}")
-
-        logger.debug("Setting ACME webhook.")
-        await set_acme_webhook()
+        # Serve known tokens from the last snapshot right away; featured tokens resolve from it too
+        if ACME_CATALOG_SYNC_INTERVAL:
+            ACME_CATALOG.load_snapshot(ACME_CATALOG_SNAPSHOT_PATH)
+        TRADING_LINK_MEMO.load_snapshot(TRADING_LINK_MEMO_PATH)
+
+        # Pass webhook settings to telegram and acme while warming connections and featured tokens
+        logger.debug("Setting webhooks and warming upstream connections and featured tokens.")
+        await asyncio.gather(
+            warm_up_connections(WARMUP_ORIGINS),
+            set_telegram_webhook(application),
+            set_acme_webhook(),
+            warm_featured_tokens(timeout=FEATURED_WARMUP_TIMEOUT),
+        )
 
     except Exception as e:
         logger.error(f"Error during bot and webhook setup: {str(e)}")
+        await close_http_client()
         return
 
     # Set up webserver
@@ -79,12 +110,20 @@ async def main():
         response.mimetype = "text/plain"
         return response
 
+    @flask_app.get("/metrics")  # type: ignore[misc]
+    async def metrics() -> Response:
+        """Expose rate limiter, cache and upstream stats as JSON for inspection."""
+        response = make_response(json.dumps(collect_metrics(), default=str), HTTPStatus.OK)
+        response.mimetype = "application/json"
+        return response
+
     @flask_app.post("/telegram")  # type: ignore[misc]
     async def telegram() -> Response:
         """Handle incoming Telegram updates by putting them into the update_queue"""
         logger.debug("Received a new Telegram update.")
         try:
-            await application.update_queue.put(Update.de_json(data=request.json, bot=application.bot))
+            # Decode the raw body once with the fast codec instead of going through request.json
+            await application.update_queue.put(Update.de_json(data=loads(request.get_data()), bot=application.bot))
             logger.info("Telegram update processed successfully.")
             return Response(status=HTTPStatus.OK)
         except Exception as e:
@@ -97,7 +136,7 @@ async def main():
 
         # Step 1: Validate and Process the Payload
         try:
-            _message = request.json
+            _message = loads(request.get_data() or b"null")
             _signature = request.headers.get("acme-signature")
 
             logger.debug(f"Received Acme payload: {_message}")
@@ -128,7 +167,7 @@ async def main():
         logger.info("Acme update processed successfully")
         return Response(status=HTTPStatus.OK)
 
-    
+    keep_warm = catalog_sync = links_saver = featured_warm = None
     try:
         logger.debug("Starting webserver with Uvicorn.")
         webserver = uvicorn.Server(
@@ -140,6 +179,21 @@ async def main():
             )
         )
 
+        # Keep the pre-warmed connections from hitting the keep-alive timeout
+        if HTTP_KEEP_WARM_INTERVAL:
+            keep_warm = asyncio.ensure_future(keep_connections_warm(WARMUP_ORIGINS, HTTP_KEEP_WARM_INTERVAL))
+
+        # Keep the catalog mirror in sync
+        if ACME_CATALOG_SYNC_INTERVAL:
+            catalog_sync = asyncio.ensure_future(keep_catalog_synced(ACME_CATALOG_SYNC_INTERVAL, ACME_CATALOG_SNAPSHOT_PATH))
+
+        # Save trading links so they are reused after a restart
+        links_saver = asyncio.ensure_future(keep_trading_links_saved(TRADING_LINK_MEMO_SAVE_INTERVAL, TRADING_LINK_MEMO_PATH))
+
+        # Keep featured tokens' market data fresh so featured flows never wait on an upstream
+        if FEATURED_WARMUP_INTERVAL:
+            featured_warm = asyncio.ensure_future(keep_featured_tokens_warm(FEATURED_WARMUP_INTERVAL))
+
         # Run application and webserver together
         async with application:
             await application.start()
@@ -151,6 +205,16 @@ async def main():
 
     except Exception as e:
         logger.error(f"Error during webserver or application lifecycle: {str(e)}")
+    finally:
+        for task in (keep_warm, catalog_sync, links_saver, featured_warm):
+            if task:
+                task.cancel()
+        if TRADING_LINK_MEMO.dirty:
+            try:
+                TRADING_LINK_MEMO.save_snapshot(TRADING_LINK_MEMO_PATH)
+            except OSError as e:
+                logger.error(f"Could not write trading link snapshot: {e}")
+        await close_http_client()
 
 if __name__ == "__main__":
     logger.info("Bot is starting up.")
@@ -0,0 +1,54 @@
+import os
+import sys
+
+# config reads these at import time and exits if they are missing
+for name, value in {
+    "DEV_URL": "https://bot.example", "DEV_BOT_TOKEN": "1:test", "DEV_ACME_GROUP": "group",
+    "PORT": "8000", "ADMIN_CHAT_ID": "1",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from utils import circuitBreaker, httpClient  # noqa: E402
+from utils.httpClient import UpstreamResponse  # noqa: E402
+
+
+def response(status: int, body: bytes = b"", headers: dict = None) -> UpstreamResponse:
+    return UpstreamResponse(status=status, headers=headers or {}, body=body, url="")
+
+
+class ScriptedUpstream:
+    """
+    Stands in for the network send under upstream_request.
+
+    Each attempt takes the next answer: an UpstreamResponse, an exception to
+    raise, or a coroutine function whose result (or exception) is used.
+    """
+
+    def __init__(self):
+        self.answers = []
+        self.calls = []
+
+    async def send(self, method, url, timeout, **kwargs):
+        self.calls.append({"method": method, "url": url, "timeout": timeout, **kwargs})
+        answer = self.answers.pop(0)
+        if callable(answer):
+            answer = await answer()
+        if isinstance(answer, BaseException):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def scripted_upstream(monkeypatch):
+    """Script upstream_request's attempts, with fresh circuit breakers."""
+    upstream = ScriptedUpstream()
+    monkeypatch.setattr(httpClient, "_send", upstream.send)
+    for name, breaker in circuitBreaker.CIRCUIT_BREAKER_REGISTRY.items():
+        monkeypatch.setitem(circuitBreaker.CIRCUIT_BREAKER_REGISTRY, name, circuitBreaker.CircuitBreaker(
+            name, breaker.failure_threshold, breaker.recovery_timeout, breaker.half_open_max_calls
+        ))
+    return upstream
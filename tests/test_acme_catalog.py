@@ -0,0 +1,59 @@
+from utils import tokenSearch
+from utils.acmeCatalog import AcmeCatalog
+from utils.codec import decode_acme_currency
+from utils.tokenSearch import TokenSearchIndex
+
+PONKE = {"id": "cur_ponke", "symbol": "PONKE", "name": "Ponke", "address": "5z3EqYQo9HiCEs3R84RCDMu2n7anpDMxRhdK8PSWmrRC",
+         "chainId": "solana", "decimals": 9}
+
+
+def test_identical_reupsert_keeps_the_currency():
+    catalog = AcmeCatalog()
+    catalog.add(PONKE)
+    catalog.add(PONKE)
+
+    assert len(catalog) == 1
+    assert catalog.lookup("PONKE").id == "cur_ponke"
+    assert catalog.lookup(PONKE["address"]).id == "cur_ponke"
+
+
+def test_changed_symbol_drops_the_old_key():
+    catalog = AcmeCatalog()
+    catalog.add(PONKE)
+    catalog.add(dict(PONKE, symbol="PONK"))
+
+    assert catalog.lookup("PONKE") is None
+    assert catalog.lookup("PONK").symbol == "PONK"
+    assert catalog.lookup(PONKE["address"]).symbol == "PONK"
+
+
+def test_update_keeps_catalog_order():
+    catalog = AcmeCatalog()
+    catalog.add(dict(PONKE, id="cur_first", address="0x" + "11" * 20))
+    catalog.add(PONKE)
+    catalog.add(dict(PONKE, id="cur_first", address="0x" + "11" * 20, name="Renamed"))
+
+    assert catalog.lookup("PONKE").name == "Renamed"
+
+
+def test_search_index_applies_upserts_without_rebuilding(monkeypatch):
+    catalog = AcmeCatalog()
+    catalog.replace([decode_acme_currency(PONKE)])
+    monkeypatch.setattr(tokenSearch, "ACME_CATALOG", catalog)
+    rebuilds = []
+    currencies = catalog.currencies
+    monkeypatch.setattr(catalog, "currencies", lambda: rebuilds.append(1) or currencies())
+    index = TokenSearchIndex()
+
+    assert index.prefix("PON") == ["PONKE"]
+    catalog.add(dict(PONKE, id="cur_popcat", symbol="POPCAT", name="Popcat", address="0x" + "22" * 20))
+    catalog.add(dict(PONKE, id="cur_brett", symbol="BRETT", name="Brett", address="0x" + "33" * 20))
+
+    assert index.prefix("PO") == ["PONKE", "POPCAT"]
+    assert index.suggest("BRET") == ["BRETT"]
+    assert len(rebuilds) == 1
+
+    # A sync swapping in a new catalog rebuilds once
+    catalog.replace([decode_acme_currency(PONKE)])
+    assert index.prefix("PO") == ["PONKE"]
+    assert len(rebuilds) == 2
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from config import ACME_URL
+from conftest import response
+from utils import circuitBreaker
+from utils.circuitBreaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from utils.httpClient import upstream_request
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the test moves by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(circuitBreaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=10)
+    breaker.record_failure(), breaker.record_failure()
+    breaker.record_success()  # Resets the count
+    breaker.record_failure(), breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.is_open
+
+    clock[0] += 4
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_request()
+    assert excinfo.value.retry_in == pytest.approx(6)
+    assert breaker.rejected == 1
+
+
+def test_half_open_allows_limited_trials(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=10, half_open_max_calls=2)
+    open_breaker(breaker)
+    clock[0] += 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN and not breaker.is_open
+
+    assert breaker.allow_request() and breaker.allow_request()
+    assert breaker.is_open  # Both trials are out
+    assert not breaker.allow_request()
+
+
+def test_successful_trial_closes_the_circuit(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=10)
+    open_breaker(breaker)
+    clock[0] += 10
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_trial_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, recovery_timeout=10)
+    open_breaker(breaker)
+    clock[0] += 10
+    breaker.before_request()
+    breaker.record_failure()  # One failure is enough while half-open
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+
+    clock[0] += 9.9
+    assert breaker.state == CircuitBreaker.OPEN  # Recovery counts from the reopening
+
+
+def test_release_gives_the_trial_back(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=10)
+    open_breaker(breaker)
+    clock[0] += 10
+    breaker.before_request()
+    breaker.release()  # Neither a success nor an upstream failure
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_open_circuit_fails_fast_without_calling_the_upstream(scripted_upstream):
+    open_breaker(get_circuit_breaker("acme"))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(upstream_request("GET", f"{ACME_URL}/test"))
+    assert scripted_upstream.calls == []
+
+
+def test_failures_through_upstream_request_open_the_circuit(scripted_upstream):
+    breaker = get_circuit_breaker("acme")
+    scripted_upstream.answers = [response(503)] * breaker.failure_threshold
+    for _ in range(breaker.failure_threshold):
+        asyncio.run(upstream_request("GET", f"{ACME_URL}/test", retry=False))
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_final_status_counts_as_success(scripted_upstream):
+    breaker = get_circuit_breaker("acme")
+    breaker.record_failure()
+    scripted_upstream.answers = [response(404)]
+    asyncio.run(upstream_request("GET", f"{ACME_URL}/test", retry=False))
+    assert breaker.stats()["consecutive_failures"] == 0
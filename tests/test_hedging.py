@@ -0,0 +1,105 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import pytest
+
+from config import ACME_URL
+from conftest import response
+from utils import hedging, httpClient
+from utils.hedging import HedgeBudget, hedge_delay
+from utils.httpClient import UpstreamError, upstream_request
+from utils.latencyStats import get_latency_window
+
+URL = f"{ACME_URL}/checkout/currency/get-all-currencies"
+
+
+@pytest.fixture
+def hedged(monkeypatch, scripted_upstream):
+    """Hedging on, a 20ms hedge delay and fresh budgets."""
+    monkeypatch.setattr(httpClient, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(httpClient, "hedge_delay", lambda key: 0.02)
+    monkeypatch.setattr(hedging, "HEDGE_BUDGETS", {})
+    return scripted_upstream
+
+
+def budget() -> HedgeBudget:
+    return hedging.HEDGE_BUDGETS[f"acme {urlsplit(URL).path}"]
+
+
+def answer(status: int, after: float, cancelled: list = None):
+    async def send():
+        try:
+            await asyncio.sleep(after)
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.append(status)
+            raise
+        return response(status, body=str(status).encode())
+    return send
+
+
+def test_budget_caps_hedges_to_a_share_of_eligible_requests():
+    hedge_budget = HedgeBudget(max_ratio=0.1)
+    for _ in range(20):
+        hedge_budget.note_eligible()
+    assert sum(hedge_budget.try_acquire() for _ in range(10)) == 3  # 10% of 20, plus one of slack
+    assert hedge_budget.stats()["hedge_rate"] == 0.15
+
+
+def test_delay_falls_back_to_the_default_until_there_are_enough_samples(monkeypatch):
+    monkeypatch.setattr(hedging, "HEDGE_MIN_SAMPLES", 5)
+    key = "test /hedge-delay"
+    assert hedge_delay(key) == hedging.HEDGE_DEFAULT_DELAY
+    for seconds in (0.1, 0.2, 0.3, 0.4, 0.5):
+        get_latency_window(key).record(seconds)
+    assert hedge_delay(key) == 0.5
+    monkeypatch.setattr(hedging, "HEDGE_PERCENTILE", 1)
+    monkeypatch.setattr(hedging, "HEDGE_MIN_DELAY", 0.15)
+    assert hedge_delay(key) == 0.15
+
+
+def test_fast_primary_is_not_hedged(hedged):
+    hedged.answers = [answer(200, 0)]
+    assert asyncio.run(upstream_request("GET", URL, hedge=True)).status == 200
+    assert len(hedged.calls) == 1
+    assert budget().hedged == 0
+
+
+def test_hedge_wins_over_a_slow_primary_and_cancels_it(hedged):
+    cancelled = []
+    hedged.answers = [answer(201, 1, cancelled), answer(200, 0, cancelled)]
+    assert asyncio.run(upstream_request("GET", URL, hedge=True)).status == 200
+    assert cancelled == [201]
+    assert budget().wins == 1
+
+
+def test_failed_hedge_doesnt_lose_the_race(hedged):
+    async def fail():
+        raise asyncio.TimeoutError()
+    hedged.answers = [answer(200, 0.05), fail]
+    assert asyncio.run(upstream_request("GET", URL, hedge=True, retry=False)).status == 200
+    assert budget().wins == 0
+
+
+def test_both_failing_raises(hedged):
+    async def fail():
+        await asyncio.sleep(0.03)
+        raise asyncio.TimeoutError()
+    hedged.answers = [fail, fail]
+    with pytest.raises(UpstreamError):
+        asyncio.run(upstream_request("GET", URL, hedge=True, retry=False))
+
+
+def test_exhausted_budget_waits_for_the_primary(hedged):
+    exhausted = hedging.HEDGE_BUDGETS[f"acme {urlsplit(URL).path}"] = HedgeBudget(max_ratio=0)
+    assert exhausted.try_acquire()  # The one hedge of slack
+    hedged.answers = [answer(200, 0.05)]
+    assert asyncio.run(upstream_request("GET", URL, hedge=True)).status == 200
+    assert len(hedged.calls) == 1
+
+
+def test_hedging_is_opt_in(hedged):
+    hedged.answers = [answer(200, 0.05)]
+    asyncio.run(upstream_request("GET", URL))
+    assert len(hedged.calls) == 1
+    assert not hedging.HEDGE_BUDGETS
@@ -0,0 +1,68 @@
+import asyncio
+import types
+
+from aiohttp import web
+from telegram import Bot
+
+from utils import profilePhoto
+
+USER_ID = 42
+FILE_UNIQUE_ID = "AQADphoto"
+
+
+async def start_bot_api(photo_path: str) -> web.AppRunner:
+    """Stand-in for a local Bot API server: getFile answers with a path on the shared filesystem."""
+    results = {
+        "getMe": {"id": 1, "is_bot": True, "first_name": "Test", "username": "test_bot"},
+        "getChat": {
+            "id": USER_ID, "type": "private", "first_name": "Ada", "accent_color_id": 0, "max_reaction_count": 11,
+            "accepted_gift_types": {"unlimited_gifts": False, "limited_gifts": False, "unique_gifts": False,
+                                    "premium_subscription": False, "gifts_from_channels": False},
+            "photo": {"small_file_id": "small", "small_file_unique_id": "s", "big_file_id": "big",
+                      "big_file_unique_id": FILE_UNIQUE_ID},
+        },
+        "getFile": {"file_id": "big", "file_unique_id": FILE_UNIQUE_ID, "file_size": 9, "file_path": photo_path},
+    }
+
+    async def method(request):
+        return web.json_response({"ok": True, "result": results[request.match_info["method"]]})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", method)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+def test_local_mode_uploads_the_photo_from_disk_once(tmp_path, monkeypatch):
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"jpeg-data")
+    uploads = []
+
+    async def upstream_request(method, url, data=None, **kwargs):
+        field = data._fields[0]
+        uploads.append((method, field[0]["filename"], field[2].read()))
+        return types.SimpleNamespace(status=200, json=lambda: {"result": {"id": "cf-image"}})
+
+    monkeypatch.setattr(profilePhoto, "upstream_request", upstream_request)
+    monkeypatch.setattr(profilePhoto, "TELEGRAM_LOCAL_MODE", True)
+    profilePhoto.PROFILE_PHOTO_CACHE.clear()
+
+    async def run():
+        runner = await start_bot_api(str(photo))
+        port = runner.addresses[0][1]
+        bot = Bot("1:test", base_url=f"http://127.0.0.1:{port}/bot", local_mode=True)
+        try:
+            async with bot:
+                update = types.SimpleNamespace(effective_user=types.SimpleNamespace(id=USER_ID))
+                context = types.SimpleNamespace(bot=bot)
+                return [await profilePhoto.fetch_user_profile_photo(update, context) for _ in range(2)]
+        finally:
+            await runner.cleanup()
+
+    first, second = asyncio.run(run())
+
+    assert first == second == f"https://imagedelivery.net/{profilePhoto.CLOUDFLARE_HASH}/cf-image/public"
+    assert uploads == [("POST", f"{USER_ID}_{FILE_UNIQUE_ID}.jpg", b"jpeg-data")]
+    assert (USER_ID, FILE_UNIQUE_ID) in profilePhoto.PROFILE_PHOTO_CACHE
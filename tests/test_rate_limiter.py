@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from utils import rateLimiter
+from utils.rateLimiter import RateLimitExceeded, TokenBucket, get_rate_limiter, throttle
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the test moves by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(rateLimiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_is_served_without_waiting(clock):
+    bucket = TokenBucket("example.com", rate=2, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.stats()["delayed"] == 0
+
+
+def test_callers_past_the_burst_queue_in_arrival_order(clock):
+    bucket = TokenBucket("example.com", rate=2, burst=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    assert bucket.stats()["max_wait"] == pytest.approx(1.0)
+
+
+def test_tokens_refill_up_to_the_burst(clock):
+    bucket = TokenBucket("example.com", rate=2, burst=2)
+    bucket.reserve(), bucket.reserve()
+    clock[0] += 10
+    assert bucket.stats()["available"] == 0.0  # Refilled lazily, on the next reserve
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_max_wait_rejects_without_consuming_a_slot(clock):
+    bucket = TokenBucket("example.com", rate=1, burst=1)
+    bucket.reserve()
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        bucket.reserve(max_wait=0.5)
+    assert excinfo.value.wait == pytest.approx(1.0)
+    assert bucket.rejected == 1 and bucket.requests == 1
+    # The rejected call left the next slot where it was
+    assert bucket.reserve(max_wait=1.0) == pytest.approx(1.0)
+
+
+def test_acquire_sleeps_for_the_reserved_wait():
+    bucket = TokenBucket("example.com", rate=20, burst=1)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bucket.acquire()
+        waited = await bucket.acquire()
+        return waited, loop.time() - started
+
+    waited, elapsed = asyncio.run(run())
+    assert waited == pytest.approx(0.05, abs=0.01)
+    assert elapsed >= 0.04
+
+
+def test_only_configured_hosts_are_throttled():
+    assert get_rate_limiter("https://api.coingecko.com/api/v3/simple/price").host == "api.coingecko.com"
+    assert get_rate_limiter("https://example.com/") is None
+    assert asyncio.run(throttle("https://example.com/", max_wait=0)) == 0.0
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from conftest import response
+from utils import tokenValidator
+from utils.codec import dumps
+from utils.deadline import time_left, update_deadline
+from utils.requestBatcher import RequestBatcher
+
+
+class Upstream:
+    """A multi-key lookup that records the batches it is sent."""
+
+    def __init__(self, missing=(), error=None):
+        self.batches = []
+        self.missing = set(missing)
+        self.error = error
+        self.deadlines = []
+
+    async def fetch_many(self, group, keys):
+        self.batches.append((group, list(keys)))
+        self.deadlines.append(time_left())
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        return {key: f"{group}:{key}" for key in keys if key not in self.missing}
+
+
+def load_all(batcher: RequestBatcher, requests):
+    async def run():
+        return await asyncio.gather(*(batcher.load(group, key) for group, key in requests), return_exceptions=True)
+    return asyncio.run(run())
+
+
+def test_concurrent_loads_share_one_call_per_group():
+    upstream = Upstream(missing={"c"})
+    batcher = RequestBatcher("test", upstream.fetch_many, max_batch=10, window=0.01)
+
+    results = load_all(batcher, [("base", "a"), ("solana", "x"), ("base", "b"), ("base", "c")])
+
+    assert results == ["base:a", "solana:x", "base:b", None]  # Keys left out resolve to None
+    assert sorted(upstream.batches) == [("base", ["a", "b", "c"]), ("solana", ["x"])]
+    assert batcher.stats()["calls_saved"] == 2
+
+
+def test_full_batches_are_sent_in_chunks_of_max_batch():
+    upstream = Upstream()
+    batcher = RequestBatcher("test", upstream.fetch_many, max_batch=2, window=0.01)
+
+    results = load_all(batcher, [("base", key) for key in "abcde"])
+
+    assert results == [f"base:{key}" for key in "abcde"]
+    assert [keys for _, keys in upstream.batches] == [["a", "b"], ["c", "d"], ["e"]]
+
+
+def test_repeated_key_is_sent_once():
+    upstream = Upstream()
+    batcher = RequestBatcher("test", upstream.fetch_many, max_batch=10, window=0.01)
+
+    assert load_all(batcher, [("base", "a"), ("base", "a")]) == ["base:a", "base:a"]
+    assert upstream.batches == [("base", ["a"])]
+
+
+def test_errors_fan_out_to_every_caller():
+    upstream = Upstream(error=ValueError("upstream down"))
+    batcher = RequestBatcher("test", upstream.fetch_many, max_batch=10, window=0.01)
+
+    results = load_all(batcher, [("base", "a"), ("base", "b")])
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(upstream.batches) == 1
+
+
+def test_cancelled_caller_doesnt_cancel_the_batch():
+    upstream = Upstream()
+    batcher = RequestBatcher("test", upstream.fetch_many, max_batch=10, window=0.01)
+
+    async def run():
+        impatient = asyncio.ensure_future(batcher.load("base", "a"))
+        patient = asyncio.ensure_future(batcher.load("base", "b"))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == "base:b"
+    assert upstream.batches == [("base", ["a", "b"])]
+
+
+def test_batch_is_sent_without_the_callers_deadline():
+    upstream = Upstream()
+    batcher = RequestBatcher("test", upstream.fetch_many, max_batch=10, window=0.01)
+
+    async def run():
+        with update_deadline(5):
+            return await batcher.load("base", "a")
+
+    assert asyncio.run(run()) == "base:a"
+    assert upstream.deadlines == [None]
+
+
+@pytest.mark.parametrize("max_batch", [1, 3])
+def test_calls_saved_counts_loads_beyond_one_per_batch(max_batch):
+    upstream = Upstream()
+    batcher = RequestBatcher("test", upstream.fetch_many, max_batch=max_batch, window=0.01)
+    load_all(batcher, [("base", key) for key in "abc"])
+    assert batcher.stats()["calls_saved"] == 3 - len(upstream.batches)
+
+
+def test_market_caps_are_fanned_back_to_the_addresses_as_requested(monkeypatch):
+    requested = []
+    checksummed = ["0x" + "Ab" * 20, "0x" + "Cd" * 20]
+
+    async def upstream_request(method, url, params=None, **kwargs):
+        requested.append(params["contract_addresses"])
+        # CoinGecko answers with lowercased addresses
+        return response(200, dumps({address.lower(): {"usd_market_cap": 1e6 * (i + 1)} for i, address in enumerate(checksummed)}))
+
+    monkeypatch.setattr(tokenValidator, "upstream_request", upstream_request)
+    tokenValidator.MCAP_CACHE.clear()
+
+    async def run():
+        return await asyncio.gather(*(tokenValidator.fetch_mcap(address, "8453") for address in checksummed))
+
+    assert asyncio.run(run()) == [1e6, 2e6]
+    assert requested == [",".join(checksummed)]
@@ -0,0 +1,128 @@
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+import pytest
+
+from config import ACME_URL
+from conftest import response
+from utils import retryPolicy
+from utils.deadline import DeadlineExceeded, update_deadline
+from utils.httpClient import UpstreamError, upstream_request
+from utils.retryPolicy import RetryPolicy, parse_retry_after
+
+URL = f"{ACME_URL}/test"
+
+
+@pytest.fixture
+def acme_policy(monkeypatch):
+    """Three quick attempts for Acme, so tests don't sleep through real backoff."""
+    policy = RetryPolicy(name="acme", max_attempts=3, timeout=1, base_delay=0.01, max_delay=0.01, idempotency_keys=True)
+    monkeypatch.setitem(retryPolicy.RETRY_POLICY_REGISTRY, "acme", policy)
+    return policy
+
+
+def test_backoff_uses_full_jitter_up_to_max_delay():
+    policy = RetryPolicy(name="test", base_delay=0.2, max_delay=1.0)
+    delays = [policy.backoff(attempt) for attempt in range(6) for _ in range(50)]
+    assert all(0 <= delay <= 1.0 for delay in delays)
+    assert max(policy.backoff(0) for _ in range(200)) <= 0.2
+
+
+def test_backoff_honours_retry_after_within_the_cap():
+    policy = RetryPolicy(name="test", base_delay=0.01, max_retry_after=5)
+    assert policy.backoff(0, retry_after=3) == 3
+    assert policy.backoff(0, retry_after=6) is None
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("-1") == 0.0
+    in_ten_seconds = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=10), usegmt=True)
+    assert 8 <= parse_retry_after(in_ten_seconds) <= 10
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_retryable_errors():
+    policy = RetryPolicy(name="test")
+    assert policy.is_retryable_error(asyncio.TimeoutError())
+    assert policy.is_retryable_error(aiohttp.ClientConnectionError())
+    assert not policy.is_retryable_error(ValueError())
+    assert policy.is_retryable_status(503) and not policy.is_retryable_status(404)
+
+
+def test_retryable_status_is_retried(scripted_upstream, acme_policy):
+    scripted_upstream.answers = [response(503), response(200)]
+    assert asyncio.run(upstream_request("GET", URL)).status == 200
+    assert len(scripted_upstream.calls) == 2
+
+
+def test_final_status_is_returned_without_retrying(scripted_upstream, acme_policy):
+    scripted_upstream.answers = [response(404)]
+    assert asyncio.run(upstream_request("GET", URL)).status == 404
+    assert len(scripted_upstream.calls) == 1
+
+
+def test_last_response_is_returned_once_attempts_run_out(scripted_upstream, acme_policy):
+    scripted_upstream.answers = [response(503), response(502), response(500)]
+    assert asyncio.run(upstream_request("GET", URL)).status == 500
+    assert len(scripted_upstream.calls) == 3
+
+
+def test_errors_raise_upstream_error_once_attempts_run_out(scripted_upstream, acme_policy):
+    scripted_upstream.answers = [asyncio.TimeoutError()] * 3
+    with pytest.raises(UpstreamError):
+        asyncio.run(upstream_request("GET", URL))
+    assert len(scripted_upstream.calls) == 3
+
+
+def test_non_retryable_error_is_not_retried(scripted_upstream, acme_policy):
+    scripted_upstream.answers = [ValueError("bad body")]
+    with pytest.raises(UpstreamError):
+        asyncio.run(upstream_request("GET", URL))
+    assert len(scripted_upstream.calls) == 1
+
+
+def test_too_long_retry_after_gives_up(scripted_upstream, acme_policy):
+    scripted_upstream.answers = [response(429, headers={"Retry-After": "60"})]
+    assert asyncio.run(upstream_request("GET", URL)).status == 429
+    assert len(scripted_upstream.calls) == 1
+
+
+def test_post_retries_reuse_one_idempotency_key(scripted_upstream, acme_policy):
+    scripted_upstream.answers = [response(503), response(200)]
+    asyncio.run(upstream_request("POST", URL, json={"a": 1}))
+    keys = [call["headers"]["Idempotency-Key"] for call in scripted_upstream.calls]
+    assert len(keys) == 2 and keys[0] == keys[1]
+
+
+def test_retry_that_cannot_fit_the_deadline_is_skipped(scripted_upstream, monkeypatch):
+    policy = RetryPolicy(name="acme", max_attempts=3, timeout=1, base_delay=0.5, max_delay=0.5)
+    monkeypatch.setitem(retryPolicy.RETRY_POLICY_REGISTRY, "acme", policy)
+    monkeypatch.setattr(policy.__class__, "backoff", lambda self, attempt, retry_after=None: 0.5)
+
+    async def run(answers):
+        scripted_upstream.answers = answers
+        with update_deadline(0.2):
+            return await upstream_request("GET", URL, coalesce=False)
+
+    # A retryable status is returned as-is rather than retried past the deadline
+    assert asyncio.run(run([response(503)])).status == 503
+    # A retryable error has no response to fall back to
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run([aiohttp.ClientConnectionError()]))
+    assert len(scripted_upstream.calls) == 2
+
+
+def test_attempt_timeout_is_capped_to_the_deadline(scripted_upstream, acme_policy):
+    scripted_upstream.answers = [response(200)]
+
+    async def run():
+        with update_deadline(0.3):
+            # Coalesced GETs run without any caller's deadline, so ask for an uncoalesced one
+            return await upstream_request("GET", URL, coalesce=False)
+
+    asyncio.run(run())
+    assert scripted_upstream.calls[0]["timeout"] <= 0.3
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from config import ACME_URL
+from conftest import response
+from utils.httpClient import upstream_request
+from utils.singleFlight import SingleFlight, request_key
+
+
+def test_concurrent_calls_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 1}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)  # Shared as-is
+    assert flight.stats()["shared"] == 4 and flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_dont_share():
+    flight = SingleFlight("test")
+
+    async def run():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")), flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert flight.shared == 0
+
+
+def test_errors_fan_out_and_the_key_is_forgotten():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # The failure isn't cached: the next call runs again
+    with pytest.raises(ValueError):
+        asyncio.run(flight.do("key", failing))
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_doesnt_cancel_the_shared_call():
+    flight = SingleFlight("test")
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        finished.append(1)
+        return "done"
+
+    async def run():
+        impatient = asyncio.ensure_future(flight.do("key", fetch))
+        patient = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0.005)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == "done"
+    assert finished == [1]
+
+
+def test_request_key_ignores_param_order_and_hides_headers():
+    key = request_key("get", "https://example.com", {"b": 2, "a": 1}, {"X-API-KEY": "secret"})
+    assert key == request_key("GET", "https://example.com", {"a": 1, "b": 2}, {"x-api-key": "secret"})
+    assert "secret" not in repr(key)
+    assert key != request_key("GET", "https://example.com", {"a": 1, "b": 2}, {"X-API-KEY": "other"})
+
+
+def test_identical_gets_share_one_upstream_call(scripted_upstream):
+    async def slow():
+        await asyncio.sleep(0.01)
+        return response(200, b"{}")
+
+    scripted_upstream.answers = [slow, slow]
+
+    async def run():
+        url = f"{ACME_URL}/checkout/currency/get-all-currencies"
+        return await asyncio.gather(
+            upstream_request("GET", url, params={"symbol": "A", "take": 5}),
+            upstream_request("GET", url, params={"take": 5, "symbol": "A"}),
+            upstream_request("GET", url, params={"symbol": "B", "take": 5}),
+        )
+
+    assert [result.status for result in asyncio.run(run())] == [200, 200, 200]
+    assert len(scripted_upstream.calls) == 2
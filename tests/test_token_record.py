@@ -0,0 +1,90 @@
+import copy
+import pickle
+
+import pytest
+
+from utils import tokenRecord
+from utils.tokenRecord import TokenRecord
+
+TOKEN = {
+    "id": "cur_1",
+    "symbol": "TKN",
+    "name": "Token",
+    "address": "0x" + "ab" * 20,
+    "chainId": "8453",
+    "decimals": 18,
+    "logoUrl": "https://logo.example/t.png",
+}
+
+
+def test_equal_tokens_share_one_record():
+    record = TokenRecord.from_dict(TOKEN)
+    assert TokenRecord.from_dict(dict(TOKEN)) is record
+    assert TokenRecord.from_dict(dict(TOKEN, chainId=8453)) is record  # Chain IDs are kept as strings
+    assert TokenRecord.from_dict(TOKEN, tradingLink="https://app.acme.am/buy/1") is not record
+
+
+def test_records_are_immutable():
+    record = TokenRecord.from_dict(TOKEN)
+    with pytest.raises(AttributeError):
+        record.symbol = "OTHER"
+    with pytest.raises(AttributeError):
+        del record.symbol
+
+
+def test_replace_returns_the_shared_record():
+    record = TokenRecord.from_dict(TOKEN)
+    linked = record.replace(tradingLink="https://app.acme.am/buy/1")
+
+    assert record.get("tradingLink") is None
+    assert linked["tradingLink"] == "https://app.acme.am/buy/1"
+    assert record.replace(symbol="TKN") is record
+    assert TokenRecord.from_dict(TOKEN, tradingLink="https://app.acme.am/buy/1") is linked
+
+
+def test_reads_under_upstream_field_names():
+    record = TokenRecord.from_dict({
+        "tokenAddress": TOKEN["address"], "chain_id": "8453", "symbol": "TKN", "logoURI": TOKEN["logoUrl"],
+    })
+
+    assert record["contract_address"] == record["address"] == TOKEN["address"]
+    assert record.get("chain_id") == "8453"
+    assert record.get("logoURI") == TOKEN["logoUrl"]
+    assert "intentId" not in record
+    assert record.get("intentId", "") == ""
+    with pytest.raises(KeyError):
+        record["intentId"]
+
+
+@pytest.mark.parametrize("decimals", ["eighteen", "1.5", [18], {}])
+def test_junk_decimals_read_as_absent(decimals):
+    record = TokenRecord.from_dict(dict(TOKEN, decimals=decimals))
+    assert record.get("decimals") is None
+    assert "decimals" not in record.to_dict()
+
+
+def test_numeric_decimals_are_ints():
+    assert TokenRecord.from_dict(dict(TOKEN, decimals="9"))["decimals"] == 9
+
+
+def test_dropped_fields_are_left_out():
+    record = TokenRecord.from_dict(dict(TOKEN, isEnabled=True, mcap=1.5e9, priceUSD="1.0"))
+    assert record is TokenRecord.from_dict(TOKEN)
+    assert "mcap" not in record
+
+
+def test_unknown_fields_raise_when_strict(monkeypatch):
+    monkeypatch.setattr(tokenRecord, "STRICT_FIELDS", True)
+    with pytest.raises(ValueError, match="volume"):
+        TokenRecord.from_dict(dict(TOKEN, volume=10))
+
+
+def test_unknown_fields_are_left_out_otherwise(monkeypatch):
+    monkeypatch.setattr(tokenRecord, "STRICT_FIELDS", False)
+    assert TokenRecord.from_dict(dict(TOKEN, volume=10)) is TokenRecord.from_dict(TOKEN)
+
+
+def test_copies_and_unpickled_records_are_interned():
+    record = TokenRecord.from_dict(TOKEN)
+    assert pickle.loads(pickle.dumps(record)) is record
+    assert copy.deepcopy(record) is record
@@ -0,0 +1,261 @@
+import asyncio
+import itertools
+import types
+
+import pytest
+
+from utils import tokenValidator
+from utils.circuitBreaker import CIRCUIT_BREAKER_REGISTRY, CircuitBreaker, CircuitOpenError
+from utils.codec import decode_lifi_token, dumps
+from utils.deadline import DeadlineExceeded
+from utils.httpClient import UpstreamError, UpstreamResponse
+from utils.rateLimiter import RateLimitExceeded
+from utils.tokenSearch import TOKEN_SEARCH_INDEX
+from utils.tokenValidator import (
+    NEGATIVE_TOKEN_CACHE, PENDING_REGISTRATIONS, TOKEN_RESOLUTION_CACHE, fetch_token_data_from_chains, token_cache_key,
+    wait_for_registration,
+)
+
+ADDRESS = "0x" + "ab" * 20
+_symbols = itertools.count()
+
+
+def response(status: int, body=None) -> UpstreamResponse:
+    return UpstreamResponse(status=status, headers={}, body=dumps(body) if body is not None else b"", url="")
+
+
+def lifi_token(params) -> dict:
+    return {"symbol": params["token"], "name": "Test", "address": ADDRESS, "chainId": int(params["chain"]),
+            "decimals": 18, "logoURI": "https://logo.example/t.png", "priceUSD": "1.0"}
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    """Route upstream_request by host; each test sets what Acme, LiFi and CoinGecko answer."""
+    routes = {
+        "acme": lambda params: response(200, {"data": []}),
+        "lifi": lambda params: response(404),
+        "coingecko": lambda params: response(200, {ADDRESS: {"usd": 1.0, "usd_market_cap": 1e9}}),
+        "acme_registration": lambda payload: response(200, {"data": {"currenciesLoaded": [
+            dict(currency, id=f"cur_{currency['symbol']}") for currency in payload["currencies"]
+        ]}}),
+    }
+
+    async def upstream_request(method, url, params=None, **kwargs):
+        if method == "POST":
+            return routes["acme_registration"](kwargs["json"])
+        host = "lifi" if "li.quest" in url else "coingecko" if "coingecko" in url else "acme"
+        return routes[host](params)
+
+    monkeypatch.setattr(tokenValidator, "upstream_request", upstream_request)
+    for cache in (tokenValidator.LIFI_TOKEN_CACHE, tokenValidator.MCAP_CACHE, tokenValidator.TOKEN_RESOLUTION_CACHE):
+        cache.clear()
+    return routes
+
+
+def fresh_symbol() -> str:
+    return f"TST{next(_symbols)}"
+
+
+def negatively_cached(symbol: str) -> bool:
+    return repr(token_cache_key(symbol)) in NEGATIVE_TOKEN_CACHE
+
+
+def fail(error):
+    def route(params):
+        raise error
+    return route
+
+
+def test_unknown_token_is_negatively_cached(upstreams):
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol)) is None
+    assert negatively_cached(symbol)
+
+
+@pytest.mark.parametrize("error", [
+    DeadlineExceeded("deadline passed"),
+    CircuitOpenError("acme", 5.0),
+    UpstreamError("acme", "GET failed after 3 attempts"),
+    RateLimitExceeded("acme", 1.0),
+], ids=lambda error: type(error).__name__)
+def test_acme_failure_is_not_negatively_cached(upstreams, error):
+    upstreams["acme"] = fail(error)
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol)) is None
+    assert not negatively_cached(symbol)
+
+
+def test_acme_server_error_is_not_negatively_cached(upstreams):
+    upstreams["acme"] = lambda params: response(503)
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol)) is None
+    assert not negatively_cached(symbol)
+
+
+@pytest.mark.parametrize("error", [
+    DeadlineExceeded("deadline passed"),
+    CircuitOpenError("lifi", 5.0),
+    UpstreamError("lifi", "GET failed after 3 attempts"),
+    RateLimitExceeded("li.quest", 1.0),
+], ids=lambda error: type(error).__name__)
+def test_lifi_failure_is_not_negatively_cached(upstreams, error):
+    upstreams["lifi"] = fail(error)
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol)) is None
+    assert not negatively_cached(symbol)
+
+
+@pytest.mark.parametrize("status", [429, 502])
+def test_lifi_error_status_with_cold_cache_is_not_negatively_cached(upstreams, status):
+    upstreams["lifi"] = lambda params: response(status)
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol)) is None
+    assert not negatively_cached(symbol)
+
+
+@pytest.mark.parametrize("coingecko", [
+    fail(RateLimitExceeded("api.coingecko.com", 1.0)),
+    fail(CircuitOpenError("coingecko", 5.0)),
+    fail(DeadlineExceeded("deadline passed")),
+    lambda params: response(429),
+    lambda params: response(500),
+], ids=["rate_limiter", "circuit_open", "deadline", "status_429", "status_500"])
+def test_coingecko_failure_with_cold_cache_is_not_negatively_cached(upstreams, coingecko):
+    upstreams["lifi"] = lambda params: response(200, lifi_token(params))
+    upstreams["coingecko"] = coingecko
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol)) is None
+    assert not negatively_cached(symbol)
+
+
+def test_acme_failure_while_speculating_is_not_negatively_cached(upstreams, monkeypatch):
+    monkeypatch.setattr(tokenValidator, "SPECULATIVE_RESOLUTION", True)
+    upstreams["acme"] = fail(UpstreamError("acme", "GET failed after 3 attempts"))
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol)) is None
+    assert not negatively_cached(symbol)
+
+
+def test_acme_lookup_uses_acme_chain_id(upstreams):
+    requested = []
+    upstreams["acme"] = lambda params: requested.append(params) or response(404)
+    asyncio.run(fetch_token_data_from_chains(fresh_symbol(), chain_id="1151111081099710"))
+    assert requested[0]["chainId"] == "solana"
+
+
+def resolve_and_register(symbol: str, chain_id="8453"):
+    """Resolve a LiFi-only token, then wait for its write-behind registration."""
+    async def run():
+        token_data = await fetch_token_data_from_chains(symbol, chain_id=chain_id)
+        await wait_for_registration(token_data["chainId"], token_data["address"])
+        return token_data
+    return asyncio.run(run())
+
+
+def test_registered_token_stays_cached(upstreams):
+    upstreams["lifi"] = lambda params: response(200, lifi_token(params))
+    symbol = fresh_symbol()
+    assert resolve_and_register(symbol)["symbol"] == symbol
+    assert token_cache_key(symbol, "8453") in TOKEN_RESOLUTION_CACHE
+    assert not PENDING_REGISTRATIONS
+
+
+def test_failed_registration_drops_cached_token(upstreams):
+    upstreams["lifi"] = lambda params: response(200, lifi_token(params))
+    upstreams["acme_registration"] = lambda payload: response(500)
+    symbol = fresh_symbol()
+    assert resolve_and_register(symbol)["symbol"] == symbol
+    assert token_cache_key(symbol, "8453") not in TOKEN_RESOLUTION_CACHE
+    assert token_cache_key(ADDRESS, "8453") not in TOKEN_RESOLUTION_CACHE
+
+    # The next mention resolves the token again and queues another registration
+    registrations = []
+    upstreams["acme_registration"] = lambda payload: registrations.append(payload) or response(500)
+    resolve_and_register(symbol)
+    assert [currency["symbol"] for currency in registrations[0]["currencies"]] == [symbol]
+
+
+def test_resolution_only_validation_creates_no_trading_intent(upstreams, monkeypatch):
+    async def create_trading_link(*args, **kwargs):
+        raise AssertionError("a trading intent was created")
+
+    monkeypatch.setattr(tokenValidator, "create_trading_link", create_trading_link)
+    monkeypatch.setattr(tokenValidator, "get_user_top3", create_trading_link)
+    symbol = fresh_symbol()
+    upstreams["lifi"] = lambda params: response(200, lifi_token(params)) if params["token"] == symbol else response(404)
+    update = types.SimpleNamespace(effective_user=types.SimpleNamespace(id=1))
+
+    valid, invalid = asyncio.run(tokenValidator.validate_tokens([symbol, "NOPE"], update, None, with_links=False))
+
+    assert [token["symbol"] for token in valid] == [symbol] and invalid == ["NOPE"]
+    assert valid[0].get("tradingLink") is None
+    assert not PENDING_REGISTRATIONS
+
+
+@pytest.fixture
+def lifi_circuit_open(monkeypatch):
+    breaker = CircuitBreaker("lifi", failure_threshold=1, recovery_timeout=60)
+    breaker.record_failure()
+    monkeypatch.setitem(CIRCUIT_BREAKER_REGISTRY, "lifi", breaker)
+
+
+def test_open_lifi_circuit_resolves_from_cache_only(upstreams, lifi_circuit_open):
+    symbol = fresh_symbol()
+    tokenValidator.LIFI_TOKEN_CACHE.set(token_cache_key(symbol, "8453"), decode_lifi_token(dumps(
+        lifi_token({"token": symbol, "chain": "8453"})
+    )), ttl=-1)
+    upstreams["lifi"] = fail(AssertionError("LiFi was called"))
+
+    token_data = asyncio.run(fetch_token_data_from_chains(symbol))
+
+    assert token_data["symbol"] == symbol and token_data["chainId"] == "8453"
+
+
+def test_open_lifi_circuit_with_cold_cache_is_not_negatively_cached(upstreams, lifi_circuit_open):
+    upstreams["lifi"] = fail(AssertionError("LiFi was called"))
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol)) is None
+    assert not negatively_cached(symbol)
+
+
+def acme_currency(symbol: str) -> dict:
+    return {"id": f"cur_{symbol}", "symbol": symbol, "name": "Test", "address": ADDRESS, "chainId": "8453",
+            "decimals": 18, "logoUrl": "https://logo.example/t.png", "isEnabled": True}
+
+
+@pytest.fixture
+def acme_lookups(upstreams):
+    """Symbols looked up on Acme, which knows every symbol it's asked about."""
+    requested = []
+    upstreams["acme"] = lambda params: requested.append(params["symbol"]) or response(200, {"data": [
+        acme_currency(params["symbol"])
+    ]})
+    return requested
+
+
+def test_known_only_skips_unknown_words_without_upstream_calls(acme_lookups):
+    symbol = fresh_symbol()
+    assert asyncio.run(fetch_token_data_from_chains(symbol, known_only=True)) is None
+    assert acme_lookups == []
+    assert not negatively_cached(symbol)  # Still resolvable where it's asked for explicitly
+
+
+def test_known_only_looks_up_cashtags(acme_lookups):
+    symbol = fresh_symbol()
+    token_data = asyncio.run(fetch_token_data_from_chains(f"${symbol}", known_only=True))
+    assert token_data["symbol"] == symbol
+    assert acme_lookups == [symbol]
+
+
+def test_known_only_looks_up_indexed_symbols(acme_lookups):
+    symbol = fresh_symbol()
+    TOKEN_SEARCH_INDEX.add(symbol, "Test")
+    assert asyncio.run(fetch_token_data_from_chains(symbol.lower(), known_only=True))["symbol"] == symbol
+    assert acme_lookups == [symbol]
+
+
+def test_known_only_looks_up_addresses(acme_lookups):
+    address = "0x" + "cd" * 20  # Not in the catalog
+    asyncio.run(fetch_token_data_from_chains(address, known_only=True))
+    assert acme_lookups == [address]
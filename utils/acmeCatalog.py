@@ -0,0 +1,208 @@
+import time
+import asyncio
+from typing import Optional
+from config import logger, ACME_CATALOG_PAGE_SIZE, ACME_CATALOG_SNAPSHOT_PATH
+from utils.acmeTokens import iter_currency_pages
+from utils.chains import CHAINS
+from utils.codec import AcmeCurrency, decode_acme_currency, dumps, loads
+from utils.metrics import register_metrics
+from utils.snapshot import write_snapshot
+
+class AcmeCatalog:
+    """
+    In-memory mirror of the Acme currency catalog, indexed by symbol and address.
+
+    A sync pages through the whole catalog and swaps the new index in once it
+    is complete, so lookups never see a half-loaded catalog and currencies
+    removed on Acme disappear. Unchanged pages are revalidated with a 304, so
+    re-syncing an unchanged catalog is cheap. Currencies registered by the bot
+    between syncs are added right away.
+    """
+
+    def __init__(self):
+        self._by_id: dict = {}
+        self._by_symbol: dict = {}
+        self._by_address: dict = {}
+        self._added_since_sync: list = []
+        self._upserted: list = []  # Currencies upserted since the last full swap, for derived indexes to apply one by one
+        self._syncing = False
+        self.generation = 0  # Bumped when a whole catalog is swapped in, so derived indexes know when to rebuild
+        self.synced_at: Optional[float] = None
+        self.sync_seconds: Optional[float] = None
+        self.pages = 0
+        self.hits = 0
+        self.misses = 0
+        self.sync_failures = 0
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._by_id)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def currencies(self):
+        """All currencies in catalog order."""
+        return list(self._by_id.values())
+
+    @staticmethod
+    def _index(currency: AcmeCurrency, by_id: dict, by_symbol: dict, by_address: dict) -> None:
+        # Entries are matched by id: an updated currency may compare equal to another (or to itself)
+        previous = by_id.get(currency.id)
+        by_id[currency.id] = currency
+        for index, key, previous_key in (
+            (by_symbol, currency.symbol.upper(), previous.symbol.upper() if previous else None),
+            (by_address, currency.address.lower(), previous.address.lower() if previous else None),
+        ):
+            entries = index.setdefault(key, [])
+            position = next((i for i, entry in enumerate(entries) if entry.id == currency.id), None)
+            if position is None:
+                entries.append(currency)
+            else:
+                entries[position] = currency  # Keep the catalog order
+            if previous is not None and previous_key != key:
+                # Symbol or address changed: drop the stale entry
+                stale = [entry for entry in index.get(previous_key, ()) if entry.id != currency.id]
+                if stale:
+                    index[previous_key] = stale
+                else:
+                    index.pop(previous_key, None)
+
+    def upsert(self, currency: AcmeCurrency) -> None:
+        """Add or replace one currency in the live index."""
+        if not currency.id or not currency.isEnabled:
+            return
+        self._index(currency, self._by_id, self._by_symbol, self._by_address)
+        self._upserted.append(currency)
+        if self._syncing:
+            self._added_since_sync.append(currency)
+
+    def add(self, record: Optional[dict]) -> None:
+        """Add a currency record returned by Acme (e.g. after registering a token)."""
+        if record:
+            self.upsert(decode_acme_currency(record))
+
+    def replace(self, currencies) -> None:
+        """Swap in a complete catalog, keeping currencies added while it was being fetched."""
+        by_id, by_symbol, by_address = {}, {}, {}
+        for currency in list(currencies) + self._added_since_sync:
+            if currency.id and currency.isEnabled:
+                self._index(currency, by_id, by_symbol, by_address)
+        self._by_id, self._by_symbol, self._by_address = by_id, by_symbol, by_address
+        self._added_since_sync = []
+        self._upserted = []
+        self.generation += 1
+
+    @property
+    def upserts(self) -> int:
+        """Number of currencies upserted since the last full swap."""
+        return len(self._upserted)
+
+    def upserted_since(self, position: int) -> list:
+        """Currencies upserted since the last full swap, from `position` (a previous `upserts`) on."""
+        return self._upserted[position:]
+
+    def lookup(self, token: str, chain_id: Optional[str] = None) -> Optional[AcmeCurrency]:
+        """
+        Find a currency by contract address or symbol, like Acme's get-all-currencies does.
+
+        Addresses match case-insensitively, so lowercased Solana addresses still resolve.
+
+        Args:
+            token (str): Symbol or contract address.
+            chain_id (str, optional): Only match currencies on this chain.
+
+        Returns:
+            AcmeCurrency or None: The first matching currency in catalog order.
+        """
+        token = token.strip()
+        candidates = self._by_address.get(token.lower()) or self._by_symbol.get(token.upper()) or ()
+        if chain_id:
+            # Acme lists Solana both as "solana" and by its numeric id
+            chain = CHAINS.canonical_id(chain_id)
+            candidates = [currency for currency in candidates if CHAINS.canonical_id(currency.chainId) == chain]
+        if candidates:
+            self.hits += 1
+            return candidates[0]
+        self.misses += 1
+        return None
+
+    async def sync(self, page_size: int = ACME_CATALOG_PAGE_SIZE) -> None:
+        """
+        Page through the Acme catalog and swap it in.
+
+        Every sync requests every page again; pages that haven't changed are
+        answered with a 304 instead of a body, but nothing is skipped.
+
+        Raises:
+            ValueError: If a page fails to load; the current index is kept.
+        """
+        started = time.monotonic()
+        self._added_since_sync = []
+        self._syncing = True
+        try:
+            currencies = []
+            async for page in iter_currency_pages(page_size=page_size):
+                currencies.extend(page)
+                self.pages += 1
+            self.replace(currencies)
+        finally:
+            self._syncing = False
+        self.synced_at = time.time()
+        self.sync_seconds = time.monotonic() - started
+        logger.info(f"Acme catalog synced: {len(self)} currencies in {self.sync_seconds:.2f}s.")
+
+    def load_snapshot(self, path: str = ACME_CATALOG_SNAPSHOT_PATH) -> bool:
+        """Load a snapshot written by save_snapshot. Returns False if there is none or it is unreadable."""
+        try:
+            with open(path, "rb") as f:
+                snapshot = loads(f.read())
+            self.replace(AcmeCurrency(*row) for row in snapshot["currencies"])
+            self.synced_at = snapshot.get("synced_at")
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable Acme catalog snapshot {path}: {e}")
+            return False
+        logger.info(f"Loaded {len(self)} currencies from Acme catalog snapshot {path}.")
+        return True
+
+    def snapshot(self) -> bytes:
+        """Serialize the catalog for save_snapshot; done on the event loop so the index isn't read mid-update."""
+        return dumps({"synced_at": self.synced_at, "currencies": [list(currency) for currency in self._by_id.values()]})
+
+    def save_snapshot(self, path: str = ACME_CATALOG_SNAPSHOT_PATH) -> None:
+        """Write the catalog to `path` atomically, so a crash never leaves a truncated snapshot."""
+        write_snapshot(path, self.snapshot())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "currencies": len(self),
+            "symbols": len(self._by_symbol),
+            "synced_at": self.synced_at,
+            "sync_seconds": round(self.sync_seconds, 3) if self.sync_seconds is not None else None,
+            "pages": self.pages,
+            "sync_failures": self.sync_failures,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+ACME_CATALOG = AcmeCatalog()
+register_metrics("acme_catalog", ACME_CATALOG.stats)
+
+
+async def keep_catalog_synced(interval: float, path: str = ACME_CATALOG_SNAPSHOT_PATH) -> None:
+    """Sync the catalog now and every `interval` seconds, writing a snapshot after each successful sync."""
+    while True:
+        try:
+            await ACME_CATALOG.sync()
+            await asyncio.to_thread(write_snapshot, path, ACME_CATALOG.snapshot())
+        except ValueError as e:
+            ACME_CATALOG.sync_failures += 1
+            logger.error(f"Acme catalog sync failed, keeping {len(ACME_CATALOG)} known currencies: {e}")
+        except OSError as e:
+            logger.error(f"Could not write Acme catalog snapshot {path}: {e}")
+        await asyncio.sleep(interval)
@@ -1,8 +1,10 @@
-import asyncio
 import aiohttp
+from typing import AsyncIterator
 
 # Import constants from config
-from config import logger, RETRY_COUNT, DEFAULT_TIMEOUT, ACME_URL, ACME_API_KEY
+from config import logger, ACME_URL, ACME_API_KEY, ACME_CATALOG_PAGE_SIZE
+from utils.httpClient import upstream_request
+from utils.codec import decode_acme_currencies
 
 async def store_tokens_to_acme(dex_aggregator_id: str, currencies: list) -> dict:
     """
@@ -30,31 +32,71 @@ async def store_tokens_to_acme(dex_aggregator_id: str, currencies: list) -> dict
         "currencies": currencies
     }
 
-    for attempt in range(RETRY_COUNT):
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)) as session:
-            try:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    logger.debug(f"Attempt {attempt + 1}: Storing tokens to {url}")
+    try:
+        logger.debug(f"Storing tokens to {url}")
+        response = await upstream_request("POST", url, json=payload, headers=headers)
 
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.debug(f"Response: {data}")
-                        return data
+        if response.status == 200:
+            data = response.json()
+            logger.debug(f"Response: {data}")
+            return data
 
-                    logger.error(f"Attempt {attempt + 1} failed with status: {response.status}")
-                    response.raise_for_status()
-
-            except asyncio.TimeoutError:
-                logger.error(f"Attempt {attempt + 1}: Request to store tokens timed out.")
-            except aiohttp.ClientError as e:
-                logger.exception(f"Attempt {attempt + 1}: Client error occurred: {str(e)}")
-            except Exception as e:
-                logger.error(f"Unexpected error on attempt {attempt + 1}: {str(e)}")
+        logger.error(f"Storing tokens failed with status: {response.status}")
+    except aiohttp.ClientError as e:
+        logger.error(f"Client error occurred while storing tokens: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error while storing tokens: {str(e)}")
 
     # Raise an exception if all attempts fail
     raise ValueError("Failed to store tokens to Acme after multiple attempts.")
 
 
+async def get_currencies_page(skip: int = 0, take: int = ACME_CATALOG_PAGE_SIZE, chain_id=None) -> list:
+    """
+    Fetch one page of the Acme currency catalog.
+
+    Pages are revalidated with ETag/Last-Modified, so re-reading an unchanged
+    page costs a 304 instead of a full body.
+
+    Args:
+        skip (int): Number of currencies to skip.
+        take (int): Page size.
+        chain_id (str, optional): Only return currencies on this chain.
+
+    Returns:
+        list[AcmeCurrency]: The currencies on the page; shorter than `take` on the last page.
+
+    Raises:
+        ValueError: If the request fails.
+    """
+    url = f"{ACME_URL}/checkout/currency/get-all-currencies"
+    params = {"skip": skip, "take": take}
+    if chain_id:
+        params["chainId"] = chain_id
+
+    try:
+        response = await upstream_request("GET", url, params=params, headers={"X-API-KEY": ACME_API_KEY}, cache=True)
+        if response.status == 200:
+            return decode_acme_currencies(response.body)
+        logger.error(f"Fetching currencies (skip={skip}) failed with status: {response.status}")
+    except aiohttp.ClientError as e:
+        logger.error(f"Client error occurred while fetching currencies: {str(e)}")
+
+    raise ValueError(f"Failed to fetch currencies page at skip={skip}.")
+
+
+async def iter_currency_pages(chain_id=None, page_size: int = ACME_CATALOG_PAGE_SIZE) -> AsyncIterator[list]:
+    """Yield the Acme currency catalog page by page until Acme returns an empty page."""
+    skip = 0
+    while True:
+        page = await get_currencies_page(skip, page_size, chain_id)
+        if not page:
+            return
+        yield page
+        # Advance by what was returned, in case Acme caps the page size below `page_size`
+        skip += len(page)
+
+
 async def get_all_currencies(chain_id=None) -> list:
     """
     Fetch all currencies available for a specified chain ID.
@@ -63,35 +105,13 @@ async def get_all_currencies(chain_id=None) -> list:
         chain_id (str, optional): Blockchain ID, 'solana' or '8453' or None to fetch all.
 
     Returns:
-        list: A list of token objects if successful.
+        list[AcmeCurrency]: Every currency in the catalog (on `chain_id`, if given).
 
     Raises:
-        ValueError: If the request fails after retries or times out.
+        ValueError: If any page fails to load.
     """
-    url = f"{ACME_URL}/currencies"
-    if chain_id in ["solana", "8453"]:
-        url += f"&chainId={chain_id}"
-
-    for attempt in range(RETRY_COUNT):
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)) as session:
-            try:
-                async with session.get(url) as response:
-                    logger.debug(f"Attempt {attempt + 1}: Fetching currencies from {url}")
-
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.debug(f"Response: {data}")
-                        return data
-
-                    logger.error(f"Attempt {attempt + 1} failed with status: {response.status}")
-                    response.raise_for_status()
-
-            except asyncio.TimeoutError:
-                logger.error(f"Attempt {attempt + 1}: Request timed out.")
-            except aiohttp.ClientError as e:
-                logger.exception(f"Attempt {attempt + 1}: Client error occurred: {str(e)}")
-            except Exception as e:
-                logger.error(f"Unexpected error on attempt {attempt + 1}: {str(e)}")
-
-    # Raise an exception if all attempts fail
-    raise ValueError("Failed to fetch currencies after multiple attempts.")
+    currencies = []
+    async for page in iter_currency_pages(chain_id):
+        currencies.extend(page)
+    logger.debug(f"Fetched {len(currencies)} currencies.")
+    return currencies
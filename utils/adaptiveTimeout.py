@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from config import ADAPTIVE_TIMEOUTS
+from utils.latencyStats import get_latency_window
+from utils.metrics import register_metrics
+from utils.retryPolicy import get_retry_policy
+
+
+@dataclass(frozen=True)
+class AdaptiveTimeout:
+    """Derives an upstream's request timeout from its recent latencies."""
+    name: str
+    percentile: float = 99
+    headroom: float = 1.5
+    min_timeout: float = 1.0
+    max_timeout: float = 6.0
+    min_samples: int = 20
+
+    def timeout(self, fallback: float) -> float:
+        """
+        Timeout for the next request: clamp(percentile * headroom, min_timeout, max_timeout).
+
+        Args:
+            fallback (float): Timeout to use while there are fewer than `min_samples` latencies.
+        """
+        window = get_latency_window(self.name)
+        if len(window) < self.min_samples:
+            return fallback
+        observed = window.percentile(self.percentile)
+        return min(self.max_timeout, max(self.min_timeout, observed * self.headroom))
+
+    def stats(self, fallback: float) -> dict:
+        window = get_latency_window(self.name)
+        observed = window.percentile(self.percentile)
+        return {
+            "timeout": round(self.timeout(fallback), 3),
+            "adaptive": len(window) >= self.min_samples,
+            f"p{self.percentile:g}": round(observed, 4) if observed is not None else None,
+            "bounds": [self.min_timeout, self.max_timeout],
+            "histogram": window.histogram(),
+        }
+
+
+# One per upstream; upstreams without an entry (e.g. telegram, which uses its own client) get the default
+ADAPTIVE_TIMEOUT_REGISTRY = {name: AdaptiveTimeout(name=name, **settings) for name, settings in ADAPTIVE_TIMEOUTS.items()}
+
+
+def get_adaptive_timeout(upstream: str) -> AdaptiveTimeout:
+    """Return the adaptive timeout for `upstream`, using the default bounds for unknown upstreams."""
+    adaptive = ADAPTIVE_TIMEOUT_REGISTRY.get(upstream)
+    if adaptive is None:
+        adaptive = ADAPTIVE_TIMEOUT_REGISTRY[upstream] = AdaptiveTimeout(name=upstream, **ADAPTIVE_TIMEOUTS["default"])
+    return adaptive
+
+
+def _adaptive_timeout_stats() -> dict:
+    return {name: adaptive.stats(get_retry_policy(name).timeout) for name, adaptive in ADAPTIVE_TIMEOUT_REGISTRY.items()}
+
+
+register_metrics("adaptive_timeouts", _adaptive_timeout_stats)
@@ -0,0 +1,87 @@
+import hashlib
+import math
+import time
+from typing import Optional
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, `error_rate` false positives at `capacity` items."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RotatingBloomFilter:
+    """
+    Time-bounded set membership in constant memory.
+
+    Items are added to the current generation and looked up in the current
+    and previous ones. Every `ttl` seconds (or once the current generation
+    holds `capacity` items) the previous generation is dropped, so an item is
+    remembered for between `ttl` and `2 * ttl` seconds and memory stays flat
+    no matter how many distinct items are added.
+    """
+
+    def __init__(self, capacity: int, ttl: float, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.error_rate = error_rate
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous: Optional[BloomFilter] = None
+        self._rotated_at = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.rotations = 0
+
+    def _maybe_rotate(self) -> None:
+        if time.monotonic() - self._rotated_at >= self.ttl or self._current.count >= self.capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._rotated_at = time.monotonic()
+            self.rotations += 1
+
+    def add(self, item: str) -> None:
+        self._maybe_rotate()
+        self._current.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        self._maybe_rotate()
+        found = item in self._current or (self._previous is not None and item in self._previous)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "items": self._current.count + (self._previous.count if self._previous else 0),
+            "capacity": self.capacity,
+            "bytes": len(self._current._bits) * 2,
+            "rotations": self.rotations,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,105 @@
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from config import SUPPORTED_CHAINS
+from utils.tokenRecord import TokenRecord
+
+# Regex pattern to detect if the token is an EVM contract address (42 hex characters)
+EVM_CONTRACT_ADDRESS_PATTERN = re.compile(r"^0x[a-fA-F0-9]{40}$")
+
+# Regex pattern for detecting Solana Virtual Machine (SVM) contract addresses (Base58, typically 32 bytes)
+SVM_CONTRACT_ADDRESS_PATTERN = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{32,44}$")
+
+
+class Chain(NamedTuple):
+    """One supported chain and what each upstream calls it."""
+    id: str  # LiFi chain ID, the canonical ID used in cache keys and token records
+    name: str
+    acme_id: str  # Chain ID Acme's currency and intent endpoints expect
+    coingecko_platform: str  # CoinGecko asset platform ID
+    dex_aggregator: str  # DEX aggregator Acme registers the chain's currencies for
+    vm: str  # "evm" or "svm"
+
+
+def address_vm(address: str) -> Optional[str]:
+    """The VM an address belongs to by its shape ("evm" or "svm"), or None if it isn't an address."""
+    address = (address or "").strip()
+    if EVM_CONTRACT_ADDRESS_PATTERN.match(address):
+        return "evm"
+    if SVM_CONTRACT_ADDRESS_PATTERN.match(address):
+        return "svm"
+    return None
+
+
+class ChainRegistry:
+    """
+    Supported chains, looked up by any of their LiFi, Acme or CoinGecko identifiers.
+
+    Everything that keys on a token (caches, memos, indexes) goes through
+    token_key, so "solana" and "1151111081099710", or a checksummed and a
+    lowercase EVM address, land on the same entry.
+    """
+
+    def __init__(self, chains: Iterable[dict]):
+        self._chains: List[Chain] = [Chain(**{field: str(value) for field, value in chain.items()}) for chain in chains]
+        self._aliases: dict = {}
+        for chain in self._chains:
+            for alias in (chain.id, chain.acme_id, chain.coingecko_platform, chain.name):
+                self._aliases.setdefault(alias.lower(), chain)
+
+    def __iter__(self):
+        return iter(self._chains)
+
+    def get(self, chain_id) -> Optional[Chain]:
+        """The chain for a LiFi/Acme chain ID, CoinGecko platform or name, or None if unsupported."""
+        if chain_id is None:
+            return None
+        return self._aliases.get(str(chain_id).strip().lower())
+
+    def canonical_id(self, chain_id) -> Optional[str]:
+        """The canonical (LiFi) ID of a chain; unsupported IDs are passed through as strings."""
+        chain = self.get(chain_id)
+        if chain:
+            return chain.id
+        return None if chain_id is None else str(chain_id)
+
+    def acme_id(self, chain_id) -> Optional[str]:
+        chain = self.get(chain_id)
+        return chain.acme_id if chain else self.canonical_id(chain_id)
+
+    def coingecko_platform(self, chain_id) -> Optional[str]:
+        chain = self.get(chain_id)
+        return chain.coingecko_platform if chain else None
+
+    def dex_aggregator(self, chain_id) -> str:
+        chain = self.get(chain_id)
+        return chain.dex_aggregator if chain else "LiFi"
+
+    def lifi_chains(self, token: str) -> List[Tuple[str, str]]:
+        """(chain ID, CoinGecko platform) pairs to look `token` up on: an address's VM's chains, or every chain for a symbol."""
+        vm = address_vm(token)
+        return [(chain.id, chain.coingecko_platform) for chain in self._chains if vm is None or chain.vm == vm]
+
+    def normalize_address(self, address: str, chain_id=None) -> str:
+        """Canonical form of an address: EVM addresses are case-insensitive and lowercased, Solana's are kept as is."""
+        address = (address or "").strip()
+        chain = self.get(chain_id)
+        vm = chain.vm if chain else address_vm(address)
+        return address.lower() if vm == "evm" or address.startswith("0x") else address
+
+    def token_key(self, chain_id, address: str) -> Tuple[Optional[str], str]:
+        """Normalized (chain, address) identity of a token."""
+        return self.canonical_id(chain_id), self.normalize_address(address, chain_id)
+
+    def token_identity(self, token: dict) -> Tuple[Optional[str], str]:
+        """token_key of a token record, whichever of Acme's, LiFi's or our own field names it uses."""
+        chain_id = token.get("chainId") or token.get("chain_id")
+        address = token.get("address") or token.get("tokenAddress") or token.get("contract_address") or ""
+        return self.token_key(chain_id, address)
+
+    def token_record(self, token) -> TokenRecord:
+        """The shared TokenRecord for a token dict (or record), on the token's canonical chain ID."""
+        chain_id, _ = self.token_identity(token)
+        return TokenRecord.from_dict(token, chainId=chain_id)
+
+
+CHAINS = ChainRegistry(SUPPORTED_CHAINS)
@@ -0,0 +1,113 @@
+import time
+import aiohttp
+from config import logger, CIRCUIT_BREAKERS
+from utils.metrics import register_metrics
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(f"{upstream}: circuit open, retrying in {retry_in:.1f}s.")
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream.
+
+    closed:    calls go through; consecutive failures are counted.
+    open:      calls fail fast until `recovery_timeout` has passed.
+    half_open: a limited number of trial calls go through; a success closes
+               the circuit, a failure opens it again.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+        # Counters exposed through /metrics
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"Circuit for {self.name} is half-open, allowing trial calls.")
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected outright (does not consume a half-open trial)."""
+        state = self.state
+        return state == self.OPEN or (state == self.HALF_OPEN and self._half_open_calls >= self.half_open_max_calls)
+
+    def allow_request(self) -> bool:
+        """Return whether a call may go through, reserving a trial slot when half-open."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def before_request(self) -> None:
+        """Raise CircuitOpenError if the call must not go through."""
+        if not self.allow_request():
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(self.name, retry_in)
+
+    def release(self) -> None:
+        """Give back a half-open trial slot for a call that neither succeeded nor failed upstream."""
+        if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed again.")
+        self._state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit for {self.name} opened after {self._failures} consecutive failures.")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+# One breaker per upstream (acme, lifi, coingecko, cloudflare, telegram, default)
+CIRCUIT_BREAKER_REGISTRY = {name: CircuitBreaker(name, **settings) for name, settings in CIRCUIT_BREAKERS.items()}
+
+
+def get_circuit_breaker(upstream: str) -> CircuitBreaker:
+    """Return the circuit breaker for `upstream`, falling back to the default breaker."""
+    return CIRCUIT_BREAKER_REGISTRY.get(upstream) or CIRCUIT_BREAKER_REGISTRY["default"]
+
+
+register_metrics("circuit_breakers", lambda: {name: breaker.stats() for name, breaker in CIRCUIT_BREAKER_REGISTRY.items()})
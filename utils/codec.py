@@ -0,0 +1,118 @@
+# One JSON codec for webhook payloads and upstream bodies: bodies are decoded once,
+# straight from bytes (orjson when installed, stdlib json otherwise), into small
+# immutable structs at the boundary. Kept free of config imports so benchmarks can use it.
+from typing import Any, List, NamedTuple, Optional, Union
+
+try:
+    import orjson
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    BACKEND = "orjson"
+except ImportError:  # pragma: no cover - exercised only without orjson
+    import json
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    BACKEND = "json"
+
+
+class CoinGeckoPrice(NamedTuple):
+    """One entry of CoinGecko's /simple/token_price response."""
+    address: str
+    usd: Optional[float] = None
+    usd_market_cap: Optional[float] = None
+    usd_24h_vol: Optional[float] = None
+    usd_24h_change: Optional[float] = None
+    last_updated_at: Optional[int] = None
+
+
+class LifiToken(NamedTuple):
+    """The fields of a LiFi /token response the bot uses."""
+    address: str
+    symbol: str
+    name: str
+    decimals: int
+    chainId: int
+    logoURI: str = ""
+    priceUSD: Optional[str] = None
+
+    def to_dict(self, **extra) -> dict:
+        """Token dict in the shape the token pipeline works with, plus `extra` keys."""
+        token = self._asdict()
+        token.update(extra)
+        return token
+
+
+class AcmeCurrency(NamedTuple):
+    """A currency record from Acme's currency endpoints."""
+    id: str
+    symbol: str
+    name: str
+    address: str
+    chainId: str
+    decimals: int
+    logoUrl: str = ""
+    isEnabled: bool = True
+
+
+def decode_coingecko_prices(body: Union[bytes, str]) -> List[CoinGeckoPrice]:
+    """Decode a /simple/token_price body into one CoinGeckoPrice per contract address."""
+    data = loads(body) or {}
+    return [
+        CoinGeckoPrice(
+            address=address,
+            usd=fields.get("usd"),
+            usd_market_cap=fields.get("usd_market_cap"),
+            usd_24h_vol=fields.get("usd_24h_vol"),
+            usd_24h_change=fields.get("usd_24h_change"),
+            last_updated_at=fields.get("last_updated_at"),
+        )
+        for address, fields in data.items()
+        if isinstance(fields, dict)
+    ]
+
+
+def decode_lifi_token(body: Union[bytes, str]) -> Optional[LifiToken]:
+    """Decode a LiFi /token body, or return None if it isn't a usable token."""
+    data = loads(body)
+    if not isinstance(data, dict) or not data.get("symbol") or not data.get("address"):
+        return None
+    return LifiToken(
+        address=data["address"],
+        symbol=data["symbol"],
+        name=data.get("name", ""),
+        decimals=data.get("decimals", 0),
+        chainId=data.get("chainId"),
+        logoURI=data.get("logoURI") or "",
+        priceUSD=data.get("priceUSD"),
+    )
+
+
+def decode_acme_currency(record: dict) -> AcmeCurrency:
+    """Build an AcmeCurrency from one decoded Acme currency record."""
+    return AcmeCurrency(
+        id=record.get("id", ""),
+        symbol=record.get("symbol", ""),
+        name=record.get("name", ""),
+        address=record.get("address", ""),
+        chainId=str(record.get("chainId", "")),
+        decimals=record.get("decimals", 0),
+        logoUrl=record.get("logoUrl") or "",
+        isEnabled=record.get("isEnabled", True),
+    )
+
+
+def decode_acme_currencies(body: Union[bytes, str]) -> List[AcmeCurrency]:
+    """Decode an Acme currency listing ({"data": [...]} or a bare list) into AcmeCurrency records."""
+    data = loads(body)
+    records = data.get("data", []) if isinstance(data, dict) else data
+    return [decode_acme_currency(record) for record in records or [] if isinstance(record, dict)]
@@ -1,16 +1,55 @@
-import requests
-from config import ACME_API_KEY, ACME_URL, logger
+import aiohttp
+from decimal import Decimal, InvalidOperation
 
-def create_pay_link(tg_key: str, chain_id: str, token_address: str, amount: float, to: str, redirect_url: str) -> str:
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config import logger, ACME_API_KEY, ACME_URL, PAY_LINK_CACHE_TTL
+from utils.cache import TTLCache
+from utils.chains import CHAINS
+from utils.httpClient import upstream_request
+from utils.metrics import register_metrics
+from utils.singleFlight import get_single_flight
+
+# Links per (intent, user, chain, token, amount, receiver), so repeated taps reuse one pay intent
+PAY_LINK_CACHE = TTLCache(maxsize=4096, ttl=PAY_LINK_CACHE_TTL)
+register_metrics("pay_link_cache", PAY_LINK_CACHE.stats)
+
+
+def normalize_amount(amount) -> str:
+    """
+    Return the amount as a plain decimal string ("1.50" -> "1.5", "1e1" -> "10").
+
+    Raises:
+        ValueError: If the amount is not a positive number.
+    """
+    try:
+        value = Decimal(str(amount).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount}")
+    if not value.is_finite() or value <= 0:
+        raise ValueError(f"Invalid amount: {amount}")
+    return format(value.normalize(), 'f')
+
+
+async def create_pay_link(update: Update, context: ContextTypes.DEFAULT_TYPE, intent: str,
+    chain_id: str, token_address: str, amount, to: str, redirect_url: str
+) -> str:
     """
-    Create a payment link using the provided parameters and Telegram key.
+    Create a payment link for a pay or request intent.
+
+    Links are memoized per (intent, user, chain, token, amount, receiver) for
+    PAY_LINK_CACHE_TTL seconds, and concurrent taps share one Acme call, so
+    repeated taps don't create new intents.
 
     Args:
-        tg_key (str): The Telegram key to be included in the request headers.
+        update (Update): The Telegram update instance.
+        context (ContextTypes.DEFAULT_TYPE): Telegram context containing user data.
+        intent (str): 'pay' or 'request'.
         chain_id (str): The blockchain ID for the token.
         token_address (str): The contract address of the token.
-        amount (float): The amount to be paid.
-        to (str): The receiver address for the payment.
+        amount (float or str): The amount to be paid.
+        to (str): The receiver of the payment.
         redirect_url (str): The URL to redirect after the payment.
 
     Returns:
@@ -19,51 +58,60 @@ def create_pay_link(tg_key: str, chain_id: str, token_address: str, amount: floa
     Raises:
         ValueError: If any required argument is missing or if the API request fails.
     """
-    # Prepare the headers with API key and tg_key
+    if not (chain_id and token_address and to):
+        raise ValueError("Chain, token and receiver are required to create a payment link.")
+    amount = normalize_amount(amount)
+
+    key = (intent, update.effective_user.id, *CHAINS.token_key(chain_id, token_address), amount, str(to))
+    pay_link = PAY_LINK_CACHE.get(key)
+    if pay_link:
+        logger.debug(f"Reusing {intent} link for user {update.effective_user.id}: {pay_link}")
+        return pay_link
+
+    pay_link = await get_single_flight("pay_links").do(
+        key, lambda: _create_pay_intent(update, context, chain_id, token_address, amount, to, redirect_url)
+    )
+    PAY_LINK_CACHE.set(key, pay_link)
+    return pay_link
+
+
+async def _create_pay_intent(update: Update, context: ContextTypes.DEFAULT_TYPE,
+    chain_id: str, token_address: str, amount: str, to: str, redirect_url: str
+) -> str:
+    """Create a pay intent on Acme and return its link."""
+    from handlers.auth_handler import create_tg_key
+
     headers = {
         "accept": "application/json",
         "content-type": "application/json",
         "X-API-KEY": ACME_API_KEY,
-        'X-Secure-TG-User-Info': tg_key  # Include tg_key in headers
+        'X-Secure-TG-User-Info': await create_tg_key(update, context),
     }
 
-    # Prepare the payload using function arguments
     payload = {
-        "chainId": chain_id,
+        "chainId": CHAINS.acme_id(chain_id),
         "contractAddress": token_address,
-        "to": to,  # Use the provided receiver address
-        "amount": str(amount),  # Convert amount to string
+        "to": to,
+        "amount": amount,
         "intentLimit": 1,
         "redirectUrl": redirect_url
     }
 
-    # Construct the request URL
     url_to_post = f"{ACME_URL}/intent/create-pay-intent"
 
+    # Retries reuse one idempotency key so a slow first attempt can't create a second intent
     try:
-        # Send POST request
-        response = requests.post(url_to_post, json=payload, headers=headers)
-
-        # Log the response for debugging purposes
-        logger.debug(f"POST request sent to: {url_to_post}, Response: {response.status_code}, Content: {response.content}")
+        response = await upstream_request("POST", url_to_post, json=payload, headers=headers)
+        logger.debug("POST request sent to: %s, Response: %s, Content: %s", url_to_post, response.status, response.body)
 
-        # Check if the response status is OK (200)
-        if response.status_code == 200:
-            # Parse the response to get the payment link
-            response_data = response.json()
-            return response_data.get('data')
+        if response.status == 200:
+            pay_link = response.json().get('data')
+            if pay_link:
+                return pay_link
+            logger.error("Acme returned no payment link.")
         else:
-            logger.error(f"Failed to create payment link from Acme. Status code: {response.status_code}, Content: {response.content}")
-            response.raise_for_status()  # Raise an HTTPError for bad responses
-
-    except requests.exceptions.RequestException as e:
-        logger.exception(f"Request to Acme API failed while creating payment link: {str(e)}")
-        raise ValueError(f"Failed to create payment link due to a request error: {str(e)}")
-
-    except ValueError as ve:
-        logger.exception(f"Value error while creating payment link: {str(ve)}")
-        raise ve  # Re-raise the ValueError for further handling if necessary
+            logger.error(f"Failed to create payment link from Acme. Status code: {response.status}, Content: {response.text()}")
+    except aiohttp.ClientError as e:
+        logger.error(f"Request to Acme API failed while creating payment link: {str(e)}")
 
-    except Exception as e:
-        logger.exception(f"An unexpected error occurred while obtaining the payment link from Acme: {str(e)}")
-        raise ValueError(f"An unexpected error occurred while obtaining the payment link from Acme: {str(e)}")
+    raise ValueError("Failed to create payment link after multiple attempts.")
@@ -1,11 +1,13 @@
 import aiohttp
-import asyncio
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from config import logger, DEFAULT_ACME_API_KEY, ACME_URL, DEFAULT_TIMEOUT, RETRY_COUNT
-from utils.reply import send_error_message  # Ensure you import the necessary utility functions
+from config import logger, DEFAULT_ACME_API_KEY, ACME_URL
+from utils.httpClient import upstream_request
+from utils.singleFlight import get_single_flight
+from utils.chains import CHAINS
+from utils.tradingLinkMemo import TRADING_LINK_MEMO, trading_link_key
 
 
 async def create_trading_link(update: Update,
@@ -15,6 +17,10 @@ async def create_trading_link(update: Update,
     Create a trading link using the provided parameters and Telegram key.
     Sends a failure message if the operation fails or times out.
 
+    Links are memoized per (API key, chain, token address), so asking for the
+    same token again reuses the intent, and anonymous users on the default
+    key share one link per token.
+
     Args:
         context (ContextTypes.DEFAULT_TYPE): Telegram context containing user data.
         chain_id (str): Blockchain ID for the token.
@@ -32,16 +38,39 @@ async def create_trading_link(update: Update,
     # Get API key from user data or fallback to default
     auth_result = await get_auth_result(update, context)
     acme_api_key = auth_result.get('api_key') if auth_result and 'api_key' in auth_result else DEFAULT_ACME_API_KEY
+    return await get_or_create_trading_link(acme_api_key, chain_id, token_address, redirect_url)
+
+
+async def get_or_create_trading_link(acme_api_key: str, chain_id: str, token_address: str, redirect_url: str = "") -> str:
+    """
+    Return the memoized trading link for (API key, chain, token address), creating it on Acme if needed.
 
+    Raises:
+        ValueError: If the link has to be created and Acme fails.
+    """
     headers = {
         "accept": "application/json",
         "content-type": "application/json",
         "X-API-KEY": acme_api_key,
     }
 
-    # Adjust chain ID if necessary
-    chain_id = 'solana' if str(chain_id) == "1151111081099710" else str(chain_id)
+    key = trading_link_key(acme_api_key, chain_id, token_address, redirect_url)
+    chain_id = CHAINS.acme_id(chain_id)  # Acme calls Solana "solana"
+    trading_link = TRADING_LINK_MEMO.get(key)
+    if trading_link:
+        logger.debug(f"Reusing trading link for {chain_id}/{token_address}: {trading_link}")
+        return trading_link
+
+    trading_link = await get_single_flight("trading_links").do(
+        key, lambda: _create_buy_intent(headers, chain_id, token_address, redirect_url)
+    )
+    if trading_link:
+        TRADING_LINK_MEMO.set(key, trading_link)
+    return trading_link
+
 
+async def _create_buy_intent(headers: dict, chain_id: str, token_address: str, redirect_url: str) -> str:
+    """Create a buy purchase link intent on Acme and return its link."""
     acme_api = f"{ACME_URL}/dev/intent/create-buy-purchase-link-intent"
 
     # Prepare the payload
@@ -53,25 +82,19 @@ async def create_trading_link(update: Update,
 
     #logger.debug(f"Calling Trade: {acme_api} {headers} {payload}")
     
-    for attempt in range(RETRY_COUNT):
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)) as session:
-            try:
-                async with session.post(acme_api, json=payload, headers=headers) as response:
-                    logger.debug(f"Response: {response.status}, Content: {await response.text()}")
-    
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get('data')
-    
-                    logger.error(f"Failed on attempt {attempt + 1}. Status: {response.status}")
-                    response.raise_for_status()
-    
-            except asyncio.TimeoutError:
-                logger.error(f"Attempt {attempt + 1}: Request to create trading link timed out.")
-            except aiohttp.ClientError as e:
-                logger.exception(f"Attempt {attempt + 1}: Request failed: {str(e)}")
-            except Exception as e:
-                logger.error(f"Unexpected error on attempt {attempt + 1}: {str(e)}")
-    
+    # Retries reuse one idempotency key so a slow first attempt can't create a second intent
+    try:
+        response = await upstream_request("POST", acme_api, json=payload, headers=headers)
+        logger.debug("Response: %s, Content: %s", response.status, response.body)
+
+        if response.status == 200:
+            return response.json().get('data')
+
+        logger.error(f"Failed to create trading link. Status: {response.status}")
+    except aiohttp.ClientError as e:
+        logger.error(f"Request to create trading link failed: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error creating trading link: {str(e)}")
+
     # Raise a ValueError to indicate failure after retries
     raise ValueError("Failed to create trading link after multiple attempts.")
\ No newline at end of file
@@ -0,0 +1,65 @@
+import time
+import aiohttp
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional
+
+# Monotonic time by which the update being handled must be answered. Context
+# variables are copied into tasks, so gather()-ed helpers inherit the deadline.
+_deadline: ContextVar[Optional[float]] = ContextVar("update_deadline", default=None)
+
+
+class DeadlineExceeded(aiohttp.ClientError):
+    """Raised instead of starting (or retrying) an upstream call once the update's deadline has passed."""
+
+    def __init__(self, what: str = "request"):
+        super().__init__(f"Update deadline exceeded before {what} could complete.")
+
+
+@contextmanager
+def update_deadline(seconds: float):
+    """Run the block with a deadline `seconds` from now, keeping an earlier deadline if one is already set."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def clear_deadline() -> None:
+    """Drop the deadline for the rest of the current task, for background work started while handling an update."""
+    _deadline.set(None)
+
+
+async def run_without_deadline(awaitable: Awaitable):
+    """
+    Await `awaitable` with no deadline, for a task shared by several updates.
+
+    Tasks copy the context of whoever starts them, so without this the first
+    caller's deadline would cut the shared call short for every waiter.
+    """
+    clear_deadline()
+    return await awaitable
+
+
+def time_left() -> Optional[float]:
+    """Seconds left before the current deadline, or None when no deadline is set."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def cap_timeout(timeout: float, what: str = "request") -> float:
+    """
+    Cap `timeout` to the time left before the deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed.
+    """
+    remaining = time_left()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded(what)
+    return min(timeout, remaining)
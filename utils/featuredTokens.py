@@ -0,0 +1,95 @@
+import time
+import asyncio
+from typing import Optional
+from config import (
+    logger, DEFAULT_ACME_API_KEY, FEATURED_TOKENS_TRADE, FEATURED_TOKENS_LIST, FEATURED_TOKENS_PAY,
+    FEATURED_WARMUP_INTERVAL, TOKEN_CACHE_TTL, TOKEN_VALIDATION_CONCURRENCY
+)
+from utils.createTradingLink import get_or_create_trading_link
+from utils.deadline import update_deadline
+from utils.getTokenMarketData import fetch_and_format_token_market_data
+from utils.metrics import register_metrics
+from utils.tokenValidator import fetch_token_data_from_chains
+
+WARMUP_STATS = {"runs": 0, "last_run": None, "last_seconds": None, "warmed": 0, "failed": []}
+register_metrics("featured_warmup", lambda: dict(WARMUP_STATS))
+
+_tokens_refreshed_at = None  # Monotonic time the featured token records were last resolved again
+
+
+def featured_symbols() -> list:
+    """Every symbol behind the featured token buttons, in button order and without duplicates."""
+    symbols = []
+    for featured in (FEATURED_TOKENS_TRADE, FEATURED_TOKENS_LIST, FEATURED_TOKENS_PAY):
+        for button in featured:
+            for tokens in button.values():
+                for symbol in tokens.upper().split():
+                    if symbol not in symbols:
+                        symbols.append(symbol)
+    return symbols
+
+
+async def _warm_token(symbol: str, refresh_token: bool, refresh_market: bool) -> bool:
+    """Resolve one featured token and warm its market data and default-key trading link."""
+    token_data = await fetch_token_data_from_chains(symbol, refresh=refresh_token)
+    if not token_data:
+        return False
+    chain_id, address = token_data.get("chainId"), token_data.get("address")
+    await fetch_and_format_token_market_data(address, chain_id, token_data.get("decimals"), refresh=refresh_market)
+    # Anonymous users share links made with the default key, so theirs can be created ahead of time
+    await get_or_create_trading_link(DEFAULT_ACME_API_KEY, chain_id, address)
+    return True
+
+
+async def warm_featured_tokens(refresh: bool = False, timeout: Optional[float] = None) -> None:
+    """
+    Resolve the featured tokens and warm their token records, market data and anonymous trading links.
+
+    Args:
+        refresh (bool): Fetch market data again even if cached, so it never expires between runs.
+            Token records are resolved again once half of TOKEN_CACHE_TTL has passed.
+        timeout (float, optional): Seconds before pending upstream calls give up. Defaults to None.
+    """
+    global _tokens_refreshed_at
+    started = time.monotonic()
+    refresh_tokens = refresh and (_tokens_refreshed_at is None or started - _tokens_refreshed_at > TOKEN_CACHE_TTL / 2)
+    symbols = featured_symbols()
+    semaphore = asyncio.Semaphore(TOKEN_VALIDATION_CONCURRENCY)
+
+    async def warm(symbol):
+        async with semaphore:
+            return await _warm_token(symbol, refresh_tokens, refresh)
+
+    if timeout is None:
+        results = await asyncio.gather(*(warm(symbol) for symbol in symbols), return_exceptions=True)
+    else:
+        with update_deadline(timeout):
+            results = await asyncio.gather(*(warm(symbol) for symbol in symbols), return_exceptions=True)
+    if refresh_tokens or _tokens_refreshed_at is None:
+        _tokens_refreshed_at = started
+
+    failed = []
+    for symbol, result in zip(symbols, results):
+        if result is not True:
+            failed.append(symbol)
+        if isinstance(result, Exception):
+            logger.warning(f"Could not warm featured token {symbol}: {result}")
+
+    WARMUP_STATS.update(
+        runs=WARMUP_STATS["runs"] + 1,
+        last_run=time.time(),
+        last_seconds=round(time.monotonic() - started, 3),
+        warmed=len(symbols) - len(failed),
+        failed=failed,
+    )
+    logger.info(f"Warmed {len(symbols) - len(failed)}/{len(symbols)} featured tokens in {WARMUP_STATS['last_seconds']}s.")
+
+
+async def keep_featured_tokens_warm(interval: float = FEATURED_WARMUP_INTERVAL) -> None:
+    """Refresh the featured tokens every `interval` seconds, before their cached market data goes stale."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await warm_featured_tokens(refresh=True)
+        except Exception as e:
+            logger.error(f"Featured token warm-up failed: {e}")
@@ -5,6 +5,7 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from utils.tokenValidator import validate_tokens
 from config import logger, MAX_LISTED_TOKENS
+from utils.httpClient import upstream_request
 
 ACME_API_URL_PROFILE = f"{ACME_URL}/checkout/user/get-public-profile"
 ACME_API_URL_TOKENS = f"{ACME_URL}/checkout/intent/get-user-listed-tokens"
@@ -15,16 +16,15 @@ async def get_acme_public_profile(username: str) -> dict:
         username = username[1:]
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{ACME_API_URL_PROFILE}?userName={username}") as response:
-                logger.info(f"{ACME_API_URL_PROFILE}?userName={username}")
-                if response.status == 200:
-                    acme_user_data = await response.json()
-                    logger.info(f"Successfully retrieved Acme profile for username: {username}")
-                    return acme_user_data.get('data')  # Return only the 'data' field
-                else:
-                    logger.error(f"Failed to retrieve Acme profile for username: {username}. Status code: {response.status}")
-                    return None
+        response = await upstream_request("GET", f"{ACME_API_URL_PROFILE}?userName={username}", cache=True)
+        logger.info(f"{ACME_API_URL_PROFILE}?userName={username}")
+        if response.status == 200:
+            acme_user_data = response.json()
+            logger.info(f"Successfully retrieved Acme profile for username: {username}")
+            return acme_user_data.get('data')  # Return only the 'data' field
+        else:
+            logger.error(f"Failed to retrieve Acme profile for username: {username}. Status code: {response.status}")
+            return None
     except aiohttp.ClientError as e:
         logger.error(f"Error fetching Acme profile for username: {username}. Exception: {e}")
         return None
@@ -33,15 +33,14 @@ async def get_acme_public_profile(username: str) -> dict:
 async def get_user_listed_tokens(user_id: str) -> list:
     """Fetch the list of tokens listed by a given user."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{ACME_API_URL_TOKENS}?userId={user_id}") as response:
-                if response.status == 200:
-                    token_data = await response.json()
-                    logger.info(f"Successfully retrieved tokens for user ID: {user_id}")
-                    return token_data.get('data', [])
-                else:
-                    logger.error(f"Failed to retrieve tokens for user ID: {user_id}. Status code: {response.status}")
-                    return []
+        response = await upstream_request("GET", f"{ACME_API_URL_TOKENS}?userId={user_id}", cache=True)
+        if response.status == 200:
+            token_data = response.json()
+            logger.info(f"Successfully retrieved tokens for user ID: {user_id}")
+            return token_data.get('data', [])
+        else:
+            logger.error(f"Failed to retrieve tokens for user ID: {user_id}. Status code: {response.status}")
+            return []
     except aiohttp.ClientError as e:
         logger.error(f"Error fetching tokens for user ID: {user_id}. Exception: {e}")
         return []
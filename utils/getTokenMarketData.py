@@ -1,22 +1,58 @@
 import aiohttp
-from config import logger, SUPPORTED_CHAIN_IDS
-
-async def fetch_and_format_token_market_data(contract_address: str, chain_id: str, decimals: str) -> dict:
+from http import HTTPStatus
+from config import logger, MARKET_DATA_CACHE_TTL
+from utils.cache import TTLCache
+from utils.chains import CHAINS
+from utils.httpClient import upstream_request
+from utils.metrics import register_metrics
+from utils.rateLimiter import RateLimitExceeded
+from utils.circuitBreaker import CircuitOpenError
+from utils.singleFlight import get_single_flight
+from utils.deadline import DeadlineExceeded
+from utils.codec import decode_coingecko_prices
+
+# Formatted market data per normalized (chain, contract address), reused while fresh and
+# served stale when CoinGecko is over budget or rate limiting us
+MARKET_DATA_CACHE = TTLCache(maxsize=2048, ttl=MARKET_DATA_CACHE_TTL)
+register_metrics("market_data_cache", MARKET_DATA_CACHE.stats)
+
+async def fetch_and_format_token_market_data(contract_address: str, chain_id: str, decimals: str, refresh: bool = False) -> dict:
     """
     Fetches and formats token data from CoinGecko API based on the token symbol and chain ID.
 
     Args:
         contract_address (str): The address of the token contract.
         chain_id (str): The chain ID.
+        refresh (bool): Fetch again even if fresh data is cached, e.g. to keep it warm.
 
     Returns:
         dict: Formatted token data including change_24h, mcap, volume_24h, circulating_supply, and total_supply.
     """
-    # Get the platform ID from the supported chain IDs, default to 'solana' if not found
-    logger.debug(f"Chain ID {chain_id} for Coingecko: {SUPPORTED_CHAIN_IDS.get(str(chain_id))}")
+    # Get the CoinGecko platform ID from the chain registry
+    platform_id = CHAINS.coingecko_platform(chain_id)
+    logger.debug(f"Chain ID {chain_id} for Coingecko: {platform_id}")
+    if platform_id is None:
+        logger.warning(f"No CoinGecko platform for chain {chain_id}, skipping market data of {contract_address}.")
+        return {}
+
+    cache_key = CHAINS.token_key(chain_id, contract_address)
+    cached = None if refresh else MARKET_DATA_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Users asking about the same trending token at once share one CoinGecko call
+    try:
+        market_data = await get_single_flight("market_data").do(
+            cache_key, lambda: _fetch_market_data(platform_id, contract_address, cache_key)
+        )
+    except DeadlineExceeded as e:
+        logger.warning(f"{e} Serving cached market data for {contract_address}.")
+        market_data = MARKET_DATA_CACHE.get(cache_key, {}, allow_stale=True)
+    return dict(market_data)
 
-    platform_id = SUPPORTED_CHAIN_IDS.get(str(chain_id), 'solana')
 
+async def _fetch_market_data(platform_id: str, contract_address: str, cache_key: tuple) -> dict:
+    """Fetch market data for one contract from CoinGecko and cache the formatted result."""
     # Build the CoinGecko API URL
     url = (
         f"https://api.coingecko.com/api/v3/simple/token_price/{platform_id}"
@@ -30,35 +66,41 @@ async def fetch_and_format_token_market_data(contract_address: str, chain_id: st
     #logger.debug(f"CoinGecko API URL: {url}")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            # Make the GET request to fetch token data
-            async with session.get(url) as response:
-                response.raise_for_status()  # Raise an error for bad responses
-                data = await response.json()  # Await the JSON response
-
-                #logger.debug(f"Response data from CoinGecko: {data}")
-
-                if not data:
-                    logger.warning(f"No data found for token address: {contract_address}")
-                    return {}
-
-                # Extract the contract address from the keys (assuming you want the first one)
-                contract_address = list(data.keys())[0]
-                data = data[contract_address]  # Access the data for that specific contract
-
-                # Extract and format financial metrics
-                formatted_data = {
-                    "price": format_financial_metrics(data.get("usd"), "price"),
-                    "change_24h": format_financial_metrics(data.get("usd_24h_change"), "change_24h"),
-                    "mcap": format_financial_metrics(data.get("usd_market_cap"), "mcap"),
-                    "volume_24h": format_financial_metrics(data.get("usd_24h_vol"), "volume"),
-                    # "circulating_supply": format_financial_metrics(data.get("circulating_supply"), "circulating_supply"),
-                    # "total_supply": format_financial_metrics(data.get("total_supply"), "total_supply")
-                }
-
-                logger.info(f"Successfully fetched and formatted data for {contract_address}: {formatted_data}")
-                return formatted_data
-
+        # Make the GET request to fetch token data
+        response = await upstream_request("GET", url)
+        if response.status == HTTPStatus.TOO_MANY_REQUESTS:
+            logger.warning(f"CoinGecko rate limited market data for {contract_address}, serving cached data.")
+            return MARKET_DATA_CACHE.get(cache_key, {}, allow_stale=True)
+        if response.status != 200:
+            logger.error(f"CoinGecko market data request failed with status {response.status} for {contract_address}")
+            return {}
+        prices = decode_coingecko_prices(response.body)
+
+        if not prices:
+            logger.warning(f"No data found for token address: {contract_address}")
+            return {}
+
+        # One contract was requested, so the first entry is the one we want
+        price = prices[0]
+        contract_address = price.address
+
+        # Extract and format financial metrics
+        formatted_data = {
+            "price": format_financial_metrics(price.usd, "price"),
+            "change_24h": format_financial_metrics(price.usd_24h_change, "change_24h"),
+            "mcap": format_financial_metrics(price.usd_market_cap, "mcap"),
+            "volume_24h": format_financial_metrics(price.usd_24h_vol, "volume"),
+            # "circulating_supply": format_financial_metrics(data.get("circulating_supply"), "circulating_supply"),
+            # "total_supply": format_financial_metrics(data.get("total_supply"), "total_supply")
+        }
+
+        logger.info(f"Successfully fetched and formatted data for {contract_address}: {formatted_data}")
+        MARKET_DATA_CACHE.set(cache_key, formatted_data)
+        return formatted_data
+
+    except (RateLimitExceeded, CircuitOpenError) as e:
+        logger.warning(f"{e} Serving cached market data for {contract_address}.")
+        return MARKET_DATA_CACHE.get(cache_key, {}, allow_stale=True)
     except aiohttp.ClientError as e:
         logger.error(f"Failed to fetch token data from CoinGecko: {str(e)}")
         return {}  # Return empty dict in case of error
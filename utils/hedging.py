@@ -0,0 +1,67 @@
+from config import HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY, HEDGE_MAX_RATIO
+from utils.latencyStats import get_latency_window
+from utils.metrics import register_metrics
+
+
+class HedgeBudget:
+    """
+    Caps hedge volume to a share of eligible requests and tracks how often hedges win.
+
+    `hedge_rate` is hedged / eligible requests; `win_rate` is the share of hedges
+    that answered before the original request.
+    """
+
+    def __init__(self, max_ratio: float = HEDGE_MAX_RATIO):
+        self.max_ratio = max_ratio
+        self.eligible = 0
+        self.hedged = 0
+        self.wins = 0
+
+    def note_eligible(self) -> None:
+        self.eligible += 1
+
+    def try_acquire(self) -> bool:
+        """Return whether a hedge may be sent without going over the budget (plus one hedge of slack)."""
+        if self.hedged >= self.max_ratio * self.eligible + 1:
+            return False
+        self.hedged += 1
+        return True
+
+    def record_win(self) -> None:
+        self.wins += 1
+
+    def stats(self) -> dict:
+        return {
+            "eligible": self.eligible,
+            "hedged": self.hedged,
+            "wins": self.wins,
+            "hedge_rate": round(self.hedged / self.eligible, 4) if self.eligible else 0.0,
+            "win_rate": round(self.wins / self.hedged, 4) if self.hedged else 0.0,
+        }
+
+
+# Budgets keyed by endpoint ("upstream path")
+HEDGE_BUDGETS: dict = {}
+
+
+def get_hedge_budget(key: str) -> HedgeBudget:
+    budget = HEDGE_BUDGETS.get(key)
+    if budget is None:
+        budget = HEDGE_BUDGETS[key] = HedgeBudget()
+    return budget
+
+
+def hedge_delay(key: str) -> float:
+    """
+    Seconds to wait for the original request before sending a hedge.
+
+    Uses the endpoint's observed latency percentile once enough samples exist,
+    and a fixed default until then.
+    """
+    window = get_latency_window(key)
+    if len(window) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, window.percentile(HEDGE_PERCENTILE))
+
+
+register_metrics("hedging", lambda: {key: budget.stats() for key, budget in HEDGE_BUDGETS.items()})
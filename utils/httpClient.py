@@ -0,0 +1,377 @@
+import time
+import uuid
+import asyncio
+import aiohttp
+from dataclasses import dataclass
+from typing import Mapping, Optional
+from urllib.parse import urlsplit
+from multidict import CIMultiDict
+from config import (
+    logger, HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_WARM_CONNECTIONS_PER_HOST, DEFAULT_TIMEOUT, UPSTREAM_HOSTS, HEDGING_ENABLED, RATE_LIMIT_MAX_WAIT
+)
+from utils.circuitBreaker import get_circuit_breaker
+from utils.codec import loads
+from utils.deadline import DeadlineExceeded, cap_timeout, time_left
+from utils.adaptiveTimeout import get_adaptive_timeout
+from utils.hedging import get_hedge_budget, hedge_delay
+from utils.latencyStats import record_latency
+from utils.metrics import register_metrics
+from utils.singleFlight import get_single_flight, request_key
+from utils.rateLimiter import RateLimitExceeded, get_rate_limiter, throttle
+from utils.responseCache import RESPONSE_CACHE
+from utils.retryPolicy import get_retry_policy, parse_retry_after
+
+# Shared, application-scoped client session. Created in main() and closed on shutdown.
+_session: Optional[aiohttp.ClientSession] = None
+
+# Seconds the last warm-up took per origin, exposed through /metrics
+WARMUP_TIMINGS: dict = {}
+register_metrics("connection_warmup", lambda: dict(WARMUP_TIMINGS))
+
+
+class UpstreamError(aiohttp.ClientError):
+    """Raised when an upstream call fails for good (retries exhausted or a non-retryable error)."""
+
+    def __init__(self, upstream: str, message: str):
+        super().__init__(f"{upstream}: {message}")
+        self.upstream = upstream
+
+
+@dataclass
+class UpstreamResponse:
+    """Fully read upstream response, safe to use after the connection is released."""
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+    url: str
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        """Decode the body straight from bytes; every call returns fresh objects callers may mutate."""
+        return loads(self.body) if self.body else None
+
+
+def _build_session() -> aiohttp.ClientSession:
+    """Build a pooled client session with per-host limits, keep-alive and DNS caching."""
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+async def init_http_client() -> aiohttp.ClientSession:
+    """Create the shared client session. Safe to call more than once."""
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+        logger.info(
+            f"HTTP client initialized (pool: {HTTP_POOL_LIMIT}, per host: {HTTP_POOL_LIMIT_PER_HOST}, "
+            f"DNS TTL: {HTTP_DNS_CACHE_TTL}s, keep-alive: {HTTP_KEEPALIVE_TIMEOUT}s)."
+        )
+    return _session
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the shared client session.
+
+    Falls back to creating it lazily so helpers keep working when called
+    outside of main() (scripts, one-off jobs).
+    """
+    global _session
+    if _session is None or _session.closed:
+        logger.debug("HTTP client not initialized yet, creating it lazily.")
+        _session = _build_session()
+    return _session
+
+
+async def close_http_client() -> None:
+    """Close the shared client session and release pooled connections."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("HTTP client closed.")
+    _session = None
+
+
+async def _warm_origin(origin: str, connections: int, verbose: bool = False) -> float:
+    """
+    Open `connections` pooled connections to `origin` with concurrent HEAD requests and return the time taken.
+
+    On rate-limited hosts each ping spends a slot like any other request, and
+    is skipped rather than queued when the budget is spent.
+    """
+    session = get_http_session()
+    limiter = get_rate_limiter(origin)
+
+    async def touch():
+        if limiter is not None:
+            try:
+                limiter.reserve(max_wait=0)
+            except RateLimitExceeded:
+                return False
+        async with session.head(f"{origin}/", timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT), allow_redirects=False):
+            return True
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(touch() for _ in range(connections)), return_exceptions=True)
+    elapsed = time.monotonic() - started
+    errors = [result for result in results if isinstance(result, Exception)]
+    skipped = results.count(False)
+    if skipped:
+        logger.debug(f"Warming {origin}: skipped {skipped}/{connections} pings, its rate limit budget is spent.")
+    if errors:
+        logger.warning(f"Warming {origin}: {len(errors)}/{connections} connections failed ({errors[0]!r}).")
+    elif verbose:
+        logger.info(f"Warmed {connections} connection(s) to {origin} in {elapsed:.3f}s.")
+    WARMUP_TIMINGS[origin] = round(elapsed, 4)
+    return elapsed
+
+
+async def warm_up_connections(origins: list, connections_per_host: int = HTTP_WARM_CONNECTIONS_PER_HOST) -> dict:
+    """
+    Open a few keep-alive connections to each upstream so the first user request
+    doesn't pay for DNS and TLS. Failures are logged, never raised.
+
+    Args:
+        origins (list): Origins such as "https://li.quest".
+        connections_per_host (int): Connections to open per origin.
+
+    Returns:
+        dict: Seconds spent per origin.
+    """
+    timings = await asyncio.gather(*(_warm_origin(origin, connections_per_host, verbose=True) for origin in origins))
+    return dict(zip(origins, timings))
+
+
+async def keep_connections_warm(origins: list, interval: float, connections_per_host: int = HTTP_WARM_CONNECTIONS_PER_HOST) -> None:
+    """Re-use the pooled connections every `interval` seconds so the keep-alive timeout never closes them."""
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.gather(*(_warm_origin(origin, connections_per_host) for origin in origins))
+
+
+def upstream_for_url(url: str) -> str:
+    """Return the upstream name ('acme', 'lifi', ...) for a URL, or 'default' for unknown hosts."""
+    return UPSTREAM_HOSTS.get(urlsplit(url).hostname, "default")
+
+
+async def _send(method: str, url: str, timeout: float, **kwargs) -> UpstreamResponse:
+    """Perform a single request on the shared session and read the whole body."""
+    session = get_http_session()
+    async with session.request(method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs) as response:
+        body = await response.read()
+        return UpstreamResponse(status=response.status, headers=CIMultiDict(response.headers), body=body, url=str(response.url))
+
+
+async def _timed_send(latency_keys: tuple, method: str, url: str, timeout: float, **kwargs) -> UpstreamResponse:
+    """
+    Send a request and record its latency under each of `latency_keys`.
+
+    Timeouts are recorded too (as the time waited), so a slowing upstream pushes
+    its percentiles, and with them its adaptive timeout, up.
+    """
+    started = time.monotonic()
+    try:
+        response = await _send(method, url, timeout, **kwargs)
+    except asyncio.TimeoutError:
+        for key in latency_keys:
+            record_latency(key, time.monotonic() - started)
+        raise
+    elapsed = time.monotonic() - started
+    for key in latency_keys:
+        record_latency(key, elapsed)
+    return response
+
+
+async def _send_hedged(upstream: str, endpoint: str, method: str, url: str, timeout: float, **kwargs) -> UpstreamResponse:
+    """
+    Send a request and, if it hasn't answered within the endpoint's p95 latency,
+    send an identical hedge and return whichever answers first. The other one is cancelled.
+
+    Hedges are capped by the endpoint's HedgeBudget. A failed request only loses
+    the race if the other one succeeds.
+    """
+    budget = get_hedge_budget(endpoint)
+    budget.note_eligible()
+    latency_keys = (upstream, endpoint)
+    delay = hedge_delay(endpoint)
+    primary = asyncio.ensure_future(_timed_send(latency_keys, method, url, timeout, **kwargs))
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done or not budget.try_acquire():
+            return await primary
+
+        logger.debug(f"Hedging {method} {url} after {delay:.3f}s without an answer.")
+        hedge = asyncio.ensure_future(_timed_send(latency_keys, method, url, timeout, **kwargs))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        budget.record_win()
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def upstream_request(
+    method: str,
+    url: str,
+    *,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    json: Optional[object] = None,
+    data: Optional[object] = None,
+    idempotency_key: Optional[str] = None,
+    retry: bool = True,
+    hedge: bool = False,
+    coalesce: bool = True,
+    cache: bool = False,
+) -> UpstreamResponse:
+    """
+    Send a request to an upstream through the shared session, applying its
+    circuit breaker, rate limit and retry policy.
+
+    Retryable failures (timeouts, connection errors, 429/5xx) are retried with
+    exponential backoff and jitter, honouring Retry-After. Other statuses are
+    returned as-is for the caller to handle. POSTs to upstreams that support it
+    carry the same Idempotency-Key on every attempt.
+
+    Concurrent identical GETs (same URL, params and headers) share a single
+    upstream call and its response.
+
+    GETs made with `cache=True` keep the response's ETag/Last-Modified and
+    revalidate with If-None-Match/If-Modified-Since; a 304 is answered from
+    the stored copy.
+
+    Latency-critical GETs can opt into hedging: when HEDGING_ENABLED is set and
+    an attempt is slower than the endpoint's p95, an identical request is sent
+    and the first answer wins.
+
+    Per-attempt timeouts adapt to the upstream's recent latencies (see
+    utils.adaptiveTimeout). Inside an update deadline (see utils.deadline) every wait is capped to the
+    time left, and retries that can't finish in time are not attempted.
+
+    Args:
+        method (str): HTTP method.
+        url (str): Full request URL.
+        params (dict, optional): Query string parameters.
+        headers (dict, optional): Request headers.
+        json (object, optional): JSON body.
+        data (object, optional): Raw or form body.
+        idempotency_key (str, optional): Key to reuse for the request; generated if needed.
+        retry (bool): Set to False for bodies that can only be sent once (e.g. file uploads).
+        hedge (bool): Hedge slow attempts of an idempotent GET.
+        coalesce (bool): Share the call with identical GETs already in flight.
+        cache (bool): Revalidate against a stored copy instead of re-downloading unchanged bodies.
+
+    Returns:
+        UpstreamResponse: The last response received.
+
+    Raises:
+        UpstreamError: If no response could be obtained.
+        CircuitOpenError: If the upstream's circuit breaker is open.
+        RateLimitExceeded: If the upstream is over its rate limit budget.
+        DeadlineExceeded: If the update's deadline passed before a response came back.
+    """
+    upstream = upstream_for_url(url)
+    headers = dict(headers or {})
+    if method.upper() == "POST" and (get_retry_policy(upstream).idempotency_keys or idempotency_key):
+        headers.setdefault("Idempotency-Key", idempotency_key or uuid.uuid4().hex)
+
+    if method.upper() == "GET" and cache:
+        cache_key = request_key(method, url, params, headers)
+        cached = RESPONSE_CACHE.get(cache_key)
+        conditional_headers = {**headers, **RESPONSE_CACHE.validators(cached)} if cached else headers
+        response = await upstream_request(
+            method, url, params=params, headers=conditional_headers, retry=retry, hedge=hedge, coalesce=coalesce
+        )
+        if response.status == 304 and cached is not None:
+            RESPONSE_CACHE.hits += 1
+            return cached
+        RESPONSE_CACHE.misses += 1
+        RESPONSE_CACHE.store(cache_key, response)
+        return response
+
+    if coalesce and method.upper() == "GET" and json is None and data is None:
+        key = request_key(method, url, params, headers)
+        return await get_single_flight("upstream").do(
+            key, lambda: _request_with_policy(method, url, upstream, retry, hedge, params=params, headers=headers)
+        )
+    return await _request_with_policy(method, url, upstream, retry, hedge, params=params, headers=headers, json=json, data=data)
+
+
+async def _request_with_policy(method: str, url: str, upstream: str, retry: bool, hedge: bool, **kwargs) -> UpstreamResponse:
+    """Run the attempt loop of upstream_request: rate limit, circuit breaker, hedging and retries."""
+    policy = get_retry_policy(upstream)
+    breaker = get_circuit_breaker(upstream)
+    adaptive_timeout = get_adaptive_timeout(upstream)
+    hedged = hedge and HEDGING_ENABLED and method.upper() == "GET"
+    endpoint = f"{upstream} {urlsplit(url).path}"
+
+    attempts = policy.max_attempts if retry else 1
+    for attempt in range(attempts):
+        remaining = time_left()
+        await throttle(url, RATE_LIMIT_MAX_WAIT if remaining is None else max(0.0, min(RATE_LIMIT_MAX_WAIT, remaining)))
+        base_timeout = adaptive_timeout.timeout(policy.timeout)
+        timeout = cap_timeout(base_timeout, f"{method} {url}")
+        breaker.before_request()
+        last_attempt = attempt == attempts - 1
+        try:
+            if hedged:
+                response = await _send_hedged(upstream, endpoint, method, url, timeout, **kwargs)
+            else:
+                response = await _timed_send((upstream,), method, url, timeout, **kwargs)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            if timeout < base_timeout and isinstance(e, asyncio.TimeoutError):
+                breaker.release()  # Cut short by our deadline, not an upstream failure
+                raise DeadlineExceeded(f"{method} {url}") from e
+            if not policy.is_retryable_error(e):
+                breaker.release()  # Not the upstream's fault, so it doesn't count either way
+                raise UpstreamError(upstream, f"{method} {url} failed: {e!r}") from e
+            breaker.record_failure()
+            if last_attempt:
+                raise UpstreamError(upstream, f"{method} {url} failed after {attempts} attempts: {e!r}") from e
+            delay = policy.backoff(attempt)
+            if not _retry_fits_deadline(delay):
+                raise DeadlineExceeded(f"a retry of {method} {url}") from e
+            logger.warning(f"Attempt {attempt + 1}: {method} {url} failed ({e!r}), retrying in {delay:.2f}s.")
+        else:
+            if not policy.is_retryable_status(response.status):
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if last_attempt:
+                return response
+            delay = policy.backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+            if delay is None or not _retry_fits_deadline(delay):
+                logger.warning(f"Attempt {attempt + 1}: {method} {url} returned {response.status}, no time left to retry.")
+                return response
+            logger.warning(f"Attempt {attempt + 1}: {method} {url} returned {response.status}, retrying in {delay:.2f}s.")
+        await asyncio.sleep(delay)
+
+
+def _retry_fits_deadline(delay: float) -> bool:
+    """Whether sleeping `delay` still leaves time for another attempt before the deadline."""
+    remaining = time_left()
+    return remaining is None or remaining > delay
@@ -0,0 +1,66 @@
+from collections import deque
+from typing import Optional
+from utils.metrics import register_metrics
+
+# Upper bounds (seconds) of the buckets reported by LatencyWindow.histogram()
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class LatencyWindow:
+    """Rolling window of the most recent request latencies, in seconds."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the `pct` percentile (0-100) of the window, or None if it is empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def histogram(self) -> dict:
+        """Count of samples per latency bucket ("le_0.5" counts samples <= 0.5s that aren't in a lower bucket)."""
+        counts = {f"le_{bound:g}": 0 for bound in HISTOGRAM_BUCKETS}
+        counts["inf"] = 0
+        for sample in self._samples:
+            for bound in HISTOGRAM_BUCKETS:
+                if sample <= bound:
+                    counts[f"le_{bound:g}"] += 1
+                    break
+            else:
+                counts["inf"] += 1
+        return counts
+
+    def stats(self) -> dict:
+        p50, p95, p99 = (self.percentile(p) for p in (50, 95, 99))
+        return {
+            "samples": len(self._samples),
+            "p50": round(p50, 4) if p50 is not None else None,
+            "p95": round(p95, 4) if p95 is not None else None,
+            "p99": round(p99, 4) if p99 is not None else None,
+        }
+
+
+# Windows keyed by upstream name or by "upstream path" for individual endpoints
+LATENCY_WINDOWS: dict = {}
+
+
+def get_latency_window(key: str) -> LatencyWindow:
+    window = LATENCY_WINDOWS.get(key)
+    if window is None:
+        window = LATENCY_WINDOWS[key] = LatencyWindow()
+    return window
+
+
+def record_latency(key: str, seconds: float) -> None:
+    get_latency_window(key).record(seconds)
+
+
+register_metrics("latency", lambda: {key: window.stats() for key, window in LATENCY_WINDOWS.items()})
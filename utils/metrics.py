@@ -0,0 +1,20 @@
+from typing import Callable
+
+# Named providers of runtime stats, collected by the /metrics endpoint
+_providers: dict = {}
+
+
+def register_metrics(name: str, provider: Callable[[], dict]) -> None:
+    """Register a callable returning a JSON-serializable dict of stats under `name`."""
+    _providers[name] = provider
+
+
+def collect_metrics() -> dict:
+    """Collect the current stats from every registered provider."""
+    metrics = {}
+    for name, provider in _providers.items():
+        try:
+            metrics[name] = provider()
+        except Exception as e:
+            metrics[name] = {"error": str(e)}
+    return metrics
@@ -2,57 +2,106 @@ import os
 import aiohttp
 from urllib.parse import unquote
 from telegram import Update
+from telegram.error import BadRequest, NetworkError, TimedOut
 from telegram.ext import ContextTypes
 
-from config import CLOUDFLARE_ACCOUNT_ID, CLOUDFLARE_API_TOKEN, CLOUDFLARE_HASH, PHOTO_COYOTE_CHEST, logger
+from config import (
+    CLOUDFLARE_ACCOUNT_ID, CLOUDFLARE_API_TOKEN, CLOUDFLARE_HASH, PHOTO_COYOTE_CHEST,
+    PROFILE_PHOTO_CACHE_TTL, TELEGRAM_LOCAL_MODE, logger
+)
+from utils.cache import TTLCache
+from utils.httpClient import upstream_request
+from utils.circuitBreaker import get_circuit_breaker
+from utils.metrics import register_metrics
+
+# Public URLs of photos published from a local Bot API server, keyed by (user_id, file_unique_id)
+PROFILE_PHOTO_CACHE = TTLCache(maxsize=4096, ttl=PROFILE_PHOTO_CACHE_TTL)
+register_metrics("profile_photo_cache", PROFILE_PHOTO_CACHE.stats)
 
 # Function to check if the image already exists in Cloudflare
 async def image_exists_in_cloudflare(image_id: str) -> bool:
     logger.debug(f"Checking if image exists in Cloudflare: {image_id}.")
-    async with aiohttp.ClientSession() as session:
-        try:
-            # Use the Cloudflare image ID or URL for checking
-            async with session.get(f"https://api.cloudflare.com/client/v4/accounts/{CLOUDFLARE_ACCOUNT_ID}/images/v1/{image_id}", headers={
-                'Authorization': f'Bearer {CLOUDFLARE_API_TOKEN}',
-            }) as response:
-                logger.debug(f"Cloudflare response status: {response.status}.")
-                if response.status == 200:
-                    data = await response.json()
-                    if data['success']:
-                        logger.info(f"Image found in Cloudflare: {image_id}.")
-                        return True
-                else:
-                    logger.error(f"Failed to fetch image from Cloudflare. Status: {response.status} - {await response.text()}.")
-        except Exception as e:
-            logger.error(f"Error while checking image in Cloudflare: {e}.")
+    try:
+        # Use the Cloudflare image ID or URL for checking
+        response = await upstream_request("GET", f"https://api.cloudflare.com/client/v4/accounts/{CLOUDFLARE_ACCOUNT_ID}/images/v1/{image_id}", headers={
+            'Authorization': f'Bearer {CLOUDFLARE_API_TOKEN}',
+        })
+        logger.debug(f"Cloudflare response status: {response.status}.")
+        if response.status == 200:
+            data = response.json()
+            if data['success']:
+                logger.info(f"Image found in Cloudflare: {image_id}.")
+                return True
+        else:
+            logger.error(f"Failed to fetch image from Cloudflare. Status: {response.status} - {response.text()}.")
+    except Exception as e:
+        logger.error(f"Error while checking image in Cloudflare: {e}.")
     return False
     
 # Function to upload user profile photo
 async def upload_to_cloudflare(image_path: str, image_name: str) -> dict:
     logger.debug(f"Preparing to upload image from {image_path} with name {image_name}.")
-    async with aiohttp.ClientSession() as session:
-        with open(image_path, 'rb') as f:
-            data = aiohttp.FormData()
-            data.add_field('file', f, filename=image_name, content_type='image/jpeg')  # Ensure content type is correct
-
-            upload_url = f"https://api.cloudflare.com/client/v4/accounts/{CLOUDFLARE_ACCOUNT_ID}/images/v1"
-            async with session.post(upload_url, headers={
-                'Authorization': f'Bearer {CLOUDFLARE_API_TOKEN}',
-                'Accept': 'application/json'
-            }, data=data) as response:
-                logger.debug(f"Cloudflare upload response status: {response.status}.")
-                if response.status == 200:
-                    result = await response.json()
-                    logger.info(f"Image uploaded successfully for user. Cloudflare ID: {result['result']['id']}")
-                    return result  # Return the entire response for further processing
-                else:
-                    logger.error(f"Failed to upload image. Status: {response.status}. Response: {await response.text()}.")
-                    return None
+    with open(image_path, 'rb') as f:
+        data = aiohttp.FormData()
+        data.add_field('file', f, filename=image_name, content_type='image/jpeg')  # Ensure content type is correct
+
+        upload_url = f"https://api.cloudflare.com/client/v4/accounts/{CLOUDFLARE_ACCOUNT_ID}/images/v1"
+        # Form data is consumed on send, so the upload is not retried
+        response = await upstream_request("POST", upload_url, headers={
+            'Authorization': f'Bearer {CLOUDFLARE_API_TOKEN}',
+            'Accept': 'application/json'
+        }, data=data, retry=False)
+        logger.debug(f"Cloudflare upload response status: {response.status}.")
+        if response.status == 200:
+            result = response.json()
+            logger.info(f"Image uploaded successfully for user. Cloudflare ID: {result['result']['id']}")
+            return result  # Return the entire response for further processing
+        else:
+            logger.error(f"Failed to upload image. Status: {response.status}. Response: {response.text()}.")
+            return None
+
+async def publish_local_photo(user_id: int, file) -> str:
+    """
+    Publish a photo fetched through a local Bot API server and return its public URL.
+
+    In local mode `file.file_path` is a path on the shared filesystem, so the file
+    is uploaded to Cloudflare straight from disk without downloading it again.
+    The URL is reused until the user changes their photo.
+
+    Args:
+        user_id (int): The Telegram user the photo belongs to.
+        file (telegram.File): The file returned by get_file.
+
+    Returns:
+        str: The public image URL, or PHOTO_COYOTE_CHEST if the upload fails.
+    """
+    key = (user_id, file.file_unique_id)
+    photo_url = PROFILE_PHOTO_CACHE.get(key)
+    if photo_url:
+        return photo_url
+
+    try:
+        result = await upload_to_cloudflare(file.file_path, f"{user_id}_{file.file_unique_id}.jpg")
+    except (OSError, aiohttp.ClientError) as e:
+        logger.error(f"Failed to publish local profile photo for user_id {user_id}: {e}")
+        return PHOTO_COYOTE_CHEST
+    if not result:
+        return PHOTO_COYOTE_CHEST
+
+    photo_url = f"https://imagedelivery.net/{CLOUDFLARE_HASH}/{result['result']['id']}/public"
+    PROFILE_PHOTO_CACHE.set(key, photo_url)
+    return photo_url
 
 async def fetch_user_profile_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     user_id = update.effective_user.id  # Get the user ID from the update object
     logger.debug(f"Fetching profile photo URL for user_id {user_id}.")
 
+    # Skip the Bot API file lookups entirely while Telegram is failing
+    breaker = get_circuit_breaker("telegram")
+    if not breaker.allow_request():
+        logger.warning(f"Telegram circuit is open, using default profile photo for user_id {user_id}.")
+        return PHOTO_COYOTE_CHEST
+
     # Check if the user's profile photo exists on Telegram
     try:
         user = await context.bot.get_chat(user_id)
@@ -62,15 +111,28 @@ async def fetch_user_profile_photo(update: Update, context: ContextTypes.DEFAULT
 
             # Get the file path for the photo on Telegram servers
             file = await context.bot.get_file(profile_photo_file_id)
-            photo_url = file.file_path  # This will give you the relative path to the file on Telegram's server
+            breaker.record_success()
+            if TELEGRAM_LOCAL_MODE:
+                # A local Bot API server returns a path on disk rather than a download URL
+                photo_url = await publish_local_photo(user_id, file)
+            else:
+                photo_url = file.file_path  # Download URL on Telegram's file server
 
             logger.debug(f"Profile photo URL for user_id {user_id}: {photo_url}")
             # Store the URL in context.user_data for future use
             return photo_url  # Return the Telegram profile photo URL
 
         else:
+            breaker.record_success()
             logger.warning(f"User {user_id} does not have a profile photo.")
+    except BadRequest as e:
+        breaker.release()  # Telegram answered; the request itself was rejected
+        logger.error(f"Telegram rejected the profile photo lookup for user_id {user_id}: {e}")
+    except (NetworkError, TimedOut) as e:
+        breaker.record_failure()
+        logger.error(f"Telegram unavailable while fetching profile photo for user_id {user_id}: {e}")
     except Exception as e:
+        breaker.release()
         logger.error(f"Error while fetching user profile photo URL for user_id {user_id}: {e}")
 
     return PHOTO_COYOTE_CHEST  # Return COYOTE_CHEST if no profile photo is found or an error occurs
\ No newline at end of file
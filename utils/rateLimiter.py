@@ -0,0 +1,117 @@
+import time
+import asyncio
+from typing import Optional
+from urllib.parse import urlsplit
+from config import logger, RATE_LIMITS, RATE_LIMIT_MAX_WAIT
+from utils.metrics import register_metrics
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than allowed for a rate limit slot."""
+
+    def __init__(self, host: str, wait: float):
+        super().__init__(f"Rate limit for {host} exceeded, next slot in {wait:.2f}s.")
+        self.host = host
+        self.wait = wait
+
+
+class TokenBucket:
+    """
+    Token bucket limiter for a single upstream host.
+
+    Callers reserve a slot and sleep until it is due, so concurrent callers are
+    served in arrival order without holding a lock across the sleep.
+    """
+
+    def __init__(self, host: str, rate: float, burst: int):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+        # Counters exposed through /metrics
+        self.requests = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: Optional[float] = None) -> float:
+        """
+        Reserve the next slot and return how long the caller must wait for it.
+
+        Raises:
+            RateLimitExceeded: If the wait would exceed `max_wait`. No slot is consumed.
+        """
+        self._refill()
+        wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+        if max_wait is not None and wait > max_wait:
+            self.rejected += 1
+            raise RateLimitExceeded(self.host, wait)
+
+        self._tokens -= 1
+        self.requests += 1
+        if wait > 0:
+            self.delayed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    async def acquire(self, max_wait: Optional[float] = None) -> float:
+        """Wait for a slot and return the time spent waiting, in seconds."""
+        wait = self.reserve(max_wait)
+        if wait > 0:
+            logger.debug(f"Rate limit for {self.host}: waiting {wait:.2f}s for a slot.")
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "available": round(max(self._tokens, 0.0), 2),
+            "requests": self.requests,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "total_wait": round(self.total_wait, 3),
+            "avg_wait": round(self.total_wait / self.delayed, 3) if self.delayed else 0.0,
+            "max_wait": round(self.max_wait, 3),
+        }
+
+
+# One bucket per configured upstream host
+RATE_LIMITERS = {
+    host: TokenBucket(host, limits["rate"], limits["burst"])
+    for host, limits in RATE_LIMITS.items()
+}
+
+
+def get_rate_limiter(url: str) -> Optional[TokenBucket]:
+    """Return the limiter for the host of `url`, or None if the host is not rate limited."""
+    return RATE_LIMITERS.get(urlsplit(url).hostname or url)
+
+
+async def throttle(url: str, max_wait: float = RATE_LIMIT_MAX_WAIT) -> float:
+    """
+    Wait for a rate limit slot for the host of `url`.
+
+    Returns:
+        float: Seconds spent waiting (0 if the host is not rate limited).
+
+    Raises:
+        RateLimitExceeded: If the host is over budget for longer than `max_wait`.
+    """
+    limiter = get_rate_limiter(url)
+    if limiter is None:
+        return 0.0
+    return await limiter.acquire(max_wait)
+
+
+register_metrics("rate_limits", lambda: {host: limiter.stats() for host, limiter in RATE_LIMITERS.items()})
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List
+from utils.deadline import run_without_deadline
+from utils.metrics import register_metrics
+
+
+class RequestBatcher:
+    """
+    Collects concurrent single-key lookups into one multi-key upstream call per group.
+
+    The first `load` for a group opens a batch that is sent `window` seconds
+    later, or as soon as it holds `max_batch` keys. `fetch_many(group, keys)`
+    returns a dict of results; keys it leaves out resolve to None. Callers
+    asking for the same key in one batch share its result, and a caller being
+    cancelled doesn't cancel the batch. Batches are sent without any caller's
+    update deadline, since they serve every caller in them.
+    """
+
+    def __init__(self, name: str, fetch_many: Callable[[Hashable, List], Awaitable[Dict]], max_batch: int, window: float):
+        self.name = name
+        self.fetch_many = fetch_many
+        self.max_batch = max_batch
+        self.window = window
+        self._pending: dict = {}  # Group -> {key: future}
+        self.loads = 0
+        self.batches = 0
+        self.batched_keys = 0
+
+    async def load(self, group: Hashable, key: Hashable):
+        self.loads += 1
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(group)
+        if pending is None:
+            pending = self._pending[group] = {}
+            loop.call_later(self.window, self._flush, group, pending)
+
+        future = pending.get(key)
+        if future is None:
+            future = pending[key] = loop.create_future()
+            # Every waiter may have been cancelled; retrieve the exception so it isn't reported as unhandled
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            if len(pending) >= self.max_batch:
+                self._flush(group, pending)
+        return await asyncio.shield(future)
+
+    def _flush(self, group: Hashable, pending: dict) -> None:
+        if self._pending.get(group) is pending:
+            del self._pending[group]
+        if not pending:
+            return  # Already sent when it filled up
+        batch = dict(pending)
+        pending.clear()
+        self.batches += 1
+        self.batched_keys += len(batch)
+        asyncio.ensure_future(run_without_deadline(self._send(group, batch)))
+
+    async def _send(self, group: Hashable, batch: dict) -> None:
+        try:
+            results = await self.fetch_many(group, list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_keys / self.batches, 2) if self.batches else 0.0,
+            "calls_saved": self.loads - self.batches,
+        }
+
+
+# Batchers keyed by name, so /metrics shows how many upstream calls each one saves
+REQUEST_BATCHERS: dict = {}
+
+
+def get_request_batcher(name: str, fetch_many: Callable[[Hashable, List], Awaitable[Dict]], max_batch: int, window: float) -> RequestBatcher:
+    batcher = REQUEST_BATCHERS.get(name)
+    if batcher is None:
+        batcher = REQUEST_BATCHERS[name] = RequestBatcher(name, fetch_many, max_batch, window)
+    return batcher
+
+
+register_metrics("request_batching", lambda: {name: batcher.stats() for name, batcher in REQUEST_BATCHERS.items()})
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+from config import RESPONSE_CACHE_MAX_BYTES
+from utils.metrics import register_metrics
+
+
+class ResponseCache:
+    """
+    Byte-bounded LRU store of GET responses that carry an ETag or Last-Modified.
+
+    Entries are never served without revalidation: callers send the stored
+    validators and reuse the stored response when the upstream answers 304.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._data: OrderedDict = OrderedDict()
+
+        self.hits = 0  # 304s answered from the local copy
+        self.misses = 0  # Full bodies downloaded
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        """Return the stored response for `key`, or None."""
+        response = self._data.get(key)
+        if response is not None:
+            self._data.move_to_end(key)
+        return response
+
+    @staticmethod
+    def validators(response) -> dict:
+        """Conditional request headers that revalidate `response`."""
+        headers = {}
+        if response.headers.get("ETag"):
+            headers["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = response.headers["Last-Modified"]
+        return headers
+
+    def store(self, key: Hashable, response) -> None:
+        """Keep a 200 response if it has validators and fits in the budget."""
+        self.pop(key)
+        if response.status != 200 or not self.validators(response) or len(response.body) > self.max_bytes:
+            return
+        self._data[key] = response
+        self.size_bytes += len(response.body)
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.size_bytes -= len(evicted.body)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[object]:
+        response = self._data.pop(key, None)
+        if response is not None:
+            self.size_bytes -= len(response.body)
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by every upstream_request(..., cache=True) call
+RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+register_metrics("response_cache", RESPONSE_CACHE.stats)
@@ -0,0 +1,78 @@
+import random
+import asyncio
+import aiohttp
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from config import RETRY_POLICIES
+
+# Statuses worth retrying: timeouts, throttling and transient server errors. Other 4xx are final.
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry behaviour for one upstream: attempts, per-attempt timeout and backoff."""
+    name: str
+    max_attempts: int = 2
+    timeout: float = 3
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+    max_retry_after: float = 5.0
+    idempotency_keys: bool = False
+    retry_statuses: frozenset = RETRYABLE_STATUSES
+
+    def is_retryable_status(self, status: int) -> bool:
+        return status in self.retry_statuses
+
+    def is_retryable_error(self, error: Exception) -> bool:
+        """Timeouts and connection failures are retryable; anything else is a bug or a final answer."""
+        if isinstance(error, aiohttp.ClientResponseError):
+            return self.is_retryable_status(error.status)
+        return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Delay before the next attempt, using exponential backoff with full jitter.
+
+        Args:
+            attempt (int): Zero-based index of the attempt that just failed.
+            retry_after (float, optional): Delay requested by the upstream via Retry-After.
+
+        Returns:
+            float or None: Seconds to wait, or None if the upstream asked us to wait
+                           longer than `max_retry_after` and the call should give up.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# One policy per upstream, so a retry storm against one service can't spill over to the others
+RETRY_POLICY_REGISTRY = {name: RetryPolicy(name=name, **settings) for name, settings in RETRY_POLICIES.items()}
+
+
+def get_retry_policy(upstream: str) -> RetryPolicy:
+    """Return the retry policy for `upstream`, falling back to the default policy."""
+    return RETRY_POLICY_REGISTRY.get(upstream) or RETRY_POLICY_REGISTRY["default"]
@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Hashable, Mapping, Optional
+from utils.deadline import DeadlineExceeded, run_without_deadline, time_left
+from utils.metrics import register_metrics
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight call.
+
+    The first caller for a key starts the call; callers arriving while it is
+    still running await the same result (or exception) instead of starting
+    their own. A caller being cancelled does not cancel the shared call, and
+    a caller with an update deadline stops waiting when it runs out; the
+    shared call itself runs without any caller's deadline.
+    Results are shared as-is, so callers that mutate them must copy first.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(run_without_deadline(fn()))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+
+        remaining = time_left()
+        if remaining is None:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), max(0.0, remaining))
+        except asyncio.TimeoutError:
+            if task.done() and not task.cancelled():
+                return task.result()  # Finished just as we gave up; use its outcome
+            raise DeadlineExceeded(f"the shared {self.name} call")
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Every waiter may have been cancelled; retrieve the exception so it isn't reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "in_flight": len(self._inflight),
+            "shared_ratio": round(self.shared / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+def request_key(method: str, url: str, params: Optional[Mapping] = None, headers: Optional[Mapping] = None) -> tuple:
+    """
+    Normalized key for an upstream request.
+
+    Params are sorted so their order doesn't matter. Headers are folded into a
+    digest so API keys never sit in memory as plain dictionary keys, while
+    requests made with different keys are still kept apart.
+    """
+    normalized_params = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    header_items = sorted((str(k).lower(), str(v)) for k, v in (headers or {}).items())
+    header_digest = hashlib.sha256(repr(header_items).encode()).hexdigest() if header_items else ""
+    return method.upper(), url, normalized_params, header_digest
+
+
+# Groups keyed by name, so /metrics shows how much each layer coalesces
+SINGLE_FLIGHT_GROUPS: dict = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    group = SINGLE_FLIGHT_GROUPS.get(name)
+    if group is None:
+        group = SINGLE_FLIGHT_GROUPS[name] = SingleFlight(name)
+    return group
+
+
+register_metrics("single_flight", lambda: {name: group.stats() for name, group in SINGLE_FLIGHT_GROUPS.items()})
@@ -0,0 +1,17 @@
+import os
+
+
+def write_snapshot(path: str, snapshot: bytes) -> None:
+    """
+    Write `snapshot` to `path` atomically, so a crash never leaves a truncated file.
+
+    Safe to run in a worker thread (asyncio.to_thread) as long as `snapshot`
+    was serialized on the event loop.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(snapshot)
+    os.replace(tmp_path, path)
@@ -0,0 +1,150 @@
+# Immutable, interned token records shared by every user holding the same token.
+# Kept free of config imports (like utils.codec) so benchmarks can use it.
+import os
+import sys
+import weakref
+from typing import Any, Optional
+
+# Other names Acme, LiFi and the top-3 endpoints use for the same fields
+FIELD_ALIASES = {
+    "tokenAddress": "address",
+    "contract_address": "address",
+    "chain_id": "chainId",
+    "logoURI": "logoUrl",
+}
+
+# Fields upstreams send that records deliberately leave out: they are per request
+# (prices, market caps) or only matter to the upstream, and would stop equal tokens from sharing a record
+DROPPED_FIELDS = frozenset({
+    "isEnabled",
+    "mcap",
+    "price",
+    "priceUSD",
+    "coinKey",
+    "platform_name",
+})
+
+# In development, token dicts with fields that are neither kept nor listed as dropped raise instead of losing them
+STRICT_FIELDS = os.getenv("ENV", "DEV").upper() == "DEV"
+
+# Live records by their field values; a record is dropped once no user, cache or index references it
+_INTERNED: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+
+
+def _intern(value) -> Optional[str]:
+    return sys.intern(str(value)) if value not in (None, "") else None
+
+
+def _decimals(value) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenRecord:
+    """
+    One token as the bot passes it around: from validate_tokens through the
+    trade, pay and list flows, user_data["tokens"] and the cached top 3.
+
+    Records are immutable and interned: building a record equal to a live one
+    returns that record, so users holding the same token (and the same
+    trading link) reference one object instead of each holding a dict copy.
+    Symbols, chain IDs and addresses are interned strings.
+
+    Dict-style reads (`get`, `[]`, `in`) keep working, including under the
+    field names other upstreams use (see FIELD_ALIASES). Missing fields are
+    None and read as absent, and so are decimals that aren't a number.
+    Fields outside FIELDS must be listed in DROPPED_FIELDS.
+    """
+
+    FIELDS = ("symbol", "name", "chainId", "address", "decimals", "logoUrl", "id", "intentId", "tradingLink")
+    __slots__ = FIELDS + ("__weakref__",)
+
+    def __new__(cls, symbol: str, name: Optional[str] = None, chainId=None, address: str = "", decimals=None,
+                logoUrl: Optional[str] = None, id: Optional[str] = None, intentId: Optional[str] = None,
+                tradingLink: Optional[str] = None) -> "TokenRecord":
+        values = (
+            _intern((symbol or "").strip()),
+            name or None,
+            _intern(chainId),
+            _intern((address or "").strip()),
+            _decimals(decimals),
+            logoUrl or None,
+            id or None,
+            intentId or None,
+            tradingLink or None,
+        )
+        record = _INTERNED.get(values)
+        if record is None:
+            record = super().__new__(cls)
+            for field, value in zip(cls.FIELDS, values):
+                object.__setattr__(record, field, value)
+            _INTERNED[values] = record
+        return record
+
+    @classmethod
+    def from_dict(cls, data, **overrides) -> "TokenRecord":
+        """
+        Build a record from a token dict under any of its field names, with `overrides` taking precedence.
+
+        Raises:
+            ValueError: If STRICT_FIELDS is set and the dict has a field that is neither kept nor dropped.
+        """
+        if isinstance(data, TokenRecord):
+            return data.replace(**overrides) if overrides else data
+        if STRICT_FIELDS:
+            unknown = set(data) - set(cls.FIELDS) - set(FIELD_ALIASES) - DROPPED_FIELDS
+            if unknown:
+                raise ValueError(f"Token fields {sorted(unknown)} aren't kept in TokenRecord or listed in DROPPED_FIELDS")
+        fields = {field: data.get(field) for field in cls.FIELDS}
+        for alias, field in FIELD_ALIASES.items():
+            if fields[field] in (None, ""):
+                fields[field] = data.get(alias)
+        fields.update(overrides)
+        return cls(**fields)
+
+    def replace(self, **changes) -> "TokenRecord":
+        """The record with `changes` applied (e.g. a trading link added)."""
+        values = self._values()
+        if all(values[self.FIELDS.index(field)] == value for field, value in changes.items()):
+            return self
+        return TokenRecord(*(changes.get(field, value) for field, value in zip(self.FIELDS, values)))
+
+    def to_dict(self) -> dict:
+        return {field: value for field, value in zip(self.FIELDS, self._values()) if value is not None}
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        field = FIELD_ALIASES.get(key, key)
+        value = getattr(self, field, None) if field in self.FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TokenRecord is immutable; use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("TokenRecord is immutable")
+
+    def __reduce__(self):
+        # Unpickled (and copied) records are interned again rather than duplicated
+        return TokenRecord, self._values()
+
+    def __repr__(self) -> str:
+        return f"TokenRecord({self.to_dict()!r})"
+
+
+def interned_records() -> int:
+    """Number of distinct live token records."""
+    return len(_INTERNED)
@@ -0,0 +1,141 @@
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import List, Tuple
+from config import SEARCH_RESOLVED_MAXSIZE
+from utils.acmeCatalog import ACME_CATALOG
+from utils.metrics import register_metrics
+
+
+def _trigrams(text: str) -> set:
+    """Trigrams of `text`, padded so the first letters weigh more than the rest."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TokenSearchIndex:
+    """
+    In-process search over known token symbols and names.
+
+    Fed from the Acme catalog mirror (rebuilt when a sync swaps in a new
+    catalog, with single upserts such as registrations added as they come) and
+    from tokens resolved elsewhere. Prefix matches come from a sorted key list,
+    typo-tolerant suggestions from trigram similarity on symbols.
+    """
+
+    def __init__(self, max_resolved: int = SEARCH_RESOLVED_MAXSIZE):
+        self.max_resolved = max_resolved
+        self._names: dict = {}  # SYMBOL -> name
+        self._keys: list = []  # Sorted (KEY, SYMBOL) for symbols and names
+        self._trigrams: dict = {}  # Trigram -> {SYMBOL}
+        self._trigram_counts: dict = {}  # SYMBOL -> number of trigrams
+        self._resolved: OrderedDict = OrderedDict()  # Tokens resolved outside the catalog, oldest first
+        self._catalog_generation = None
+        self._catalog_upserts = 0  # Catalog upserts already indexed
+        self.searches = 0
+        self.suggestions = 0
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._names)
+
+    def _index(self, symbol: str, name: str) -> None:
+        symbol = symbol.strip().upper()
+        if not symbol or symbol in self._names:
+            return
+        self._names[symbol] = name or ""
+        for key in {symbol, (name or "").strip().upper()}:
+            if key:
+                insort(self._keys, (key, symbol))
+        trigrams = _trigrams(symbol)
+        self._trigram_counts[symbol] = len(trigrams)
+        for trigram in trigrams:
+            self._trigrams.setdefault(trigram, set()).add(symbol)
+
+    def _refresh(self) -> None:
+        """Rebuild from the catalog mirror if a new catalog was swapped in, otherwise index its new upserts."""
+        if self._catalog_generation == ACME_CATALOG.generation:
+            for currency in ACME_CATALOG.upserted_since(self._catalog_upserts):
+                self._index(currency.symbol, currency.name)
+            self._catalog_upserts = ACME_CATALOG.upserts
+            return
+        self._names, self._keys, self._trigrams, self._trigram_counts = {}, [], {}, {}
+        for currency in ACME_CATALOG.currencies():
+            self._index(currency.symbol, currency.name)
+        for symbol, name in self._resolved.items():
+            self._index(symbol, name)
+        self._catalog_generation = ACME_CATALOG.generation
+        self._catalog_upserts = ACME_CATALOG.upserts
+
+    def add(self, symbol: str, name: str = "") -> None:
+        """Add a token resolved outside the catalog (e.g. through LiFi)."""
+        if not symbol:
+            return
+        self._resolved[symbol.upper()] = name
+        self._resolved.move_to_end(symbol.upper())
+        while len(self._resolved) > self.max_resolved:
+            self._resolved.popitem(last=False)
+        self._refresh()
+        self._index(symbol, name)
+
+    def knows(self, symbol: str) -> bool:
+        """Whether `symbol` is a known token symbol (exact, case-insensitive)."""
+        self._refresh()
+        return symbol.strip().upper() in self._names
+
+    def prefix(self, query: str) -> List[str]:
+        """Symbols whose symbol or name starts with `query`, exact and shorter symbols first."""
+        self._refresh()
+        query = query.strip().upper()
+        if not query:
+            return []
+        matches = set()
+        for key, symbol in self._keys[bisect_left(self._keys, (query, "")):]:
+            if not key.startswith(query):
+                break
+            matches.add(symbol)
+        return sorted(matches, key=lambda symbol: (symbol != query, len(symbol), symbol))
+
+    def suggest(self, query: str, limit: int = 3, min_similarity: float = 0.3) -> List[str]:
+        """Symbols most similar to a mistyped `query`, by trigram Jaccard similarity."""
+        self._refresh()
+        query = query.strip().upper()
+        if not query:
+            return []
+        self.suggestions += 1
+        query_trigrams = _trigrams(query)
+        shared: dict = {}
+        for trigram in query_trigrams:
+            for symbol in self._trigrams.get(trigram, ()):
+                shared[symbol] = shared.get(symbol, 0) + 1
+        scored = []
+        for symbol, count in shared.items():
+            similarity = count / (len(query_trigrams) + self._trigram_counts[symbol] - count)
+            if similarity >= min_similarity:
+                scored.append((-similarity, len(symbol), symbol))
+        return [symbol for _, _, symbol in sorted(scored)[:limit]]
+
+    def search(self, query: str, page: int = 0, page_size: int = 8) -> Tuple[List[Tuple[str, str]], int]:
+        """
+        One page of (symbol, name) results for `query`: prefix matches, then close misspellings.
+
+        Returns:
+            tuple: The page of results and the total number of results.
+        """
+        self.searches += 1
+        results = self.prefix(query)
+        seen = set(results)
+        results += [symbol for symbol in self.suggest(query, limit=page_size) if symbol not in seen]
+        start = max(page, 0) * page_size
+        return [(symbol, self._names[symbol]) for symbol in results[start:start + page_size]], len(results)
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self),
+            "resolved": len(self._resolved),
+            "searches": self.searches,
+            "suggestions": self.suggestions,
+        }
+
+
+TOKEN_SEARCH_INDEX = TokenSearchIndex()
+register_metrics("token_search", TOKEN_SEARCH_INDEX.stats)
@@ -1,20 +1,35 @@
 import re
 import aiohttp
 import asyncio
+from http import HTTPStatus
 from typing import Optional
 from telegram import Update, InlineKeyboardButton
 from telegram.ext import ContextTypes
-from config import logger, SUPPORTED_CHAIN_IDS, LIFI_API_URL, ACME_APP_URL, RETRY_COUNT, DEFAULT_TIMEOUT, ACME_API_KEY, ACME_URL
+from config import logger, LIFI_API_URL, ACME_APP_URL, ACME_API_KEY, ACME_URL, MARKET_DATA_CACHE_TTL, LIFI_TOKEN_CACHE_TTL, TOKEN_CACHE_TTL, TOKEN_CACHE_MAXSIZE
+from config import NEGATIVE_TOKEN_CACHE_TTL, NEGATIVE_TOKEN_CACHE_CAPACITY, NEGATIVE_TOKEN_CACHE_ERROR_RATE
+from config import TOKEN_VALIDATION_CONCURRENCY, COINGECKO_MAX_ADDRESSES_PER_REQUEST, COINGECKO_BATCH_WINDOW
+from config import SPECULATIVE_RESOLUTION, SPECULATION_GRACE, REGISTRATION_BATCH_WINDOW, REGISTRATION_MAX_BATCH
 from handlers.auth_handler import get_user_top3
 from utils.createTradingLink import create_trading_link
 from utils.getTokenMarketData import fetch_and_format_token_market_data
-
-
-# Regex pattern to detect if the token is an EVM contract address (42 hex characters)
-EVM_CONTRACT_ADDRESS_PATTERN = re.compile(r"^0x[a-fA-F0-9]{40}$")
-
-# Regex pattern for detecting Solana Virtual Machine (SVM) contract addresses (Base58, typically 32 bytes)
-SVM_CONTRACT_ADDRESS_PATTERN = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{32,44}$")
+from utils.httpClient import upstream_request
+from utils.cache import TTLCache
+from utils.bloomFilter import RotatingBloomFilter
+from utils.acmeCatalog import ACME_CATALOG
+from utils.chains import CHAINS, address_vm, EVM_CONTRACT_ADDRESS_PATTERN, SVM_CONTRACT_ADDRESS_PATTERN
+from utils.tokenSearch import TOKEN_SEARCH_INDEX
+from utils.tokenRecord import TokenRecord, interned_records
+from utils.metrics import register_metrics
+from utils.rateLimiter import RateLimitExceeded
+from utils.circuitBreaker import CircuitOpenError, get_circuit_breaker
+from utils.singleFlight import get_single_flight
+from utils.requestBatcher import get_request_batcher
+from utils.deadline import DeadlineExceeded, time_left
+from utils.codec import decode_lifi_token, decode_coingecko_prices
+
+
+# Regex pattern for token symbols: short alphanumerics with an optional cashtag and a few separators
+SYMBOL_PATTERN = re.compile(r"^\$?[A-Za-z0-9][A-Za-z0-9._-]{0,19}$")
 
 TOKEN_TEMPLATE = (
     "*{index}️ [{symbol}]({trading_link})*\n"
@@ -24,68 +39,135 @@ TOKEN_TEMPLATE = (
     #"🔄 Circulating Supply: *{circulating_supply}*\n"
 )
 
-async def validate_tokens(requested_tokens, update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Validate requested tokens and store valid ones in user context."""
+# Upstream lookups reused while fresh and served stale when the upstream is over budget
+LIFI_TOKEN_CACHE = TTLCache(maxsize=2048, ttl=LIFI_TOKEN_CACHE_TTL)
+MCAP_CACHE = TTLCache(maxsize=2048, ttl=MARKET_DATA_CACHE_TTL)
+register_metrics("lifi_token_cache", LIFI_TOKEN_CACHE.stats)
+register_metrics("mcap_cache", MCAP_CACHE.stats)
+
+# Resolved token records keyed by normalized symbol/address and chain, so repeated mentions skip the pipeline
+TOKEN_RESOLUTION_CACHE = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE, ttl=TOKEN_CACHE_TTL)
+register_metrics("token_resolution_cache", TOKEN_RESOLUTION_CACHE.stats)
+register_metrics("token_records", lambda: {"interned": interned_records()})
+
+# Strings every upstream recently reported as unknown; a Bloom filter keeps memory flat under spam
+NEGATIVE_TOKEN_CACHE = RotatingBloomFilter(
+    capacity=NEGATIVE_TOKEN_CACHE_CAPACITY, ttl=NEGATIVE_TOKEN_CACHE_TTL, error_rate=NEGATIVE_TOKEN_CACHE_ERROR_RATE
+)
+register_metrics("negative_token_cache", NEGATIVE_TOKEN_CACHE.stats)
+
+
+class TransientLookupError(aiohttp.ClientError):
+    """Raised when an upstream couldn't answer a token lookup (outage, rate limit, deadline), as opposed to not knowing the token."""
+
+
+async def validate_tokens(requested_tokens, update: Update, context: ContextTypes.DEFAULT_TYPE, with_links: bool = True,
+                          known_only: bool = False):
+    """
+    Validate requested tokens and store valid ones in user context.
+
+    Tokens are validated concurrently, at most TOKEN_VALIDATION_CONCURRENCY at
+    a time. Results keep the order of `requested_tokens`, and one token failing
+    doesn't affect the others. With `with_links=False` tokens are only
+    resolved, without creating trading intents (e.g. for pay and request).
+    With `known_only=True` (free text in group chats) symbols the bot doesn't
+    already know are only looked up when written as a $cashtag; see
+    fetch_token_data_from_chains.
+    """
     logger.info(f"Starting token validation for user: {update.effective_user.id}")
-    valid_tokens = []
-    invalid_tokens = []
+    semaphore = asyncio.Semaphore(TOKEN_VALIDATION_CONCURRENCY)
 
-    for token in requested_tokens:
-        logger.debug(f"Validating token: {token} - Type: {type(token).__name__}")
-
-        if isinstance(token, str):
-            logger.debug(f"Processing token as string (symbol or address): {token}")
-            token_data = await fetch_token_data_from_chains(token=token)
-            if token_data and "error" not in token_data:
-                token_address = token_data.get("address")
-                trading_link = await get_trading_link_from_top3(update, context, token_address)
-                if not trading_link:
-                    trading_link = await generate_trading_link(update, context, token_data)
-
-                if trading_link:
-                    token_data["tradingLink"] = trading_link
-                    valid_tokens.append(token_data)
-                    logger.info(f"Valid token found: {token_data['symbol']} ({token_data['address']})")
-                else:
-                    logger.error(f"Failed to generate trading link for token: {token}")
-                    invalid_tokens.append(token)
-            else:
-                logger.warning(f"Invalid or missing token data for: {token}")
-                invalid_tokens.append(token)
-
-        elif isinstance(token, dict):
-            logger.debug(f"Processing token object: {token}")
-
-            # Extract values with default None
-            token_address = token.get("address")
-            trading_link = token.get("tradingLink")
-            intent_id = token.get("intentId")
+    async def validate(token):
+        async with semaphore:
+            return await validate_token(token, update, context, with_links, known_only)
+
+    results = await asyncio.gather(*(validate(token) for token in requested_tokens), return_exceptions=True)
 
-            # Check for errors and existing trading link
-            if "error" not in token:
-                if not trading_link:  # Generate trading link only if it doesn't exist
-                    trading_link = await generate_trading_link(update, context, token, intent_id)
-
-                if trading_link:  # If trading link was successfully created
-                    token["tradingLink"] = trading_link
-                    valid_tokens.append(token)
-                    logger.info(f"Valid token object: {token['symbol']} ({token_address})")
-                else:
-                    logger.error("Failed to create trading link for token object.")
-                    invalid_tokens.append(token)
-            else:
-                logger.warning(f"Invalid token object: {token}")
-                invalid_tokens.append(token)
+    valid_tokens = []
+    invalid_tokens = []
+    for token, result in zip(requested_tokens, results):
+        if isinstance(result, Exception):
+            logger.error(f"Unexpected error while validating token {token}: {result}")
+            invalid_tokens.append(token)
+        elif result:
+            valid_tokens.append(result)
         else:
-            logger.warning(f"Unsupported token format: {token}")
             invalid_tokens.append(token)
 
     logger.info(f"Validation completed. Valid tokens: {len(valid_tokens)}, Invalid tokens: {len(invalid_tokens)}")
     return valid_tokens, invalid_tokens
 
 
+async def validate_token(token, update: Update, context: ContextTypes.DEFAULT_TYPE, with_links: bool = True,
+                         known_only: bool = False):
+    """
+    Validate one requested token (symbol, address or token object), returning its data with a trading link or None.
+
+    With `with_links=False` the resolved token is returned without a trading
+    link, once Acme knows it.
+    """
+    logger.debug(f"Validating token: {token} - Type: {type(token).__name__}")
+
+    if not with_links:
+        token_data = await fetch_token_data_from_chains(token=token, known_only=known_only) if isinstance(token, str) else token
+        if not isinstance(token_data, (dict, TokenRecord)) or "error" in token_data:
+            logger.warning(f"Invalid or missing token data for: {token}")
+            return None
+        token_data = CHAINS.token_record(token_data)
+        # Intents (pay links included) can only be created for tokens Acme knows
+        await wait_for_registration(token_data.get("chainId"), token_data.get("address"))
+        return token_data
+
+    if isinstance(token, str):
+        logger.debug(f"Processing token as string (symbol or address): {token}")
+        token_data = await fetch_token_data_from_chains(token=token, known_only=known_only)
+        if token_data and "error" not in token_data:
+            token_address = token_data.get("address")
+            trading_link = await get_trading_link_from_top3(update, context, token_address)
+            if not trading_link:
+                trading_link = await generate_trading_link(update, context, token_data)
+
+            if trading_link:
+                token_data = token_data.replace(tradingLink=trading_link)
+                logger.info(f"Valid token found: {token_data['symbol']} ({token_data['address']})")
+                return token_data
+            logger.error(f"Failed to generate trading link for token: {token}")
+        else:
+            logger.warning(f"Invalid or missing token data for: {token}")
+
+    elif isinstance(token, (dict, TokenRecord)):
+        logger.debug(f"Processing token object: {token}")
+
+        # Check for errors and existing trading link
+        if "error" not in token:
+            token = CHAINS.token_record(token)
+            token_address = token.get("address")
+            trading_link = token.get("tradingLink")
+            intent_id = token.get("intentId")
+            if not trading_link:  # Generate trading link only if it doesn't exist
+                trading_link = await generate_trading_link(update, context, token, intent_id)
+
+            if trading_link:  # If trading link was successfully created
+                token = token.replace(tradingLink=trading_link)
+                logger.info(f"Valid token object: {token['symbol']} ({token_address})")
+                return token
+            logger.error("Failed to create trading link for token object.")
+        else:
+            logger.warning(f"Invalid token object: {token}")
+    else:
+        logger.warning(f"Unsupported token format: {token}")
+    return None
+
+
 async def generate_trading_link(update: Update, context: ContextTypes.DEFAULT_TYPE, token_data, intent_id=None):
-    """Generate a trading link using an existing or newly created intent ID."""
+    """
+    Generate a trading link using an existing or newly created intent ID.
+
+    Acme can only build a link for a token it knows, so a new intent for a
+    token still queued for registration waits for that registration (batch
+    window plus the create-or-update call). Only reads that don't build a
+    link, like market data and search, skip it.
+    """
     logger.debug(f"Generating trading link for token: {token_data['symbol']}")
     trading_link = None  # Initialize trading_link as None
 
@@ -96,6 +178,8 @@ async def generate_trading_link(update: Update, context: ContextTypes.DEFAULT_TY
         else:
             chain_id = token_data.get("chainId")
             token_address = token_data.get("address")
+            # Acme needs to know the token before it can build a link for it
+            await wait_for_registration(chain_id, token_address)
             trading_link = await create_trading_link(update, context, chain_id, token_address, "")
 
             logger.debug(f"Successfully created trading link: {trading_link}")
@@ -128,7 +212,7 @@ async def get_trading_link_from_top3(update: Update, context: ContextTypes.DEFAU
         return None
 
     for token in top3:
-        if token.get("tokenAddress") == token_address:
+        if CHAINS.normalize_address(token.get("tokenAddress")) == CHAINS.normalize_address(token_address):
             trading_link = token.get("tradingLink")
             intent_id = token.get("intentId")
             if intent_id and not trading_link:  # Generate trading link only if it doesn't exist
@@ -177,7 +261,7 @@ async def fetch_and_format_token_data(token, username, index):
     Fetches market data for a token and formats it into a text template.
 
     Args:
-    - token (dict): The token data containing 'symbol', 'chain_id', 'contract_address', 'decimals', and 'tradingLink'.
+    - token (TokenRecord or dict): The token data containing 'symbol', 'chainId', 'address', 'decimals', and 'tradingLink'.
     - username (str): The username to be displayed in the message.
     - index (int): The index or rank of the token.
 
@@ -227,43 +311,153 @@ async def fetch_and_format_token_data(token, username, index):
 
     return trading_card_text, button  # Return both text and button
 
-async def fetch_token_data_from_chains(token: str, chain_id: Optional[str] = None):
+async def fetch_token_data_from_chains(token: str, chain_id: Optional[str] = None, refresh: bool = False,
+                                       known_only: bool = False):
     """
     Fetch token data across chains from LiFi API, returning the one with the highest market cap.
 
+    Strings that can't be a symbol or address are rejected without a network
+    call, and strings Acme and LiFi both reported as unknown are skipped for
+    NEGATIVE_TOKEN_CACHE_TTL seconds; a lookup an upstream couldn't answer is
+    not remembered. Resolved tokens are cached for
+    TOKEN_CACHE_TTL seconds under both the requested symbol/address and the
+    resolved address, and concurrent lookups of the same token share one
+    resolution (Acme, LiFi, CoinGecko and registration). Callers share the
+    immutable record.
+
+    With `known_only=True`, meant for words picked out of group chat messages,
+    a symbol seen for the first time is only looked up upstream if the search
+    index (the Acme catalog plus resolved tokens) knows it, or if it is written
+    as a $cashtag ("$pepe" rather than "hello"). Contract addresses are always
+    looked up.
+
     Args:
         token (str): The symbol or address of the token.
         chain_id (str, optional): Specific chain ID for targeted fetching. Defaults to None.
+        refresh (bool): Resolve again even if the token is cached, e.g. to keep it warm. Defaults to False.
+        known_only (bool): Skip unknown symbols that aren't written as a $cashtag. Defaults to False.
 
     Returns:
-        dict or None: Highest market cap token data if available, otherwise None.
-    """
-    # Determine if the token is a contract address (EVM or SVM) or a symbol
-    if EVM_CONTRACT_ADDRESS_PATTERN.match(token):
-        # Token is an EVM contract address; remove Solana from supported chains
-        acme_param = {"symbol": token}
-        chains = {cid: name for cid, name in SUPPORTED_CHAIN_IDS.items() if name.lower() != "solana"}
-    elif SVM_CONTRACT_ADDRESS_PATTERN.match(token):
-        # Token is an SVM contract address; limit to Solana-specific chain ID
-        acme_param = {"symbol": token}
-        chains = [("1151111081099710", "solana")]
-    else:
-        # Token is a symbol; convert to uppercase and query all supported chains
-        acme_param = {"symbol": token.upper()}
-        chains = SUPPORTED_CHAIN_IDS.items()
+        TokenRecord or None: Highest market cap token data if available, otherwise None.
+    """
+    if not is_plausible_token(token):
+        logger.info(f"Skipping lookup of {token!r}: not a token symbol or address.")
+        return None
+    cashtag = token.strip().startswith("$")
+    if known_only and cashtag:
+        # The cashtag marks the word as a token; the symbol itself comes without it
+        token = token.strip()[1:]
+
+    key = token_cache_key(token, chain_id)
+    token_data = None if refresh else TOKEN_RESOLUTION_CACHE.get(key)
+    if token_data is None:
+        if known_only and not cashtag and not is_known_token(token):
+            logger.info(f"Skipping lookup of {token!r}: not a known token, a $cashtag or an address.")
+            return None
+        negative_key = repr(key)
+        if not refresh and negative_key in NEGATIVE_TOKEN_CACHE:
+            logger.info(f"Skipping lookup of {token}: it failed to resolve recently.")
+            return None
+        try:
+            token_data = await get_single_flight("token_resolution").do(key, lambda: _resolve_token_data(token, chain_id))
+        except DeadlineExceeded as e:
+            logger.warning(f"Gave up resolving {token}: {e}")
+            return None
+        except TransientLookupError as e:
+            # An outage or a rate limit is not evidence the token doesn't exist
+            logger.warning(f"Couldn't resolve {token} right now: {e}")
+            return None
+        if not token_data or "error" in token_data:
+            NEGATIVE_TOKEN_CACHE.add(negative_key)
+        else:
+            TOKEN_RESOLUTION_CACHE.set(key, token_data)
+            TOKEN_SEARCH_INDEX.add(token_data.get("symbol"), token_data.get("name", ""))
+            # Mentions of the contract address hit the same record
+            address = token_data.get("address")
+            if address:
+                TOKEN_RESOLUTION_CACHE.set(token_cache_key(address, chain_id), token_data)
+    return token_data
+
+
+def is_plausible_token(token: str) -> bool:
+    """Cheap syntactic check that `token` could be a symbol or a contract address."""
+    token = token.strip()
+    if EVM_CONTRACT_ADDRESS_PATTERN.match(token) or SVM_CONTRACT_ADDRESS_PATTERN.match(token):
+        return True
+    return bool(SYMBOL_PATTERN.match(token)) and any(char.isalpha() for char in token)
+
 
-    # Convert 'solana' to its specific chain ID if chain_id is provided
-    chain_id = '1151111081099710' if chain_id == 'solana' else chain_id
+def is_known_token(token: str) -> bool:
+    """Whether `token` is a contract address or a symbol the search index (Acme catalog plus resolved tokens) knows."""
+    token = token.strip()
+    if EVM_CONTRACT_ADDRESS_PATTERN.match(token) or SVM_CONTRACT_ADDRESS_PATTERN.match(token):
+        return True
+    return TOKEN_SEARCH_INDEX.knows(token)
+
+
+def token_cache_key(token: str, chain_id: Optional[str] = None) -> tuple:
+    """Normalized (symbol or address, chain) key for a token lookup."""
+    # Solana addresses are case-sensitive; symbols and EVM addresses are not
+    token = token.strip()
+    normalized = token if SVM_CONTRACT_ADDRESS_PATTERN.match(token) else token.lower()
+    return normalized, CHAINS.canonical_id(chain_id)
+
+
+async def _resolve_token_data(token: str, chain_id: Optional[str] = None):
+    """
+    Resolve a token on Acme, falling back to LiFi and registering the best match on Acme.
+
+    Returns None only if every upstream answered and none knows the token;
+    raises TransientLookupError if one couldn't answer and nothing was found.
+    """
+    # Contract addresses are looked up on their VM's chains as given, symbols uppercased on every chain
+    acme_param = {"symbol": token if address_vm(token) else token.upper()}
+    chains = CHAINS.lifi_chains(token)
+    chain_id = CHAINS.canonical_id(chain_id)
+
+    # Known tokens resolve from the local catalog mirror without a network call
+    currency = ACME_CATALOG.lookup(token, chain_id)
+    if currency:
+        logger.debug(f"Token data for {token} found in the Acme catalog.")
+        return CHAINS.token_record(currency._asdict())
+
+    if SPECULATIVE_RESOLUTION:
+        acme_data, highest_mcap_token = await _speculate_acme_and_lifi(token, acme_param, chain_id, chains)
+    else:
+        # Otherwise, attempt to fetch data from Acme using either contract address or symbol, then LiFi
+        try:
+            acme_data = await fetch_tokens_from_acme(**acme_param, chain_id=chain_id)
+        except TransientLookupError as e:
+            logger.warning(f"{e} Falling back to LiFi for {token}.")
+            acme_data, acme_error = None, e
+        else:
+            acme_error = None
+        highest_mcap_token = None if acme_data else await _discover_on_lifi(token, chains)
+        if highest_mcap_token is None and acme_error:
+            raise acme_error
 
-    # First, attempt to fetch data from Acme using either contract address or symbol
-    acme_data = await fetch_tokens_from_acme(**acme_param, chain_id=chain_id)
     if acme_data:
         logger.debug(f"Token data for {token} found on Acme.")
-        return acme_data
+        return CHAINS.token_record(acme_data)
+    if highest_mcap_token is None:
+        return None
+
+    # Register the highest market cap token with Acme in the background and answer from the LiFi data
+    logger.info(f"Queueing registration of token with highest market cap: {highest_mcap_token.get('symbol', 'Unknown')}")
+    return queue_token_registration(highest_mcap_token)
+
 
-    # If not found on Acme, fetch from LiFi across chains
-    logger.info(f"Fetching token data for {token} across specified chains.")
-    tokens_data = await fetch_tokens_across_chains_from_lifi(token, chains)
+async def _discover_on_lifi(token: str, chains):
+    """Find `token` on LiFi across `chains` and return the candidate with the highest market cap, or None."""
+    # Don't stall the update on a LiFi outage: with the circuit open only cached tokens can resolve
+    if get_circuit_breaker("lifi").is_open:
+        logger.warning(f"LiFi circuit is open, resolving {token} from cache only.")
+        tokens_data = [cached for cached in (_cached_lifi_token(token, chain_id, platform) for chain_id, platform in chains) if cached]
+        if not tokens_data:
+            raise TransientLookupError(f"LiFi circuit is open and {token} isn't cached.")
+    else:
+        logger.info(f"Fetching token data for {token} across specified chains.")
+        tokens_data = await fetch_tokens_across_chains_from_lifi(token, chains)
     if not tokens_data:
         logger.warning(f"No token data found across chains for token: {token}")
         return None
@@ -274,58 +468,144 @@ async def fetch_token_data_from_chains(token: str, chain_id: Optional[str] = Non
         logger.warning(f"No market cap found for token: {token} across any chain.")
         return None
 
-    # Select and return the token data with the highest market cap
-    highest_mcap_token = select_highest_mcap(tokens_with_mcap)
+    # Select the token data with the highest market cap
+    return select_highest_mcap(tokens_with_mcap)
+
+
+class SpeculationStats:
+    """Counts how speculative Acme/LiFi resolutions ended, to tell whether speculating pays off."""
+
+    def __init__(self):
+        self.speculations = 0
+        self.acme_wins = 0  # Acme had the token: the LiFi work was wasted
+        self.lifi_wins = 0  # Acme didn't answer in time or didn't have it: the head start was used
+        self.acme_cancelled = 0  # Acme was still pending when the grace window ran out
+
+    def stats(self) -> dict:
+        return {
+            "speculations": self.speculations,
+            "acme_wins": self.acme_wins,
+            "lifi_wins": self.lifi_wins,
+            "acme_cancelled": self.acme_cancelled,
+            "wasted_ratio": round(self.acme_wins / self.speculations, 3) if self.speculations else 0.0,
+        }
+
+
+SPECULATION_STATS = SpeculationStats()
+register_metrics("speculative_resolution", SPECULATION_STATS.stats)
+
+
+async def _speculate_acme_and_lifi(token: str, acme_param: dict, chain_id: Optional[str], chains):
+    """
+    Look a token up on Acme and discover it on LiFi at the same time.
+
+    Acme is preferred: if it has the token, the LiFi work is cancelled. If LiFi
+    finishes first, Acme gets SPECULATION_GRACE seconds more before it is
+    cancelled and the LiFi candidate is used. Nothing is registered here, so a
+    losing LiFi side has no side effects. If Acme couldn't answer, the LiFi
+    candidate is used, and without one the Acme error is raised.
+
+    Returns:
+        tuple: (Acme's token record, None) if Acme won, otherwise (None, the LiFi candidate or None).
+    """
+    SPECULATION_STATS.speculations += 1
+    acme_task = asyncio.ensure_future(fetch_tokens_from_acme(**acme_param, chain_id=chain_id))
+    lifi_task = asyncio.ensure_future(_discover_on_lifi(token, chains))
+    try:
+        await asyncio.wait({acme_task, lifi_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not acme_task.done():
+            if lifi_task.exception() is None and lifi_task.result():
+                # LiFi has a candidate: give Acme a short grace window to still win
+                await asyncio.wait({acme_task}, timeout=SPECULATION_GRACE)
+                if not acme_task.done():
+                    logger.info(f"Acme didn't answer within {SPECULATION_GRACE}s, resolving {token} from LiFi.")
+                    acme_task.cancel()
+                    SPECULATION_STATS.acme_cancelled += 1
+                    SPECULATION_STATS.lifi_wins += 1
+                    return None, lifi_task.result()
+            await asyncio.wait({acme_task})
+
+        try:
+            acme_data = acme_task.result()
+        except TransientLookupError as e:
+            logger.warning(f"{e} Falling back to LiFi for {token}.")
+            acme_data, acme_error = None, e
+        else:
+            acme_error = None
+        if acme_data:
+            logger.debug(f"Token data for {token} found on Acme, dropping the LiFi lookup.")
+            lifi_task.cancel()
+            SPECULATION_STATS.acme_wins += 1
+            return acme_data, None
+
+        highest_mcap_token = await lifi_task
+        if highest_mcap_token:
+            SPECULATION_STATS.lifi_wins += 1
+        elif acme_error:
+            raise acme_error
+        return None, highest_mcap_token
+    finally:
+        for task in (acme_task, lifi_task):
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # Retrieved so a losing side's error isn't reported as unhandled
+
 
-    # Register the highest market cap token with Acme
-    logger.info(f"Registering token with highest market cap: {highest_mcap_token.get('symbol', 'Unknown')}")
-    return await register_tokens_on_acme([highest_mcap_token])
-    
 async def fetch_tokens_from_acme(symbol: str, chain_id: Optional[str] = None, skip: int = 0, take: int = 5):
     """
-    Fetch tokens from Acme with optional chainId and retry logic.
+    Fetch tokens from Acme with optional chainId.
 
     Args:
         symbol (str): The symbol of the token (e.g., "ETH").
-        chain_id (str, optional): The chain ID to filter tokens. Defaults to None.
+        chain_id (str, optional): The chain to filter tokens on, by any of its IDs. Defaults to None.
         skip (int): Number of items to skip for pagination. Defaults to 0.
         take (int): Number of items to take for pagination. Defaults to 5.
 
     Returns:
-        dict or None: The response JSON on success, or None if the operation fails.
+        dict or None: The first matching token, or None if Acme doesn't know it.
+
+    Raises:
+        TransientLookupError: If Acme couldn't answer.
     """
     base_url = f"{ACME_URL}/checkout/currency/get-all-currencies"
     params = {"symbol": symbol, "skip": skip, "take": take}
     if chain_id:
-        params["chainId"] = chain_id
-
-    for attempt in range(RETRY_COUNT):
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)) as session:
-            try:
-                logger.debug(f"Fetching tokens from Acme: {base_url} {params}")
-                async with session.get(base_url, params=params, headers={"X-API-KEY": ACME_API_KEY}) as response:
-                    logger.debug(f"Attempt {attempt + 1}: Fetching tokens, Response status: {response.status}")
-                    if response.status == 200:
-                        data = await response.json()
-                        # Check if 'data' is a key in the response and it is a non-empty list
-                        if 'data' in data and isinstance(data['data'], list) and data['data']:
-                            logger.debug(f"Tokens fetched from Acme: {data}")
-                            return data['data'][0]  # Return the first token if it exists
-
-                        # Log if 'data' is an empty list
-                        logger.warning("No tokens found in the response from Acme.")
-                    elif response.status == 404:
-                        logger.info(f"Token {symbol} not found on Acme.")
-                        break
-            except asyncio.TimeoutError:
-                logger.error(f"Attempt {attempt + 1}: Request timed out.")
-            except aiohttp.ClientError as e:
-                logger.exception(f"Attempt {attempt + 1}: Client error occurred: {e}")
+        # Callers pass the canonical (LiFi) ID; Acme lists Solana as "solana"
+        params["chainId"] = CHAINS.acme_id(chain_id)
+
+    try:
+        logger.debug(f"Fetching tokens from Acme: {base_url} {params}")
+        # First lookup of every token resolution, so a slow Acme node is hedged rather than waited out
+        response = await upstream_request("GET", base_url, params=params, headers={"X-API-KEY": ACME_API_KEY}, hedge=True)
+    except (aiohttp.ClientError, RateLimitExceeded) as e:
+        logger.error(f"Client error occurred while fetching tokens from Acme: {e}")
+        raise TransientLookupError(f"Acme couldn't look up {symbol}: {e}") from e
+
+    logger.debug(f"Fetching tokens, Response status: {response.status}")
+    if response.status == 200:
+        data = response.json()
+        # Check if 'data' is a key in the response and it is a non-empty list
+        if 'data' in data and isinstance(data['data'], list) and data['data']:
+            logger.debug(f"Tokens fetched from Acme: {data}")
+            return data['data'][0]  # Return the first token if it exists
+
+        # Log if 'data' is an empty list
+        logger.warning("No tokens found in the response from Acme.")
+    elif response.status == 404:
+        logger.info(f"Token {symbol} not found on Acme.")
+    else:
+        logger.error(f"Fetching tokens from Acme failed with status {response.status}")
+        raise TransientLookupError(f"Acme answered {response.status} looking up {symbol}.")
     return None
 
 
 async def fetch_tokens_across_chains_from_lifi(token_symbol: str, chains: list[tuple]):
-    """Fetch token data across chains from LiFi, filtering for valid results."""
+    """
+    Fetch token data across chains from LiFi, filtering for valid results.
+
+    Raises TransientLookupError if nothing was found and LiFi couldn't answer for some chain.
+    """
     tokens_data = []
     tasks = [
         fetch_token_data_from_lifi(token_symbol, chain_id, platform)
@@ -337,35 +617,73 @@ async def fetch_tokens_across_chains_from_lifi(token_symbol: str, chains: list[t
         if isinstance(response, dict) and 'symbol' in response:
             tokens_data.append(response)
 
+    failures = [response for response in lifi_responses if isinstance(response, Exception)]
+    if not tokens_data and failures:
+        raise TransientLookupError(f"LiFi couldn't look up {token_symbol} on {len(failures)} chain(s): {failures[0]}")
+
     logger.info(f"LiFi returned {len(tokens_data)} valid tokens for symbol {token_symbol}")
     return tokens_data
 
 
 async def fetch_token_data_from_lifi(token_symbol: str, chain_id: str, platform: str):
     """
-    Fetch token data from LiFi for a specific chain. Return token data if found; log and continue if not.
+    Fetch token data from LiFi for a specific chain. Return token data if found, None if LiFi doesn't know it.
+
+    Raises TransientLookupError if LiFi couldn't answer and nothing is cached.
     """
     url = f"{LIFI_API_URL}/token"
     params = {"chain": chain_id, "token": token_symbol}
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    token_data = await response.json()
-                    if token_data and 'symbol' in token_data:
-                        token_data.update({"chain_id": chain_id, "platform_name": platform})
-                        logger.info(f"Token data found on LiFi for {token_symbol} on chain {chain_id}.")
-                        return token_data
-                elif response.status != 404:
-                    logger.warning(f"LiFi request failed with status {response.status} for {token_symbol} on chain {chain_id}")
-        except aiohttp.ClientError as e:
-            logger.error(f"Network error with LiFi for {token_symbol} on {chain_id}: {e}")
+    # The cache keeps the compact, immutable LifiToken; callers get a fresh dict each time
+    cache_key = token_cache_key(token_symbol, chain_id)
+    cached = LIFI_TOKEN_CACHE.get(cache_key)
+    if cached is not None:
+        return cached.to_dict(chain_id=chain_id, platform_name=platform)
+
+    try:
+        response = await upstream_request("GET", url, params=params)
+    except (RateLimitExceeded, CircuitOpenError) as e:
+        logger.warning(f"{e} Serving cached LiFi data for {token_symbol} on chain {chain_id}.")
+        return _stale_lifi_token(cache_key, chain_id, platform, e)
+    except aiohttp.ClientError as e:
+        logger.error(f"Network error with LiFi for {token_symbol} on {chain_id}: {e}")
+        raise TransientLookupError(f"LiFi couldn't look up {token_symbol} on chain {chain_id}: {e}") from e
+
+    if response.status == 200:
+        lifi_token = decode_lifi_token(response.body)
+        if lifi_token:
+            logger.info(f"Token data found on LiFi for {token_symbol} on chain {chain_id}.")
+            LIFI_TOKEN_CACHE.set(cache_key, lifi_token)
+            return lifi_token.to_dict(chain_id=chain_id, platform_name=platform)
+    elif response.status == HTTPStatus.TOO_MANY_REQUESTS:
+        logger.warning(f"LiFi rate limited {token_symbol} on chain {chain_id}, serving cached data.")
+        return _stale_lifi_token(cache_key, chain_id, platform, "rate limited")
+    elif response.status != 404:
+        logger.warning(f"LiFi request failed with status {response.status} for {token_symbol} on chain {chain_id}")
+        raise TransientLookupError(f"LiFi answered {response.status} looking up {token_symbol} on chain {chain_id}.")
     return None
 
 
+def _cached_lifi_token(token_symbol: str, chain_id: str, platform: str):
+    """Return a possibly expired cached LiFi token as a dict, or None if there is none."""
+    cached = LIFI_TOKEN_CACHE.get(token_cache_key(token_symbol, chain_id), allow_stale=True)
+    return cached.to_dict(chain_id=chain_id, platform_name=platform) if cached is not None else None
+
+
+def _stale_lifi_token(cache_key, chain_id: str, platform: str, reason):
+    """Return a possibly expired cached LiFi token as a dict, raising TransientLookupError if there is none."""
+    cached = _cached_lifi_token(cache_key[0], chain_id, platform)
+    if cached is None:
+        raise TransientLookupError(f"LiFi couldn't look up {cache_key[0]} on chain {chain_id}: {reason}")
+    return cached
+
+
 async def fetch_market_cap_for_tokens(tokens_data):
-    """Fetch market cap data for each token from CoinGecko and add to token data."""
+    """
+    Fetch market cap data for each token from CoinGecko and add to token data.
+
+    Raises TransientLookupError if no token got a market cap and CoinGecko couldn't answer for some.
+    """
     tasks = [fetch_mcap(token["address"], token["chain_id"]) for token in tokens_data]
     mcap_responses = await asyncio.gather(*tasks, return_exceptions=True)
 
@@ -377,29 +695,90 @@ async def fetch_market_cap_for_tokens(tokens_data):
             logger.info(f"Market cap for {token['symbol']} found: {mcap_data}")
         else:
             logger.warning(f"Market cap not available for {token['symbol']} on chain {token['chain_id']}")
+
+    failures = [mcap_data for mcap_data in mcap_responses if isinstance(mcap_data, Exception)]
+    if not tokens_with_mcap and failures:
+        raise TransientLookupError(f"Couldn't fetch market caps for {len(failures)} candidate(s): {failures[0]}")
     return tokens_with_mcap
 
 
 async def fetch_mcap(contract_address: str, chain_id: str) -> float:
-    """Fetch the market cap for a given token contract address from CoinGecko."""
-    platform_id = SUPPORTED_CHAIN_IDS.get(str(chain_id), 'solana')
-    url = (
-        f"https://api.coingecko.com/api/v3/simple/token_price/{platform_id}"
-        f"?contract_addresses={contract_address}"
-        "&vs_currencies=usd&include_market_cap=true"
-    )
+    """
+    Fetch the market cap for a given token contract address from CoinGecko.
+
+    Concurrent lookups on the same platform (e.g. the candidates of several
+    tokens being validated at once) are sent as one batched request. Raises
+    TransientLookupError if CoinGecko couldn't answer and nothing is cached.
+    """
+    platform_id = CHAINS.coingecko_platform(chain_id)
+    if platform_id is None:
+        logger.warning(f"No CoinGecko platform for chain {chain_id}, skipping market cap of {contract_address}.")
+        return None
+    cached = MCAP_CACHE.get(CHAINS.token_key(chain_id, contract_address))
+    if cached is not None:
+        return cached
+    market_cap = await MCAP_BATCHER.load(platform_id, contract_address)
+    if isinstance(market_cap, TransientLookupError):
+        raise market_cap
+    return market_cap
+
+
+async def fetch_mcaps(platform_id: str, contract_addresses: list) -> dict:
+    """
+    Fetch market caps for several contracts on one CoinGecko platform in a single request.
+
+    Args:
+        platform_id (str): CoinGecko platform id, e.g. 'base' or 'solana'.
+        contract_addresses (list): Contract addresses, at most COINGECKO_MAX_ADDRESSES_PER_REQUEST.
+
+    Returns:
+        dict: Market cap per requested address; addresses without one are left out, and those
+            CoinGecko couldn't answer for (with nothing cached) map to a TransientLookupError.
+    """
+    url = f"https://api.coingecko.com/api/v3/simple/token_price/{platform_id}"
+    params = {"contract_addresses": ",".join(contract_addresses), "vs_currencies": "usd", "include_market_cap": "true"}
+
+    def stale(reason):
+        # Not having a market cap would read as the token having none, so uncached addresses carry the failure
+        error = TransientLookupError(f"CoinGecko couldn't give market caps on {platform_id}: {reason}")
+        cached = {address: MCAP_CACHE.get(CHAINS.token_key(platform_id, address), allow_stale=True) for address in contract_addresses}
+        return {address: error if mcap is None else mcap for address, mcap in cached.items()}
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                data = await response.json()
-                contract_address_key = list(data.keys())[0]
-                market_cap = data[contract_address_key].get("usd_market_cap")
-                return market_cap if market_cap else None
+        response = await upstream_request("GET", url, params=params)
+        if response.status == HTTPStatus.TOO_MANY_REQUESTS:
+            logger.warning(f"CoinGecko rate limited market caps on {platform_id}, serving cached data.")
+            return stale("rate limited")
+        if 400 <= response.status < 500 and len(contract_addresses) > 1:
+            # One bad address (or a plan limit on addresses per call) fails the whole batch; ask one by one
+            logger.warning(f"CoinGecko rejected a batch of {len(contract_addresses)} addresses on {platform_id}, retrying singly.")
+            results = await asyncio.gather(*(fetch_mcaps(platform_id, [address]) for address in contract_addresses))
+            return {address: mcap for result in results for address, mcap in result.items()}
+        if response.status != 200:
+            logger.warning(f"CoinGecko market cap request failed with status {response.status} on {platform_id}")
+            # A rejected single address has no market cap; a server error says nothing about it
+            return stale(f"status {response.status}") if response.status >= 500 else {}
+        mcaps = {price.address.lower(): price.usd_market_cap for price in decode_coingecko_prices(response.body)}
+    except (RateLimitExceeded, CircuitOpenError) as e:
+        logger.warning(f"{e} Serving cached market caps on {platform_id}.")
+        return stale(e)
     except aiohttp.ClientError as e:
-        logger.exception(f"Failed to fetch market cap for contract address {contract_address}: {e}")
-    return None
+        logger.error(f"Failed to fetch market caps on {platform_id}: {e}")
+        return stale(e)
+
+    # Fan the results back out to the addresses as they were requested (Solana addresses are case-sensitive)
+    results = {}
+    for address in contract_addresses:
+        market_cap = mcaps.get(address.lower())
+        if market_cap:
+            MCAP_CACHE.set(CHAINS.token_key(platform_id, address), market_cap)
+            results[address] = market_cap
+    return results
+
+
+MCAP_BATCHER = get_request_batcher(
+    "coingecko_mcap", fetch_mcaps, max_batch=COINGECKO_MAX_ADDRESSES_PER_REQUEST, window=COINGECKO_BATCH_WINDOW
+)
 
 
 def select_highest_mcap(tokens_with_mcap):
@@ -407,10 +786,24 @@ def select_highest_mcap(tokens_with_mcap):
     return max(tokens_with_mcap, key=lambda x: x["mcap"], default=None)
 
 
+def sanitize_token_for_acme(token: dict) -> dict:
+    """The fields Acme's create-or-update endpoint takes, with the chain ID Acme uses for the chain."""
+    chain_id, _ = CHAINS.token_identity(token)
+    return {
+        "chainId": CHAINS.acme_id(chain_id),
+        "name": token.get("name"),
+        "logoUrl": token.get("logoURI",""),
+        "symbol": token.get("symbol"),
+        "address": token.get("contract_address") or token.get("address"),
+        "decimals": token.get("decimals", 6),  # Default to 6 if not provided
+        "isEnabled": True
+    }
+
+
 async def register_tokens_on_acme(tokens: list[dict]):
     """
     Register or update tokens for the DEX aggregator on Acme.
-    Sanitizes tokens to ensure only required fields are sent, and converts chain ID to "solana" if needed.
+    Sanitizes tokens to ensure only required fields are sent, with the chain IDs Acme uses.
 
     Args:
         tokens (list[dict]): List of token data dictionaries containing required fields.
@@ -419,48 +812,121 @@ async def register_tokens_on_acme(tokens: list[dict]):
         dict or None: The first registered token object from `currenciesLoaded` in the API response,
                       or None if registration fails.
     """
-    # Determine dexAggregatorId based on chain_id presence
-    dex_aggregator_id = "Jupiter" if any(token.get("chain_id") == "1151111081099710" for token in tokens) else "LiFi"
-
-    # Sanitize tokens to include only necessary fields, with chain ID transformation
-    sanitized_tokens = [
-        {
-            "chainId": "solana" if token.get("chain_id") == "1151111081099710" else token.get("chain_id") or token.get("chainId"),
-            "name": token.get("name"),
-            "logoUrl": token.get("logoURI",""),
-            "symbol": token.get("symbol"),
-            "address": token.get("contract_address") or token.get("address"),
-            "decimals": token.get("decimals", 6),  # Default to 6 if not provided
-            "isEnabled": True
-        }
-        for token in tokens
-    ]
+    # Determine dexAggregatorId from the tokens' chains (Jupiter if any is on Solana)
+    dex_aggregators = {CHAINS.dex_aggregator(CHAINS.token_identity(token)[0]) for token in tokens}
+    dex_aggregator_id = "Jupiter" if "Jupiter" in dex_aggregators else "LiFi"
+    registered = await _post_registration(dex_aggregator_id, [sanitize_token_for_acme(token) for token in tokens])
+    return registered[0] if registered else None
+
+
+async def _post_registration(dex_aggregator_id: str, currencies: list) -> list:
+    """
+    Create or update `currencies` on Acme for one DEX aggregator.
+
+    Returns:
+        list: The `currenciesLoaded` records from the response.
 
-    # Prepare payload
+    Raises:
+        ValueError: If registration fails.
+    """
     api_url = f"{ACME_URL}/telegram/currency/create-or-update-for-dex-aggregator"
     headers = {"X-API-KEY": ACME_API_KEY, "Content-Type": "application/json"}
-    payload = {"dexAggregatorId": dex_aggregator_id, "currencies": sanitized_tokens}
-
-    # Attempt API registration with retries
-    for attempt in range(RETRY_COUNT):
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)) as session:
-            try:
-                logger.debug(f"Attempt {attempt + 1}: Registering tokens on Acme at {api_url} {headers} {payload}")
-                async with session.post(api_url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info("Tokens registered successfully.")
-                        # Return the first object from 'currenciesLoaded' if it exists, otherwise None
-                        return data.get('data', {}).get('currenciesLoaded', [None])[0]
-                    else:
-                        logger.error(f"Attempt {attempt + 1}: Registration failed with status {response.status}")
-                        response.raise_for_status()
-
-            except asyncio.TimeoutError:
-                logger.error(f"Attempt {attempt + 1}: Request timed out.")
-            except aiohttp.ClientError as e:
-                logger.exception(f"Attempt {attempt + 1}: Client error occurred: {e}")
-            except Exception as e:
-                logger.error(f"Unexpected error on attempt {attempt + 1}: {e}")
+    payload = {"dexAggregatorId": dex_aggregator_id, "currencies": currencies}
+
+    # Attempt API registration; retries reuse one idempotency key so they can't register twice
+    try:
+        logger.debug(f"Registering tokens on Acme at {api_url} {payload}")
+        response = await upstream_request("POST", api_url, json=payload, headers=headers)
+        if response.status == 200:
+            data = response.json()
+            logger.info(f"{len(currencies)} token(s) registered successfully for {dex_aggregator_id}.")
+            registered = [record for record in data.get('data', {}).get('currenciesLoaded', []) if record]
+            for record in registered:
+                ACME_CATALOG.add(record)
+            return registered
+        logger.error(f"Registration failed with status {response.status}")
+    except aiohttp.ClientError as e:
+        logger.error(f"Client error occurred while registering tokens: {e}")
 
     raise ValueError("Failed to register tokens after multiple attempts.")
+
+
+# Tokens waiting to be registered, keyed by their normalized (chain, address) identity
+PENDING_REGISTRATIONS: dict = {}
+
+
+def _registration_key(chain_id, address: str) -> tuple:
+    return CHAINS.token_key(chain_id, address)
+
+
+async def _register_batch(dex_aggregator_id: str, keys: list) -> dict:
+    """Send one write-behind batch; returns the registered record per key."""
+    currencies = [PENDING_REGISTRATIONS[key][0] for key in keys]
+    try:
+        registered = await _post_registration(dex_aggregator_id, currencies)
+    except ValueError as e:
+        logger.error(f"Write-behind registration of {len(keys)} {dex_aggregator_id} token(s) failed: {e}")
+        _forget_resolved_tokens(keys)
+        return {}
+    finally:
+        for key in keys:
+            PENDING_REGISTRATIONS.pop(key, None)
+    return {_registration_key(record.get("chainId"), record.get("address", "")): record for record in registered}
+
+
+def _forget_resolved_tokens(keys: list) -> None:
+    """
+    Drop the cached resolutions of the tokens with these (chain, address) keys.
+
+    A cached record skips _resolve_token_data, and with it the registration
+    of a token Acme doesn't know yet; the next mention resolves (and queues) it again.
+    """
+    keys = set(keys)
+    for cache_key, token_data, _ in TOKEN_RESOLUTION_CACHE.items():
+        if CHAINS.token_identity(token_data) in keys:
+            TOKEN_RESOLUTION_CACHE.pop(cache_key)
+
+
+REGISTRATION_BATCHER = get_request_batcher(
+    "acme_registration", _register_batch, max_batch=REGISTRATION_MAX_BATCH, window=REGISTRATION_BATCH_WINDOW
+)
+
+
+def queue_token_registration(token: dict) -> dict:
+    """
+    Queue `token` for registration on Acme and return an Acme-shaped record for it right away.
+
+    Queued tokens are sent in one create-or-update call per DEX aggregator
+    (Jupiter for Solana, LiFi otherwise) after REGISTRATION_BATCH_WINDOW seconds.
+    Resolution doesn't wait for it, but creating a trading link for the token
+    does (see wait_for_registration).
+
+    Args:
+        token (dict): Resolved LiFi token data.
+
+    Returns:
+        TokenRecord: The token as Acme would return it (without an Acme id until registration completes).
+    """
+    currency = sanitize_token_for_acme(token)
+    key = _registration_key(currency["chainId"], currency["address"])
+    if key not in PENDING_REGISTRATIONS:
+        dex_aggregator_id = CHAINS.dex_aggregator(currency["chainId"])
+        future = asyncio.ensure_future(REGISTRATION_BATCHER.load(dex_aggregator_id, key))
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        PENDING_REGISTRATIONS[key] = (currency, future)
+
+    # Keep the canonical chain ID the rest of the pipeline uses
+    return CHAINS.token_record(dict(currency, chainId=key[0]))
+
+
+async def wait_for_registration(chain_id, address: str) -> None:
+    """
+    Wait (within the update's deadline) for a queued registration of the token, if there is one.
+
+    This keeps the batch window and the registration call on the path of
+    every new trading link for a LiFi-only token.
+    """
+    pending = PENDING_REGISTRATIONS.get(_registration_key(chain_id, address or ""))
+    if pending is None:
+        return
+    await asyncio.wait({pending[1]}, timeout=time_left())
@@ -0,0 +1,114 @@
+import time
+import asyncio
+import hashlib
+from typing import Optional
+from config import logger, TRADING_LINK_TTL, TRADING_LINK_MEMO_MAXSIZE, TRADING_LINK_MEMO_PATH
+from utils.cache import TTLCache
+from utils.chains import CHAINS
+from utils.codec import dumps, loads
+from utils.metrics import register_metrics
+from utils.snapshot import write_snapshot
+
+
+def api_key_digest(api_key: str) -> str:
+    """Short digest identifying an API key, so keys are never kept (or written to disk) in plain text."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+def trading_link_key(api_key: str, chain_id: str, token_address: str, redirect_url: str = "") -> tuple:
+    """
+    Memo key for a trading link.
+
+    Keyed by API key rather than user, so every anonymous user (on
+    DEFAULT_ACME_API_KEY) shares one link per token.
+    """
+    chain_id, address = CHAINS.token_key(chain_id, token_address)
+    return api_key_digest(api_key), chain_id, address, redirect_url or ""
+
+
+class TradingLinkMemo:
+    """
+    Trading links already created on Acme, reused instead of creating a new intent each time.
+
+    Entries live for TRADING_LINK_TTL seconds and survive restarts through a
+    snapshot on disk, written in the background when the memo has changed.
+    """
+
+    def __init__(self, maxsize: int = TRADING_LINK_MEMO_MAXSIZE, ttl: float = TRADING_LINK_TTL):
+        self._links = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._dirty = False
+        self.invalidations = 0
+
+    def get(self, key: tuple) -> Optional[str]:
+        return self._links.get(key)
+
+    def set(self, key: tuple, link: str) -> None:
+        self._links.set(key, link)
+        self._dirty = True
+
+    def invalidate(self, api_key: Optional[str] = None, chain_id: Optional[str] = None, token_address: Optional[str] = None) -> int:
+        """
+        Drop memoized links matching every given filter (e.g. all links of one API key, or of one token).
+
+        Returns:
+            int: The number of links dropped.
+        """
+        digest = api_key_digest(api_key) if api_key else None
+        _, chain, address, _ = trading_link_key("", chain_id or "", token_address or "")
+        dropped = 0
+        for key, _, _ in self._links.items():
+            if (digest is None or key[0] == digest) and (not chain_id or key[1] == chain) and (not token_address or key[2] == address):
+                self._links.pop(key)
+                dropped += 1
+        if dropped:
+            self._dirty = True
+            self.invalidations += dropped
+        return dropped
+
+    def load_snapshot(self, path: str = TRADING_LINK_MEMO_PATH) -> bool:
+        """Load links saved by save_snapshot, skipping the ones that expired meanwhile."""
+        try:
+            with open(path, "rb") as f:
+                snapshot = loads(f.read())
+            elapsed = time.time() - snapshot["saved_at"]
+            for key, link, seconds_left in snapshot["links"]:
+                if seconds_left > elapsed:
+                    self._links.set(tuple(key), link, ttl=seconds_left - elapsed)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable trading link snapshot {path}: {e}")
+            return False
+        logger.info(f"Loaded {len(self._links)} trading links from {path}.")
+        return True
+
+    def snapshot(self) -> bytes:
+        """Serialize the memo for save_snapshot; done on the event loop so the cache isn't read mid-update."""
+        self._dirty = False
+        return dumps({"saved_at": time.time(), "links": [list(entry) for entry in self._links.items()]})
+
+    def save_snapshot(self, path: str = TRADING_LINK_MEMO_PATH) -> None:
+        """Write the memo to `path` atomically."""
+        write_snapshot(path, self.snapshot())
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def stats(self) -> dict:
+        return dict(self._links.stats(), invalidations=self.invalidations)
+
+
+TRADING_LINK_MEMO = TradingLinkMemo()
+register_metrics("trading_links", TRADING_LINK_MEMO.stats)
+
+
+async def keep_trading_links_saved(interval: float, path: str = TRADING_LINK_MEMO_PATH) -> None:
+    """Write the memo snapshot every `interval` seconds while it has unsaved changes."""
+    while True:
+        await asyncio.sleep(interval)
+        if TRADING_LINK_MEMO.dirty:
+            try:
+                await asyncio.to_thread(write_snapshot, path, TRADING_LINK_MEMO.snapshot())
+            except OSError as e:
+                logger.error(f"Could not write trading link snapshot {path}: {e}")
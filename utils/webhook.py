@@ -1,22 +1,21 @@
 import aiohttp
-import asyncio
 import base64
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ExtBot, CallbackContext
-from dataclasses import dataclass
+from typing import NamedTuple
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives.serialization import load_pem_public_key
 from cryptography.exceptions import InvalidSignature
 from utils.membership import get_invite_link
 from handlers.auth_handler import decrypt_data, decrypt_auth_result, store_auth_result
-from config import PHOTO_COYOTE_MIC, logger, ACME_API_KEY, ACME_URL, DEFAULT_TIMEOUT, RETRY_COUNT, URL, LOGGED_IN, FEATURES, MAKE_MONEY, BOT_USERNAME, ACME_APP_URL, ACME_GROUP, PASS_CLAIMED
+from config import PHOTO_COYOTE_MIC, logger, ACME_API_KEY, ACME_URL, URL, LOGGED_IN, FEATURES, MAKE_MONEY, BOT_USERNAME, ACME_APP_URL, ACME_GROUP, PASS_CLAIMED
 
 from messages_photos import markdown_v2
+from utils.httpClient import upstream_request
 
-@dataclass
-class AcmeWebhookUpdate:
-    """Dataclass to represent the structure of incoming Acme order updates."""
+class AcmeWebhookUpdate(NamedTuple):
+    """Immutable, slotted record of an incoming Acme order update."""
     id: str
     createdAt: str
     blockchainTransactionHash: str
@@ -71,27 +70,20 @@ async def set_acme_webhook():
 
     logger.debug("Sending request to set webhook...")
 
-    # Retry logic with `RETRY_COUNT`
-    for attempt in range(RETRY_COUNT):
-        try:
-            async with aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT)
-            ) as session:
-                async with session.post(acme_api, json=data, headers=headers) as response:
-                    response.raise_for_status()  # Raise an error for HTTP error responses
-
-                    # Log success and exit
-                    logger.info(f"ACME webhook set successfully! Status: {response.status}")
-                    logger.debug(f"Response Text: {await response.text()}")
-                    logger.debug(f"Payload Sent: {data}")
-                    return
-
-        except asyncio.TimeoutError:
-            logger.error(f"Attempt {attempt + 1}: Request timed out.")
-        except aiohttp.ClientError as e:
-            logger.error(f"Attempt {attempt + 1}: Network error: {e}", exc_info=True)
-        except Exception as e:
-            logger.error(f"Unexpected error on attempt {attempt + 1}: {str(e)}", exc_info=True)
+    # Retries follow the Acme retry policy
+    try:
+        response = await upstream_request("POST", acme_api, json=data, headers=headers)
+        if response.ok:
+            # Log success and exit
+            logger.info(f"ACME webhook set successfully! Status: {response.status}")
+            logger.debug("Response Text: %s", response.body)
+            logger.debug(f"Payload Sent: {data}")
+            return
+        logger.error(f"Setting ACME webhook returned status {response.status}.")
+    except aiohttp.ClientError as e:
+        logger.error(f"Network error while setting ACME webhook: {e}", exc_info=True)
+    except Exception as e:
+        logger.error(f"Unexpected error while setting ACME webhook: {str(e)}", exc_info=True)
 
     # Log final failure after exhausting retries
     logger.error("Failed to set ACME webhook after multiple attempts.")